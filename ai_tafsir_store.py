@@ -0,0 +1,82 @@
+"""مخزن محلي (SQLite) لنصوص الآيات وتفاسير الذكاء الاصطناعي المحسوبة مسبقاً.
+
+يملؤه precompute_tafsir.py، وتقرأ منه home() قبل أي اتصال بـ Gemini، فلا
+تحتاج الآيات المحسوبة مسبقاً إلى الشبكة إطلاقاً.
+"""
+import time
+
+from sqlite_store import SQLiteStore
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS ayah_texts (
+    surah INTEGER NOT NULL,
+    ayah INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (surah, ayah)
+);
+CREATE TABLE IF NOT EXISTS tafsir (
+    surah INTEGER NOT NULL,
+    ayah INTEGER NOT NULL,
+    interpreter TEXT NOT NULL,
+    text TEXT NOT NULL,
+    model TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (surah, ayah, interpreter)
+);
+'''
+
+
+def _ayah_key(surah_number, ayah_number):
+    """يعيد (رقم السورة, رقم الآية) كأعداد صحيحة أو None إذا لم يكونا رقمين."""
+    if not str(surah_number).isdigit() or not str(ayah_number).isdigit():
+        return None
+    return int(surah_number), int(ayah_number)
+
+
+class AiTafsirStore(SQLiteStore):
+    """الكتابة فورية فتكون كل نتيجة نقطة استئناف (checkpoint)."""
+
+    PRAGMAS = ('journal_mode=WAL',)
+
+    def __init__(self, path):
+        super().__init__(path)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def get_ayah_text(self, surah_number, ayah_number):
+        key = _ayah_key(surah_number, ayah_number)
+        if key is None:
+            return None
+        row = self._connect().execute('SELECT text FROM ayah_texts WHERE surah = ? AND ayah = ?', key).fetchone()
+        return row[0] if row else None
+
+    def put_ayah_text(self, surah_number, ayah_number, text):
+        key = _ayah_key(surah_number, ayah_number)
+        if key is None or not text:
+            return
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO ayah_texts (surah, ayah, text) VALUES (?, ?, ?)', key + (text,))
+
+    def get_tafsir(self, surah_number, ayah_number, interpreter):
+        key = _ayah_key(surah_number, ayah_number)
+        if key is None:
+            return None
+        row = self._connect().execute('SELECT text FROM tafsir WHERE surah = ? AND ayah = ? AND interpreter = ?',
+                                      key + (interpreter,)).fetchone()
+        return row[0] if row else None
+
+    def put_tafsir(self, surah_number, ayah_number, interpreter, text, model):
+        key = _ayah_key(surah_number, ayah_number)
+        if key is None or not text:
+            return
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO tafsir (surah, ayah, interpreter, text, model, created_at) '
+                         'VALUES (?, ?, ?, ?, ?, ?)', key + (interpreter, text, model, time.time()))
+
+    def done_interpreters(self, surah_number):
+        """{رقم الآية: مجموعة المفسرين المحسوبين} لسورة واحدة (لاستئناف العمل دون تكرار)."""
+        done = {}
+        for ayah, interpreter in self._connect().execute(
+                'SELECT ayah, interpreter FROM tafsir WHERE surah = ?', (int(surah_number),)):
+            done.setdefault(ayah, set()).add(interpreter)
+        return done
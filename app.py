@@ -1,16 +1,31 @@
-from flask import Flask, request, render_template_string, jsonify, redirect, url_for, flash, session
+from flask import Flask, request, render_template, render_template_string, jsonify, redirect, url_for, flash, session, Response, stream_with_context, send_file, abort, make_response, g, has_request_context
 import json
 import os
 import logging
-import requests
-from deep_translator import GoogleTranslator
 from functools import lru_cache
 import re
-from gtts import gTTS
-import base64
 import io
 import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from corpus import Corpus
+from favorites_store import FavoritesStore
+from fragment_cache import FragmentCache
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+from surah_resolver import SurahResolver
+from translation_store import TranslationStore
+from translator import BatchTranslator
+from tts_pipeline import ChunkedTTS
+from ai_tafsir_store import AiTafsirStore
+from ayah_ngram_index import AyahNgramIndex
+from audio_store import AudioStore, audio_id, is_valid_audio_id
+from gemini_cache import GeminiCache, cache_key
+from gemini_client import GeminiClient, GeminiCircuitOpen, GeminiEmptyResponse, GeminiError
+from quran_meta import ayah_count
+import quran_text
+from search_index import TafsirIndex
+from single_flight import SingleFlight
 
 # --- 1. إدارة الإعدادات (Configuration Management) ---
 class Config:
@@ -24,15 +39,60 @@ class Config:
     TAFSIR_DIR = os.path.join(DATA_DIR, "tafasir_json")
     SURAHS_FILE = os.path.join(DATA_DIR, "surahs.json")
     QURAN_FILE = os.path.join(DATA_DIR, "quran.json")
-    FAVORITES_FILE = os.path.join(BASE_DIR, "favorites.json")
+    # مصادر نص القرآن بالترتيب (الأسبق يغلب لكل آية): quran.json في الجذر مفهرس باسم السورة ويكمل ما ينقص
+    QURAN_FILES = (QURAN_FILE, os.path.join(BASE_DIR, "quran.json"))
+    FAVORITES_FILE = os.environ.get('FAVORITES_FILE', os.path.join(BASE_DIR, "favorites.json")) # الصيغة القديمة، تُنقل إلى FAVORITES_DB عند أول تشغيل
+    FAVORITES_DB = os.environ.get('FAVORITES_DB', os.path.join(BASE_DIR, "favorites.sqlite3"))
+    CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(BASE_DIR, "cache"))
+    CORPUS_DB = os.environ.get('QURANOMIND_CORPUS_DB', os.path.join(DATA_DIR, "corpus.sqlite3")) # يبنيه build_corpus.py، وبدونه تُقرأ ملفات JSON
+    AI_TAFSIR_DB = os.environ.get('AI_TAFSIR_DB', os.path.join(DATA_DIR, "ai_tafsir.sqlite3")) # يملؤه precompute_tafsir.py
+    TEMPLATE_CACHE_DIR = os.path.join(CACHE_DIR, "jinja") # القوالب المترجمة (bytecode) تبقى بعد إعادة التشغيل
+    FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES', 2000))
+    AUDIO_DIR = os.path.join(CACHE_DIR, "audio") # ملفات MP3 المولدة، اسم الملف بصمة (النص، اللغة)
+    AUDIO_MAX_AGE = 365 * 24 * 3600 # المحتوى لا يتغير لنفس البصمة، فيُخزَّن في المتصفح طويلاً
+    AUDIO_WARM_COUNT = int(os.environ.get('AUDIO_WARM_COUNT', 3)) # عدد عناصر القوائم التي يُولَّد صوتها مسبقاً في الخلفية
+    AUDIO_WARM_WORKERS = int(os.environ.get('AUDIO_WARM_WORKERS', 2))
+    TRANSLATION_DB = os.path.join(CACHE_DIR, "translations.sqlite3") # الترجمات الدائمة المشتركة بين العمال
+    TRANSLATE_WORKERS = int(os.environ.get('TRANSLATE_WORKERS', 4)) # أجزاء الترجمة المرسلة بالتوازي
+    TTS_WORKERS = int(os.environ.get('TTS_WORKERS', 4)) # أجزاء النص المولدة بالتوازي (مشتركة بين كل الطلبات)
+    TTS_CHUNK_CHARS = int(os.environ.get('TTS_CHUNK_CHARS', 300)) # الحد الأقصى لطول الجزء، يُقسم عند حدود الجمل
+
+    # ذاكرة Gemini المؤقتة الدائمة: مدة الصلاحية بالثواني والحد الأقصى لعدد الإجابات المخزنة
+    GEMINI_CACHE_FILE = os.path.join(CACHE_DIR, "gemini_cache.sqlite3")
+    GEMINI_CACHE_TTL = int(os.environ.get('GEMINI_CACHE_TTL', 30 * 24 * 3600))
+    GEMINI_CACHE_MAX_ENTRIES = int(os.environ.get('GEMINI_CACHE_MAX_ENTRIES', 20000))
+
+    AYAH_PAGE_MAX_AGE = int(os.environ.get('AYAH_PAGE_MAX_AGE', 0)) # ثوانٍ قبل إعادة التحقق (ETag) من صفحات /surah/<n>/ayah/<m>
+
+    # أدنى نسبة تداخل مقاطع (0..1) لقبول الآية المطابقة لجزء من نصها محلياً، وإلا يُسأل الذكاء الاصطناعي
+    AYAH_MATCH_MIN_SCORE = float(os.environ.get('AYAH_MATCH_MIN_SCORE', 0.6))
+
+    SEARCH_PAGE_SIZE = 10 # عدد نتائج البحث في الصفحة الواحدة
+    SEARCH_MAX_PAGE_SIZE = 50
+
+    API_BATCH_MAX_AYAHS = int(os.environ.get('API_BATCH_MAX_AYAHS', 300)) # الحد الأقصى للآيات في طلب مجمّع واحد
+    API_BATCH_WORKERS = int(os.environ.get('API_BATCH_WORKERS', 8)) # طلبات الذكاء الاصطناعي المتزامنة للآيات الناقصة
 
     GEMINI_MODEL = "gemini-1.5-flash" # يمكنك تجربة "gemini-1.5-pro" إذا احتجت دقة أكبر (مع استهلاك أكثر للتوكنز)
     GEMINI_API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
+    GEMINI_STREAM_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:streamGenerateContent?alt=sse"
+
+    # عميل Gemini: مهلة الاتصال ومهلة القراءة منفصلتان، وإعادة المحاولة وقاطع الدائرة
+    GEMINI_CONNECT_TIMEOUT = float(os.environ.get('GEMINI_CONNECT_TIMEOUT', 5))
+    GEMINI_READ_TIMEOUT = float(os.environ.get('GEMINI_READ_TIMEOUT', 60))
+    GEMINI_MAX_RETRIES = int(os.environ.get('GEMINI_MAX_RETRIES', 3))
+    GEMINI_BREAKER_THRESHOLD = int(os.environ.get('GEMINI_BREAKER_THRESHOLD', 5)) # عدد الإخفاقات المتتالية قبل فتح القاطع
+    GEMINI_BREAKER_RESET = float(os.environ.get('GEMINI_BREAKER_RESET', 30)) # ثوانٍ قبل السماح بطلب تجريبي
 
 # --- 2. إعداد تطبيق Flask ---
 app = Flask(__name__)
 app.config.from_object(Config)
+# القوالب من templates/ عبر FileSystemLoader الافتراضي في Flask، مع حفظ ترجمتها على القرص
+# فلا يعيد كل عامل جديد تحليل القوالب وترجمتها
+os.makedirs(app.config['TEMPLATE_CACHE_DIR'], exist_ok=True)
+app.jinja_options = {**app.jinja_options, 'bytecode_cache': FileSystemBytecodeCache(app.config['TEMPLATE_CACHE_DIR'])}
 app.secret_key = app.config['SECRET_KEY']
+app.json.ensure_ascii = False # ردود JSON بالعربية كما هي بدل \uXXXX (أصغر حجماً بكثير)
 
 # --- 3. تهيئة نظام التسجيل (Logging Configuration) ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -54,1074 +114,405 @@ def load_surah_names_data():
         logger.error(f"خطأ في تحميل أو فك ترميز ملف surahs.json: {e}. سيتم استخدام أسماء افتراضية.")
         return {str(i): {"arabic": f"السورة {i}", "english": f"Surah {i}"} for i in range(1, 115)}
 
-_surahs_data_cache = load_surah_names_data() # تحميل البيانات مرة واحدة عند بدء التطبيق
+@lru_cache(maxsize=1)
+def get_surahs_data():
+    """أسماء السور، تُحمَّل مرة واحدة عند أول استخدام (لا عند استيراد التطبيق)."""
+    return load_surah_names_data()
+
+@lru_cache(maxsize=1)
+def surah_resolver():
+    """جدول الأسماء الموحدة، يُحسب مرة واحدة عند أول استخدام."""
+    return SurahResolver(get_surahs_data())
 
-# تم إزالة lru_cache من get_surah_number لنتجنب TypeError: unhashable type: 'dict'
 def get_surah_number(input_value):
-    """يحدد رقم السورة بناءً على المدخل (إما رقم أو اسم السورة بالعربي/الإنجليزي)."""
-    surahs_data = _surahs_data_cache # استخدام البيانات المحملة مرة واحدة
-    
-    if not input_value: return None
-    input_value = input_value.strip().lower()
-
-    def normalize_arabic(text):
-        # إزالة التشكيل
-        text = re.sub(r'[ًٌٍَُِّّْ]', '', text)
-        # توحيد الهمزات والتاء المربوطة
-        text = re.sub(r'أ|إ|آ', 'ا', text)
-        text = re.sub(r'ة', 'ه', text)
-        return text
-
-    normalized_input = normalize_arabic(input_value)
-
-    if input_value.isdigit():
-        num = int(input_value)
-        return str(num) if 1 <= num <= 114 else None
-    
-    for num, names in surahs_data.items():
-        arabic_name = names.get("arabic", "").strip().lower()
-        english_name = names.get("english", "").strip().lower()
-        
-        if input_value == arabic_name or input_value == english_name: return num
-        if normalized_input == normalize_arabic(arabic_name): return num
-            
-    return None
+    """يحدد رقم السورة بناءً على المدخل (إما رقم أو اسم السورة بالعربي/الإنجليزي أو صيغة قريبة منه)."""
+    return surah_resolver().resolve(input_value)
 
 @lru_cache(maxsize=1)
 def load_quran_text():
-    """تحميل نص القرآن الكريم من ملف quran.json. إذا لم يكن موجوداً، سيتم الإبلاغ."""
-    if not os.path.exists(app.config['QURAN_FILE']):
-        logger.warning(f"ملف القرآن غير موجود: {app.config['QURAN_FILE']}. لن يتم عرض نص الآيات من ملف محلي.")
-        return {} # سيتم جلب الآية من AI لاحقاً إذا لزم الأمر
-    try:
-        with open(app.config['QURAN_FILE'], 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data if data else {}
-    except (json.JSONDecodeError, Exception) as e:
-        logger.error(f"خطأ في تحميل أو فك ترميز ملف quran.json: {e}. لن يتم عرض نص الآيات من ملف محلي.")
-        return {}
+    """تحميل نص القرآن الكريم من QURAN_FILES (أو من الملف المترجم) في مصفوفة مسطحة QuranText، مرة واحدة."""
+    quran = quran_text.load(app.config['QURAN_FILES'], surah_resolver(), compiled=_tafsir_corpus.compiled())
+    if not len(quran):
+        logger.warning(f"لا يوجد نص قرآن محلي في {', '.join(app.config['QURAN_FILES'])}. سيتم جلب الآيات من الذكاء الاصطناعي.")
+    else:
+        logger.info(f"تم تحميل نص القرآن: {len(quran)} آية من {quran_text.TOTAL_AYAHS}.")
+    return quran
 
 def get_ayah_text_from_quran_json(surah_number, ayah_number, quran_data):
-    """يسترد نص آية محددة من بيانات القرآن المحملة محلياً."""
-    surah_key = str(surah_number)
-    ayah_key = str(ayah_number)
-    return quran_data.get(surah_key, {}).get(ayah_key)
+    """يسترد نص آية محددة من نص القرآن المحمل محلياً (فهرسة مباشرة في المصفوفة)."""
+    return quran_data.ayah(surah_number, ayah_number)
 
 def get_total_ayahs_in_surah(surah_number, quran_data):
-    """يعيد إجمالي عدد الآيات في سورة معينة من بيانات quran.json."""
-    surah_key = str(surah_number)
-    return len(quran_data.get(surah_key, {}))
+    """يعيد إجمالي عدد الآيات في سورة معينة (من جدول المصحف، لا من الملف)."""
+    return quran_data.total_ayahs(surah_number)
+
+_tafsir_corpus = Corpus([app.config['TAFSIR_DIR']], db_path=app.config['CORPUS_DB']) # التفسير الميسر المحلي
 
 @lru_cache(maxsize=128)
 def get_tafsir_data_local(surah_number):
-    """تحميل بيانات التفسير لسورة معينة من ملف JSON الخاص بها. يعيد { } إذا لم يكن موجوداً."""
-    path = os.path.join(app.config['TAFSIR_DIR'], f"{surah_number}.json")
-    if not os.path.exists(path):
-        logger.warning(f"ملف التفسير الميسر غير موجود للسورة {surah_number}: {path}. سيتم استخدام الذكاء الاصطناعي.")
-        return {}
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, Exception) as e:
-        logger.error(f"خطأ في تحميل أو فك ترميز JSON التفسير الميسر للسورة {surah_number}: {e}. سيتم استخدام الذكاء الاصطناعي.")
-        return {}
+    """بيانات التفسير لسورة معينة {رقم الآية (نص): التفسير}. يعيد { } إذا لم تكن موجودة."""
+    tafsir = _tafsir_corpus.surah(surah_number)
+    if not tafsir:
+        logger.warning(f"ملف التفسير الميسر غير موجود للسورة {surah_number} في {app.config['TAFSIR_DIR']}. سيتم استخدام الذكاء الاصطناعي.")
+    return {str(ayah_number): text for ayah_number, text in tafsir.items()}
+
+_gemini_cache = GeminiCache(app.config['GEMINI_CACHE_FILE'],
+                            ttl_seconds=app.config['GEMINI_CACHE_TTL'],
+                            max_entries=app.config['GEMINI_CACHE_MAX_ENTRIES'])
+
+_ai_tafsir_store = AiTafsirStore(app.config['AI_TAFSIR_DB']) # التفاسير المحسوبة مسبقاً (بلا شبكة)
+
+_gemini_client = GeminiClient(app.config['GEMINI_API_KEY'], app.config['GEMINI_API_URL'],
+                              stream_url=app.config['GEMINI_STREAM_URL'],
+                              connect_timeout=app.config['GEMINI_CONNECT_TIMEOUT'],
+                              read_timeout=app.config['GEMINI_READ_TIMEOUT'],
+                              max_retries=app.config['GEMINI_MAX_RETRIES'],
+                              breaker_threshold=app.config['GEMINI_BREAKER_THRESHOLD'],
+                              breaker_reset=app.config['GEMINI_BREAKER_RESET'])
+
+def gemini_key_configured():
+    """هل تم تكوين مفتاح Gemini API؟"""
+    return bool(app.config['GEMINI_API_KEY']) and app.config['GEMINI_API_KEY'] != 'YOUR_ACTUAL_GEMINI_API_KEY_HERE'
+
+def notify(message, category='message'):
+    """يسجل رسالة للمستخدم في الطلب الحالي بدل flash مباشرة.
+
+    الدوال المشتركة بين صفحات HTML وواجهة JSON تستخدمها، وتعرضها render_page وحدها
+    (عبر flash)، فلا تكتب طلبات الواجهة رسائل في الجلسة تظهر لاحقاً في صفحة أخرى.
+    """
+    if has_request_context():
+        g.setdefault('notices', []).append((message, category))
+
+# دمج الاستدعاءات المتطابقة الجارية لـ Gemini والترجمة وتحويل النص إلى كلام
+_inflight = SingleFlight()
 
 def ask_gemini(prompt):
-    """يرسل طلباً إلى Gemini API ويعيد الاستجابة."""
-    if not app.config['GEMINI_API_KEY'] or app.config['GEMINI_API_KEY'] == 'YOUR_ACTUAL_GEMINI_API_KEY_HERE':
+    """يرسل طلباً إلى Gemini API ويعيد الاستجابة (من الذاكرة المؤقتة الدائمة إن وُجدت).
+
+    الطلبات المتطابقة المتزامنة تنتظر استدعاءً واحداً جارياً وتتشارك نتيجته.
+    """
+    key = ('gemini', cache_key(app.config['GEMINI_MODEL'], prompt))
+    return _inflight.do(key, _ask_gemini, prompt)
+
+def _ask_gemini(prompt):
+    cached = _gemini_cache.get(app.config['GEMINI_MODEL'], prompt)
+    if cached is not None:
+        logger.info("تم جلب استجابة Gemini من الذاكرة المؤقتة.")
+        return cached
+
+    if not gemini_key_configured():
         logger.error("خطأ: لم يتم تكوين مفتاح Gemini API. يرجى إضافته إلى app.py أو كمتغير بيئة.")
-        flash("عذرًا، لم يتم تكوين مفتاح API الخاص بـ Gemini بشكل صحيح. يرجى إعلام المسؤول.", "error")
+        notify("عذرًا، لم يتم تكوين مفتاح API الخاص بـ Gemini بشكل صحيح. يرجى إعلام المسؤول.", "error")
         return None
 
-    headers = {
-        "Content-Type": "application/json",
-        "X-goog-api-key": app.config['GEMINI_API_KEY']
-    }
-    payload = {
-        "contents": [
-            {"parts": [{"text": prompt}]}
-        ]
-    }
+    import requests # يُستورد مع أول طلب فعلي للشبكة (لأصناف الاستثناءات أدناه) لا عند بدء التطبيق
     try:
-        res = requests.post(app.config['GEMINI_API_URL'], headers=headers, json=payload, timeout=90) # زيادة المهلة
-        res.raise_for_status()
-        data = res.json()
-        if data and 'candidates' in data and data['candidates']:
-            return data['candidates'][0]['content']['parts'][0]['text']
-        else:
-            logger.warning(f"Gemini API لم تُعد أي مرشحات أو استجابة صالحة: {json.dumps(data, ensure_ascii=False)}")
-            flash("عذرًا، لم يستجب الذكاء الاصطناعي بشكل مفهوم. يرجى المحاولة مرة أخرى.", "warning")
-            return None
+        answer = _gemini_client.generate(prompt)
+        _gemini_cache.set(app.config['GEMINI_MODEL'], prompt, answer)
+        return answer
+    except GeminiEmptyResponse as e:
+        logger.warning(f"Gemini API لم تُعد أي مرشحات أو استجابة صالحة: {json.dumps(e.data, ensure_ascii=False)}")
+        notify("عذرًا، لم يستجب الذكاء الاصطناعي بشكل مفهوم. يرجى المحاولة مرة أخرى.", "warning")
+        return None
+    except GeminiCircuitOpen:
+        logger.warning("تم رفض طلب Gemini لأن قاطع الدائرة مفتوح (الخدمة متعثرة).")
+        notify("خدمة الذكاء الاصطناعي غير متاحة مؤقتاً. يرجى المحاولة بعد قليل.", "error")
+        return None
     except requests.exceptions.Timeout:
         logger.error("انتهت مهلة طلب Gemini API.")
-        flash("انتهت مهلة طلب تفسير الذكاء الاصطناعي. قد تكون الشبكة بطيئة.", "error")
+        notify("انتهت مهلة طلب تفسير الذكاء الاصطناعي. قد تكون الشبكة بطيئة.", "error")
         return None
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, GeminiError) as e:
         logger.error(f"فشل الاتصال بـ Gemini API: {e}")
-        flash(f"فشل في الاتصال بخدمة الذكاء الاصطناعي: {e}", "error")
+        notify(f"فشل في الاتصال بخدمة الذكاء الاصطناعي: {e}", "error")
         return None
     except Exception as e:
         logger.error(f"حدث خطأ غير متوقع أثناء الاتصال بـ Gemini API: {e}")
-        flash(f"حدث خطأ غير متوقع أثناء المعالجة: {e}", "error")
+        notify(f"حدث خطأ غير متوقع أثناء المعالجة: {e}", "error")
         return None
 
-@lru_cache(maxsize=1024)
+_translator = BatchTranslator(TranslationStore(app.config['TRANSLATION_DB']),
+                              max_workers=app.config['TRANSLATE_WORKERS'])
+
 def translate_text(text, to_lang='en'):
-    """يترجم النص باستخدام مترجم جوجل (deep_translator)."""
+    """يترجم النص باستخدام مترجم جوجل (deep_translator) مع تخزين الترجمة بشكل دائم."""
     if not text: return None
-    try:
-        return GoogleTranslator(source='auto', target=to_lang).translate(text)
-    except Exception as e:
-        logger.error(f"فشلت الترجمة للنص '{text[:50]}...': {e}")
-        return None
+    return _inflight.do(('translate', to_lang, text), _translator.translate, text, to_lang)
+
+def translate_items(items, field='tafsir', to_lang='en'):
+    """يترجم حقل field لكل عناصر القائمة دفعة واحدة ويضع الناتج في 'translated' (إن لم يكن موجوداً)."""
+    needed = [item for item in items if item.get(field) and not item.get('translated')]
+    if not needed:
+        return
+    translations = _translator.translate_many([item[field] for item in needed], to_lang)
+    for item, translated in zip(needed, translations):
+        item['translated'] = translated
 
-def text_to_speech_base64(text, lang='ar'):
-    """يحول النص إلى كلام ويعيده كـ Base64 لدمجه في HTML."""
+_audio_store = AudioStore(app.config['AUDIO_DIR'])
+
+def deferred_audio_url(text, lang='ar'):
+    """يعيد رابط الصوت دون توليده؛ يُولَّد عند أول طلب للرابط (أو من المُسخِّن في الخلفية)."""
     if not text: return None
+    audio_hash = audio_id(text, lang)
+    _audio_store.register(audio_hash, text, lang)
+    return url_for('serve_audio', audio_hash=audio_hash)
+
+def ensure_audio(audio_hash, text, lang):
+    """يولد ملف الصوت إن لم يكن موجوداً ويعيد True عند توفره."""
+    if _audio_store.exists(audio_hash):
+        return True
+    return _inflight.do(('tts', audio_hash), _synthesize_audio, audio_hash, text, lang)
+
+_audio_warmer = ThreadPoolExecutor(max_workers=app.config['AUDIO_WARM_WORKERS'], thread_name_prefix='audio-warm')
+
+def attach_deferred_audio(items, lang='ar'):
+    """يضع رابطاً مؤجلاً لصوت تفسير كل عنصر في القائمة، ويسخّن أول AUDIO_WARM_COUNT منها في الخلفية."""
+    for index, item in enumerate(items):
+        item['audio_url'] = deferred_audio_url(item['tafsir'], lang=lang)
+        if item['audio_url'] and index < app.config['AUDIO_WARM_COUNT']:
+            _audio_warmer.submit(ensure_audio, audio_id(item['tafsir'], lang), item['tafsir'], lang)
+
+def _synthesize_chunk(text, lang):
+    """يحول جزءاً واحداً من النص إلى بايتات MP3."""
+    from gtts import gTTS # يُستورد عند أول توليد صوت لا عند بدء التطبيق
+    tts = gTTS(text=text, lang=lang, slow=False)
+    audio_buffer = io.BytesIO()
+    tts.write_to_fp(audio_buffer)
+    return audio_buffer.getvalue()
+
+_tts = ChunkedTTS(_synthesize_chunk, max_workers=app.config['TTS_WORKERS'], max_chars=app.config['TTS_CHUNK_CHARS'])
+
+def _synthesize_audio(audio_hash, text, lang):
+    if _audio_store.exists(audio_hash): # ربما أنهاه استدعاء سابق أثناء الانتظار
+        return True
     try:
-        tts = gTTS(text=text, lang=lang, slow=False)
-        audio_buffer = io.BytesIO()
-        tts.write_to_fp(audio_buffer)
-        audio_buffer.seek(0)
-        return base64.b64encode(audio_buffer.read()).decode('utf-8')
+        _audio_store.write(audio_hash, _tts.stream(text, lang))
+        return True
     except Exception as e:
         logger.error(f"فشل تحويل النص إلى كلام: {e}")
+        return False
+
+def stream_audio(audio_hash, text, lang):
+    """يولد الجزء الأول من MP3 ويعيد (الجزء الأول، مولّد الباقي) ليُبثا أثناء التوليد، أو None عند الفشل.
+
+    توليد الجزء الأول قبل إرسال الرأس يجعل فشل الخدمة خطأً صريحاً بدل رد 200 فارغ.
+    الملف يُحفظ في المخزن عند استهلاك المولّد كاملاً، وإغلاقه قبل ذلك يحذف الملف المؤقت.
+    """
+    chunks = _audio_store.write_stream(audio_hash, _tts.stream(text, lang))
+    try:
+        return next(chunks), chunks
+    except Exception as e: # يشمل StopIteration لنص بلا أجزاء
+        logger.error(f"فشل تحويل النص إلى كلام: {e!r}")
+        chunks.close()
         return None
 
-def search_in_tafasir_local(query, surahs_data, quran_data):
+@lru_cache(maxsize=1)
+def tafsir_index():
+    """يبني الفهرس المقلوب لجميع ملفات التفسير المحلية المتوفرة (مرة واحدة عند أول بحث)."""
+    index = TafsirIndex()
+    tafsir_dir = app.config['TAFSIR_DIR']
+    if not os.path.isdir(tafsir_dir):
+        logger.warning(f"مجلد التفاسير غير موجود: {tafsir_dir}. لن يتوفر البحث المحلي.")
+        return index
+    for surah_number in _tafsir_corpus.surah_numbers():
+        for ayah_num, tafsir_text in get_tafsir_data_local(str(surah_number)).items():
+            index.add(surah_number, ayah_num, tafsir_text)
+    logger.info(f"تم بناء فهرس البحث: {len(index)} آية، {len(index.postings)} كلمة.")
+    return index
+
+def search_in_tafasir_local(query, surahs_data, quran_data, page=1, page_size=None):
     """
-    يبحث عن الكلمات المفتاحية في جميع التفاسير المحلية المتاحة (التفسير الميسر حالياً).
-    يعيد قائمة بالآيات المطابقة مع تفسيرها.
+    يبحث عن الكلمات المفتاحية في جميع التفاسير المحلية المتاحة (التفسير الميسر حالياً) عبر الفهرس المقلوب.
+    يدعم العبارات بين علامتي تنصيص وعوامل AND (افتراضي) و OR.
+    يعيد (إجمالي عدد المطابقات, نتائج الصفحة المطلوبة) مرتبة حسب الصلة (BM25).
     """
+    page_size = page_size or app.config['SEARCH_PAGE_SIZE']
+    total, ranked = tafsir_index().search_ranked(query, page=page, page_size=page_size)
     results = []
-    # Loop through surah numbers from 1 to 114
-    for surah_num_str in map(str, range(1, 115)): 
-        tafsir_data = get_tafsir_data_local(surah_num_str) 
-        
-        if not tafsir_data: # تخطي السور التي ليس لها ملف تفسير محلي
+    for surah_num_str, ayah_num, score in ranked:
+        tafsir_text = get_tafsir_data_local(surah_num_str).get(ayah_num)
+        if tafsir_text is None:
             continue
-
         surah_name_arabic = surahs_data.get(surah_num_str, {}).get("arabic", f"السورة {surah_num_str}")
-        
-        for ayah_num, tafsir_text in tafsir_data.items():
-            if query.lower() in tafsir_text.lower():
-                ayah_text = get_ayah_text_from_quran_json(surah_num_str, ayah_num, quran_data)
-                results.append({
-                    "surah_name": surah_name_arabic,
-                    "surah_number": surah_num_str,
-                    "ayah_number": ayah_num,
-                    "ayah_text": ayah_text, 
-                    "tafsir": tafsir_text,
-                    "hash": hashlib.md5(f"{surah_num_str}-{ayah_num}-{tafsir_text}".encode()).hexdigest()
-                })
-    return results
+        ayah_text = get_ayah_text_from_quran_json(surah_num_str, ayah_num, quran_data)
+        results.append({
+            "surah_name": surah_name_arabic,
+            "surah_number": surah_num_str,
+            "ayah_number": ayah_num,
+            "ayah_text": ayah_text, 
+            "tafsir": tafsir_text,
+            "score": round(score, 3),
+            "hash": hashlib.md5(f"{surah_num_str}-{ayah_num}-{tafsir_text}".encode()).hexdigest()
+        })
+    return total, results
+
+def parse_pagination(source):
+    """يقرأ page و page_size من بيانات الطلب مع حصرهما في حدود مقبولة."""
+    try:
+        page = max(1, int(source.get('page', 1)))
+    except (TypeError, ValueError):
+        page = 1
+    try:
+        page_size = int(source.get('page_size', app.config['SEARCH_PAGE_SIZE']))
+    except (TypeError, ValueError):
+        page_size = app.config['SEARCH_PAGE_SIZE']
+    page_size = min(max(1, page_size), app.config['SEARCH_MAX_PAGE_SIZE'])
+    return page, page_size
+
+_favorites_store = FavoritesStore(app.config['FAVORITES_DB'])
+try:
+    _migrated = _favorites_store.migrate_json(app.config['FAVORITES_FILE'])
+    if _migrated:
+        logger.info(f"تم نقل {_migrated} عنصراً من favorites.json إلى مخزن المفضلة.")
+except (json.JSONDecodeError, OSError) as e:
+    logger.error(f"تعذر نقل ملف المفضلة القديم favorites.json: {e}")
 
 def load_favorites():
-    """تحميل قائمة المفضلة من ملف JSON."""
-    if not os.path.exists(app.config['FAVORITES_FILE']):
-        return []
+    """تحميل قائمة المفضلة كاملة (لعرضها فقط؛ لفحص العضوية استخدم favorite_hashes)."""
     try:
-        with open(app.config['FAVORITES_FILE'], 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        logger.error("خطأ في قراءة ملف المفضلة، سيتم إنشاء ملف جديد.")
-        flash("حدث خطأ في قراءة المفضلة، سيتم البدء بقائمة جديدة.", "error")
-        return [] 
+        return _favorites_store.all()
     except Exception as e:
-        logger.error(f"خطأ غير متوقع عند تحميل ملف المفضلة: {e}")
+        logger.error(f"خطأ غير متوقع عند تحميل المفضلة: {e}")
         flash(f"حدث خطأ غير متوقع عند تحميل المفضلة: {e}", "error")
         return []
 
-def save_favorites(favorites):
-    """حفظ قائمة المفضلة إلى ملف JSON."""
+def favorite_hashes(hashes):
+    """البصمات الموجودة في المفضلة من بين hashes، باستعلام واحد مفهرس."""
     try:
-        with open(app.config['FAVORITES_FILE'], 'w', encoding='utf-8') as f:
-            json.dump(favorites, f, ensure_ascii=False, indent=4)
+        return _favorites_store.contains_many(hashes)
     except Exception as e:
-        logger.error(f"خطأ في حفظ المفضلة: {e}")
-        flash(f"حدث خطأ في حفظ المفضلة: {e}", "error")
+        logger.error(f"خطأ غير متوقع عند فحص المفضلة: {e}")
+        return set()
 
-# --- 5. قالب HTML (Improved HTML Template with new features) ---
-HTML_TEMPLATE = '''
-<!DOCTYPE html>
-<html lang="ar" dir="rtl">
-<head>
-    <meta charset="UTF-8">
-    <title>المصباح الوهّاج - تفسير وذكاء</title>
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <link href="https://fonts.googleapis.com/css2?family=Cairo:wght@400;700&family=Amiri+Quran&display=swap" rel="stylesheet">
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0-beta3/css/all.min.css">
-    <style>
-        /* CSS styles */
-        :root {
-            --bg-gradient-start: rgba(0, 0, 0, 0.6); /* Darker overlay */
-            --bg-gradient-end: rgba(0, 0, 0, 0.6);   /* Darker overlay */
-            --bg-image: url('https://i.imgur.com/eQ4L2Z2.jpg'); /* Luxurious Islamic Pattern */
-            --text-color: #000; /* Black text for light mode */
-            --heading-color: #000; /* Black headings for light mode */
-            --form-bg: #ffffff;
-            --form-shadow: rgba(0,0,0,0.1);
-            --border-color-form: #4CAF50; /* Green */
-            --input-bg: #f8f8f8;
-            --input-focus-bg: #ffffff;
-            --input-focus-shadow: rgba(76,175,80,0.3);
-            --button-bg: #4CAF50; /* Green */
-            --button-hover-bg: #45a049;
-            --button-shadow: rgba(76,175,80,0.4);
-            --result-bg: #ffffff;
-            --result-shadow: rgba(0,0,0,0.1);
-            --result-border-left: #0f3460;
-            --result-divider: #eee;
-            --error-bg: #ffebee;
-            --error-border: #f44336;
-            --error-shadow: rgba(244,67,54,0.3);
-            --footer-color: #777;
-            --spinner-border-top: #4CAF50;
-            --flash-success-bg: #e8f5e9;
-            --flash-success-border: #4CAF50;
-            --flash-error-bg: #ffebee;
-            --flash-error-border: #f44336;
-            --flash-warning-bg: #fffde7;
-            --flash-warning-border: #ffeb3b;
-            --copy-button-bg: #607d8b; /* Blue Grey */
-            --copy-button-hover-bg: #546e7a;
-            --nav-button-bg: #7986cb; /* Indigo light */
-            --nav-button-hover-bg: #606fc7;
-            --nav-button-border: #9fa8da;
-        }
-
-        body.dark-mode {
-            --bg-gradient-start: rgba(0,0,0,0.85);
-            --bg-gradient-end: rgba(0,0,0,0.85);
-            --text-color: #f0f0f0; /* Light text for dark mode */
-            --heading-color: #ffeb3b; /* Brighter gold for dark mode headings */
-            --form-bg: #1a1a2e; /* Darker form background */
-            --form-shadow: rgba(0,0,0,0.9);
-            --border-color-form: #4caf50; /* A bit lighter green */
-            --input-bg: #22223b;
-            --input-focus-bg: #2a2a4f;
-            --input-focus-shadow: rgba(76,175,80,0.7);
-            --button-bg: #4caf50; /* Darker green for button */
-            --button-hover-bg: #388e3c;
-            --button-shadow: rgba(76,175,80,0.4);
-            --result-bg: #1a1a2e;
-            --result-shadow: rgba(0,0,0,0.7);
-            --result-border-left: #ffeb3b;
-            --result-divider: #3a3f5c;
-            --error-bg: #5c1b1b;
-            --error-border: #ef5350;
-            --error-shadow: rgba(239,83,80,0.5);
-            --footer-color: #aaa;
-            --spinner-border-top: #4caf50;
-            --flash-success-bg: #2e5c3e;
-            --flash-success-border: #4caf50;
-            --flash-error-bg: #5c2e2e;
-            --flash-error-border: #ef5350;
-            --flash-warning-bg: #5c5c2e;
-            --flash-warning-border: #ffeb3b;
-            --copy-button-bg: #6a8cb0; 
-            --copy-button-hover-bg: #5a7b9f;
-            --nav-button-bg: #4a577b;
-            --nav-button-hover-bg: #3a476b;
-            --nav-button-border: #6a779b;
-        }
-        
-        body { 
-            background: linear-gradient(var(--bg-gradient-start), var(--bg-gradient-end)), var(--bg-image) no-repeat center center fixed;
-            background-size: cover;
-            color: var(--text-color); 
-            font-family: 'Cairo', sans-serif; 
-            max-width: 900px;
-            margin: auto; 
-            padding: 2rem; 
-            line-height: 1.8;
-            box-shadow: 0 0 50px rgba(0, 0, 0, 0.8);
-            border-radius: 15px;
-        }
-        h2 { 
-            color: var(--heading-color); 
-            text-align: center; 
-            margin-bottom: 2.5rem;
-            font-size: 3rem;
-            letter-spacing: 2px;
-            font-family: 'Amiri Quran', serif;
-            text-shadow: 0 0 15px rgba(0,0,0,0.3); /* Adjust shadow for black text */
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            gap: 15px;
-        }
-        h2 i {
-            color: var(--border-color-form);
-            font-size: 2.5rem;
-        }
-        form { 
-            background: var(--form-bg); 
-            padding: 3rem;
-            border-radius: 20px; 
-            box-shadow: 0 10px 30px var(--form-shadow);
-            transition: all 0.3s ease;
-            border: 1px solid var(--border-color-form);
-        }
-        form:hover {
-            box-shadow: 0 15px 40px var(--form-shadow);
-            transform: translateY(-3px);
-        }
-        label { 
-            display: block; 
-            margin-top: 1.8rem;
-            font-weight: bold; 
-            color: var(--text-color);
-            font-size: 1.2rem;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }
-        input, select, textarea { 
-            width: calc(100% - 24px);
-            padding: 1rem 12px;
-            margin-top: 0.7rem; 
-            border-radius: 12px;
-            border: 1px solid var(--form-bg); 
-            background: var(--input-bg); 
-            color: var(--text-color); 
-            font-size: 1.1rem;
-            box-sizing: border-box; 
-            transition: all 0.3s ease;
-        }
-        input:focus, select:focus, textarea:focus {
-            outline: none;
-            border-color: var(--border-color-form);
-            box-shadow: 0 0 12px var(--input-focus-shadow);
-            background: var(--input-focus-bg);
-        }
-        textarea {
-            resize: vertical;
-            min-height: 120px;
-        }
-        button { 
-            margin-top: 2.5rem; 
-            width: 100%; 
-            padding: 1.4rem;
-            background: var(--button-bg); 
-            color: white; 
-            border: none; 
-            border-radius: 12px; 
-            font-size: 1.5rem;
-            cursor: pointer; 
-            transition: background 0.3s ease, transform 0.2s ease, box-shadow 0.3s ease;
-            font-weight: bold;
-            box-shadow: 0 5px 15px var(--button-shadow);
-        }
-        button:hover {
-            background: var(--button-hover-bg);
-            transform: translateY(-4px);
-            box-shadow: 0 8px 20px var(--button-shadow);
-        }
-        button:active {
-            transform: translateY(0);
-            box-shadow: 0 2px 5px var(--button-shadow);
-        }
-        .result { 
-            background: var(--result-bg); 
-            margin-top: 3.5rem;
-            padding: 2rem;
-            border-radius: 18px; 
-            box-shadow: 0 8px 25px var(--result-shadow); 
-            border-left: 6px solid var(--result-border-left);
-            font-size: 1.1rem;
-            animation: fadeIn 1s ease-out; /* Fade-in animation */
-        }
-        .result p {
-            margin-bottom: 1.2rem;
-            padding-bottom: 1.2rem;
-            border-bottom: 1px dashed var(--result-divider);
-        }
-        .result p:last-child {
-            border-bottom: none;
-            margin-bottom: 0;
-            padding-bottom: 0;
-        }
-        .result strong {
-            color: var(--border-color-form);
-            font-size: 1.2rem;
-        }
-        .error-message { 
-            color: var(--error-border); 
-            margin-top: 2rem; 
-            text-align: center; 
-            font-weight: bold;
-            background-color: var(--error-bg);
-            padding: 1.2rem;
-            border-radius: 12px;
-            border: 1px solid var(--error-border);
-            box-shadow: 0 0 15px var(--error-shadow);
-            animation: shake 0.5s ease-in-out;
-        }
-        .loading-spinner {
-            display: none;
-            border: 5px solid rgba(255, 255, 255, 0.3);
-            border-radius: 50%;
-            border-top: 5px solid var(--spinner-border-top);
-            width: 40px;
-            height: 40px;
-            -webkit-animation: spin 1s linear infinite;
-            animation: spin 1s linear infinite;
-            margin: 30px auto;
-        }
-
-        /* Animations */
-        @-webkit-keyframes spin { 0% { -webkit-transform: rotate(0deg); } 100% { -webkit-transform: rotate(360deg); } }
-        @keyframes spin { 0% { transform: rotate(0deg); } 100% { transform: rotate(360deg); } }
-        @keyframes fadeIn { from { opacity: 0; transform: translateY(20px); } to { opacity: 1; transform: translateY(0); } }
-        @keyframes shake { 0%, 100% { transform: translateX(0); } 10%, 30%, 50%, 70%, 90% { transform: translateX(-5px); } 20%, 40%, 60%, 80% { transform: translateX(5px); } }
-        
-        .footer {
-            text-align: center;
-            margin-top: 4rem;
-            padding-top: 1.5rem;
-            border-top: 1px dashed var(--result-divider);
-            color: var(--footer-color);
-            font-size: 0.9rem;
-        }
-        .footer a {
-            color: var(--button-bg);
-            text-decoration: none;
-            font-weight: bold;
-            transition: color 0.3s ease;
-        }
-        .footer a:hover {
-            color: var(--button-hover-bg);
-            text-decoration: underline;
-        }
-        .footer strong {
-            font-family: 'Amiri Quran', serif;
-            font-size: 1.1rem;
-            color: var(--heading-color); /* Use heading color for developer name */
-        }
-
-        /* Audio player styling */
-        .audio-player {
-            display: flex;
-            align-items: center;
-            gap: 10px;
-            margin-top: 15px;
-            background: rgba(76, 175, 80, 0.1);
-            padding: 10px 15px;
-            border-radius: 10px;
-            border: 1px solid var(--border-color-form);
-            color: var(--text-color);
-        }
-        .audio-player i {
-            color: var(--border-color-form);
-            font-size: 1.5rem;
-        }
-        .audio-player audio {
-            flex-grow: 1;
-            height: 35px;
-            background: var(--input-bg);
-            border-radius: 8px;
-        }
-        .audio-player audio::-webkit-media-controls-panel {
-            background-color: var(--input-bg);
-            border-radius: 8px;
-        }
-        .audio-player audio::-webkit-media-controls-play-button,
-        .audio-player audio::-webkit-media-controls-timeline,
-        .audio-player audio::-webkit-media-controls-volume-slider {
-            color: var(--border-color-form);
-        }
-
-        /* Favorites button */
-        .favorite-actions {
-            display: flex;
-            gap: 10px;
-            margin-top: 15px;
-            justify-content: flex-end; /* Align to the right */
-        }
-        .action-button {
-            background: #ffc107; /* Gold color */
-            color: #333;
-            border: none;
-            padding: 8px 15px;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 0.9rem;
-            display: inline-flex;
-            align-items: center;
-            gap: 5px;
-            transition: background 0.3s ease, transform 0.2s ease;
-        }
-        .action-button:hover {
-            background: #e0a800;
-            transform: translateY(-2px);
-        }
-        .action-button i {
-            color: #333;
-        }
-        .action-button.remove {
-            background: #dc3545; /* Red for remove */
-            color: white;
-        }
-        .action-button.remove i {
-            color: white;
-        }
-        .action-button.disabled {
-            background: #6c757d; /* Grey for disabled */
-            cursor: not-allowed;
-            opacity: 0.7;
-        }
-        .action-button.disabled:hover {
-            transform: translateY(0);
-        }
-
-        /* Copy button specific style */
-        .action-button.copy {
-            background: var(--copy-button-bg);
-            color: white;
-        }
-        .action-button.copy:hover {
-            background: var(--copy-button-hover-bg);
-        }
-        .action-button.copy i {
-            color: white;
-        }
-
-        /* Navigation buttons (prev/next ayah) */
-        .navigation-buttons {
-            display: flex;
-            justify-content: space-between;
-            margin-top: 20px;
-            gap: 10px;
-        }
-        .nav-button {
-            flex: 1; /* Make buttons take equal width */
-            background: var(--nav-button-bg);
-            color: white;
-            border: 1px solid var(--nav-button-border);
-            padding: 10px 15px;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 1rem;
-            display: inline-flex;
-            align-items: center;
-            justify-content: center;
-            gap: 8px;
-            transition: background 0.3s ease, transform 0.2s ease;
-        }
-        .nav-button:hover {
-            background: var(--nav-button-hover-bg);
-            transform: translateY(-2px);
-        }
-        .nav-button:disabled {
-            background: #444;
-            border-color: #555;
-            color: #888;
-            cursor: not-allowed;
-            transform: translateY(0);
-        }
-        .nav-button.prev { order: 1; } /* Ensure Previous is on the right in RTL */
-        .nav-button.next { order: 2; } /* Ensure Next is on the left in RTL */
-
-
-        /* Favorites list styling */
-        .favorites-list {
-            background: var(--result-bg); 
-            margin-top: 3.5rem;
-            padding: 2rem;
-            border-radius: 18px; 
-            box-shadow: 0 8px 25px var(--result-shadow); 
-            border-left: 6px solid var(--result-border-left);
-            font-size: 1.1rem;
-        }
-        .favorites-list h3 {
-            color: var(--heading-color);
-            margin-bottom: 1.5rem;
-            text-align: center;
-            font-size: 2rem;
-            text-shadow: 0 0 10px rgba(0,0,0,0.3); /* Adjust shadow for black text */
-        }
-        .favorites-list .favorite-item {
-            padding: 1.5rem 0;
-            border-bottom: 1px dashed var(--result-divider);
-            margin-bottom: 1.5rem;
-            display: flex;
-            flex-direction: column;
-            gap: 10px;
-        }
-        .favorites-list .favorite-item:last-child {
-            border-bottom: none;
-            margin-bottom: 0;
-        }
-        .favorite-item strong {
-            color: var(--border-color-form);
-            font-size: 1.2rem;
-            display: block;
-            margin-bottom: 0.5rem;
-        }
-        .favorite-item .item-details {
-            display: flex;
-            flex-direction: column;
-            gap: 8px;
-        }
-        .favorite-item .item-actions {
-            align-self: flex-end; /* Align button to the right */
-        }
-        /* Flash messages */
-        .flash-message {
-            padding: 1rem;
-            margin-bottom: 1.5rem;
-            border-radius: 10px;
-            font-weight: bold;
-            text-align: center;
-            animation: fadeIn 0.5s ease-out;
-            border: 1px solid;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            gap: 10px;
-        }
-        .flash-message.success {
-            background-color: var(--flash-success-bg);
-            border-color: var(--flash-success-border);
-            color: var(--flash-success-border);
-        }
-        .flash-message.error {
-            background-color: var(--flash-error-bg);
-            border-color: var(--flash-error-border);
-            color: var(--flash-error-border);
-        }
-        .flash-message.warning {
-            background-color: var(--flash-warning-bg);
-            border-color: var(--flash-warning-border);
-            color: var(--flash-warning-border);
-        }
-        .input-group {
-            display: none; /* Hidden by default, JavaScript will show them */
-        }
-        .input-group.active {
-            display: block;
-        }
-        /* Hide Interpreter selection by default for Dream/Favorites */
-        #interpreterLabel, #interpreter {
-            display: none;
-        }
-
-        /* Dark Mode Toggle Switch CSS */
-        .switch {
-            position: relative;
-            display: inline-block;
-            width: 60px;
-            height: 34px;
-            vertical-align: middle;
-            margin-left: 15px; /* Adjust as needed for RTL */
-        }
-
-        .switch input {
-            opacity: 0;
-            width: 0;
-            height: 0;
-        }
-
-        .slider {
-            position: absolute;
-            cursor: pointer;
-            top: 0;
-            left: 0;
-            right: 0;
-            bottom: 0;
-            background-color: #ccc;
-            -webkit-transition: .4s;
-            transition: .4s;
-            border-radius: 34px;
-        }
-
-        .slider:before {
-            position: absolute;
-            content: "";
-            height: 26px;
-            width: 26px;
-            left: 4px;
-            bottom: 4px;
-            background-color: white;
-            -webkit-transition: .4s;
-            transition: .4s;
-            border-radius: 50%;
-        }
-
-        input:checked + .slider {
-            background-color: var(--button-bg);
-        }
-
-        input:focus + .slider {
-            box-shadow: 0 0 1px var(--button-bg);
-        }
-
-        input:checked + .slider:before {
-            -webkit-transform: translateX(26px);
-            -ms-transform: translateX(26px);
-            transform: translateX(26px);
-        }
-
-        /* Rounded sliders */
-        .slider.round {
-            border-radius: 34px;
-        }
-
-        .slider.round:before {
-            border-radius: 50%;
-        }
-
-        /* Responsive adjustments */
-        @media (max-width: 768px) {
-            body { padding: 1rem; border-radius: 0; }
-            form { padding: 2rem; }
-            h2 { font-size: 2.2rem; gap: 10px; }
-            h2 i { font-size: 1.8rem; }
-            button { font-size: 1.3rem; padding: 1.1rem; }
-            .result { padding: 1.5rem; }
-            .action-button, .nav-button { font-size: 0.8rem; padding: 6px 10px; }
-            .navigation-buttons { flex-direction: column; }
-            .nav-button { width: 100%; }
-        }
-        @media (max-width: 480px) {
-            body { padding: 0.8rem; }
-            form { padding: 1.5rem; }
-            h2 { font-size: 1.8rem; flex-direction: column; }
-            h2 i { font-size: 1.5rem; }
-            label { font-size: 1rem; }
-            input, select, textarea { font-size: 0.9rem; }
-            button { font-size: 1.1rem; padding: 1rem; }
-            .favorite-actions { flex-direction: column; gap: 5px; }
-            .action-button { width: 100%; justify-content: center; }
-        }
-    </style>
-</head>
-<body>
-    <h2><i class="fas fa-lightbulb"></i> المصباح الوهّاج <i class="fas fa-quran"></i></h2>
-
-    <div style="text-align: center; margin-top: 2rem; margin-bottom: 2rem;">
-        <label class="switch">
-            <input type="checkbox" id="darkModeToggle">
-            <span class="slider round"></span>
-        </label>
-        <span style="vertical-align: middle; margin-right: 10px; color: var(--text-color);">
-            <i class="fas fa-moon"></i> الوضع الليلي
-        </span>
-    </div>
-
-    {% with messages = get_flashed_messages(with_categories=true) %}
-        {% if messages %}
-            {% for category, message in messages %}
-                <div class="flash-message {{ category }}">
-                    {% if category == 'success' %}<i class="fas fa-check-circle"></i>
-                    {% elif category == 'error' %}<i class="fas fa-times-circle"></i>
-                    {% elif category == 'warning' %}<i class="fas fa-exclamation-triangle"></i>
-                    {% else %}<i class="fas fa-info-circle"></i>
-                    {% endif %}
-                    {{ message }}
-                </div>
-            {% endfor %}
-        {% endif %}
-    {% endwith %}
-
-    <form method="post" onsubmit="showSpinner()">
-        <label for="lang"><i class="fas fa-language"></i> اختر لغة العرض:</label>
-        <select name="lang" id="lang">
-            <option value="arabic" {% if lang=='arabic' %}selected{% endif %}>العربية</option>
-            <option value="english" {% if lang=='english' %}selected{% endif %}>الإنجليزية</option>
-        </select>
-
-        <label for="mode"><i class="fas fa-compass"></i> اختر نوع التفسير:</label>
-        <select name="mode" id="mode">
-            <option value="quran" {% if mode=='quran' %}selected{% endif %}>📖 تفسير القرآن الكريم</option>
-            <option value="search" {% if mode=='search' %}selected{% endif %}>🔍 بحث في القرآن والتفاسير</option>
-            <option value="dream" {% if mode=='dream' %}selected{% endif %}>💤 تفسير الأحلام</option>
-            <option value="favorites" {% if mode=='favorites' %}selected{% endif %}>⭐ المفضلة</option>
-        </select>
-        
-        <label for="interpreter" id="interpreterLabel"><i class="fas fa-user-tie"></i> اختر المفسّر / مصدر الذكاء الاصطناعي:</label>
-        <select name="interpreter" id="interpreter">
-            <option value="gemini_general" {% if interpreter=='gemini_general' %}selected{% endif %}>الذكاء الاصطناعي العام (Gemini)</option>
-            <option value="maissar" {% if interpreter=='maissar' %}selected{% endif %}>التفسير الميسر (المتوفر محلياً)</option>
-            <option value="ibn_kathir" {% if interpreter=='ibn_kathir' %}selected{% endif %}>ابن كثير (بالذكاء الاصطناعي)</option>
-            <option value="qurtubi" {% if interpreter=='qurtubi' %}selected{% endif %}>القرطبي (بالذكاء الاصطناعي)</option>
-            <option value="saadi" {% if interpreter=='saadi' %}selected{% endif %}>السعدي (بالذكاء الاصطناعي)</option>
-            <option value="all" {% if interpreter=='all' %}selected{% endif %}>مقارنة بين المفسرين (بالذكاء الاصطناعي)</option>
-        </select>
-
-        <div id="quran-inputs" class="input-group">
-            <label for="surah"><i class="fas fa-book"></i> رقم / اسم السورة:</label>
-            <input type="text" name="surah" id="surah" value="{{ surah or '' }}" placeholder="مثال: الفاتحة أو 1">
-            <label for="ayah_input"><i class="fas fa-highlighter"></i> رقم الآية أو جزء من نصها:</label>
-            <input type="text" name="ayah_input" id="ayah_input" value="{{ ayah_input or '' }}" placeholder="مثال: 1 أو 'بسم الله الرحمن الرحيم'">
-        </div>
-
-        <div id="dream-inputs" class="input-group">
-            <label for="dream_text"><i class="fas fa-moon"></i> وصف حلمك بالتفصيل:</label>
-            <textarea name="dream_text" id="dream_text" placeholder="اكتب حلمك هنا...">{{ dream_text or '' }}</textarea>
-            <label for="gender"><i class="fas fa-user"></i> الجنس:</label>
-            <select name="gender" id="gender">
-                <option value="ذكر" {% if gender=='ذكر' %}selected{% endif %}>ذكر</option>
-                <option value="أنثى" {% if gender=='أنثى' %}selected{% endif %}>أنثى</option>
-            </select>
-        </div>
-
-        <div id="search-inputs" class="input-group">
-            <label for="search_query"><i class="fas fa-search"></i> اكتب كلمة مفتاحية أو موضوع للبحث:</label>
-            <input type="text" name="search_query" id="search_query" value="{{ search_query or '' }}" placeholder="مثال: الصلاة أو الربا">
-        </div>
-
-        <button type="submit">
-            <i class="fas fa-arrow-circle-right"></i> عرض النتائج
-        </button>
-    </form>
-
-    <div class="loading-spinner" id="loadingSpinner"></div>
-
-    {% if error_message %}<p class="error-message"><i class="fas fa-exclamation-triangle"></i> {{ error_message }}</p>{% endif %}
-
-    {% if tafsir %}
-        <div class="result">
-            <p>
-                <strong><i class="fas fa-quran"></i> السورة:</strong> {{ surah_name or '' }} ({{ surah_number or '' }}) - الآية: {{ ayah_number_found or '' }}
-                <button class="action-button copy" onclick="copyToClipboard('ayah_info_{{ surah_number }}_{{ ayah_number_found }}')"><i class="far fa-copy"></i></button>
-                <span id="ayah_info_{{ surah_number }}_{{ ayah_number_found }}" style="display:none;">
-                    السورة: {{ surah_name or '' }} ({{ surah_number or '' }}) - الآية: {{ ayah_number_found or '' }}
-                </span>
-            </p>
-            {% if ayah_text %}
-                <p class="quran-text" style="font-family: 'Amiri Quran', serif; font-size: 1.5rem; text-align: center; color: #0f3460; margin: 1rem 0; border-bottom: 1px dashed var(--result-divider); padding-bottom: 1rem;">
-                    <i class="fas fa-book-open"></i> <span id="ayah_text_content">{{ ayah_text }}</span> 
-                    <button class="action-button copy" onclick="copyToClipboard('ayah_text_content')"><i class="far fa-copy"></i></button>
-                </p>
-            {% endif %}
-            <p><strong><i class="fas fa-arabic-language"></i> [AR]</strong> <span id="tafsir_content">{{ tafsir }}</span> 
-                <button class="action-button copy" onclick="copyToClipboard('tafsir_content')"><i class="far fa-copy"></i></button>
-            </p>
-            {% if audio_base64 %}<div class="audio-player"><i class="fas fa-volume-up"></i> <audio controls><source src="data:audio/mpeg;base64,{{ audio_base64 }}" type="audio/mpeg"></audio></div>{% endif %}
-            {% if translated %}<p><strong><i class="fas fa-globe"></i> [EN]</strong> <span id="translated_content">{{ translated }}</span> 
-                <button class="action-button copy" onclick="copyToClipboard('translated_content')"><i class="far fa-copy"></i></button>
-            </p>{% endif %}
-            
-            <div class="favorite-actions">
-                {% if tafsir_hash and not is_favorited %}
-                    <form action="/add_favorite" method="post" style="display:inline;">
-                        <input type="hidden" name="surah_name" value="{{ surah_name or '' }}">
-                        <input type="hidden" name="surah_number" value="{{ surah_number or '' }}">
-                        <input type="hidden" name="ayah_number" value="{{ ayah_number_found or '' }}">
-                        <input type="hidden" name="ayah_text" value="{{ ayah_text or '' }}"> 
-                        <input type="hidden" name="tafsir" value="{{ tafsir }}">
-                        <input type="hidden" name="lang" value="{{ lang }}">
-                        <input type="hidden" name="interpreter" value="{{ interpreter }}">
-                        <input type="hidden" name="translated" value="{{ translated or '' }}">
-                        <input type="hidden" name="ayah_hash" value="{{ tafsir_hash }}">
-                        <button type="submit" class="action-button"><i class="fas fa-star"></i> أضف للمفضلة</button>
-                    </form>
-                {% elif is_favorited %}
-                    <button class="action-button disabled"><i class="fas fa-check"></i> في المفضلة</button>
-                {% endif %}
-            </div>
-
-            {% if surah_number and ayah_number_found %} {# No total_ayahs needed for navigation logic #}
-            <div class="navigation-buttons">
-                <form action="/" method="post" style="display:inline;">
-                    <input type="hidden" name="mode" value="quran">
-                    <input type="hidden" name="lang" value="{{ lang }}">
-                    <input type="hidden" name="interpreter" value="{{ interpreter }}">
-                    <input type="hidden" name="surah" value="{{ surah_number }}">
-                    <input type="hidden" name="ayah_input" value="{{ ayah_number_found | int - 1 }}">
-                    <button type="submit" class="nav-button prev" {% if ayah_number_found|int == 1 %}disabled{% endif %}>
-                        <i class="fas fa-chevron-right"></i> الآية السابقة
-                    </button>
-                </form>
-                <form action="/" method="post" style="display:inline;">
-                    <input type="hidden" name="mode" value="quran">
-                    <input type="hidden" name="lang" value="{{ lang }}">
-                    <input type="hidden" name="interpreter" value="{{ interpreter }}">
-                    <input type="hidden" name="surah" value="{{ surah_number }}">
-                    <input type="hidden" name="ayah_input" value="{{ ayah_number_found | int + 1 }}">
-                    <button type="submit" class="nav-button next"> {# Removed disabled check as AI can generate for any next #}
-                        الآية التالية <i class="fas fa-chevron-left"></i>
-                    </button>
-                </form>
-            </div>
-            {% endif %}
-        </div>
-    {% elif search_results %}
-        <div class="result">
-            <h3><i class="fas fa-search-dollar"></i> نتائج البحث عن "{{ search_query }}"</h3>
-            {% for item in search_results %}
-                <p>
-                    <strong><i class="fas fa-quran"></i> السورة: {{ item.surah_name }} ({{ item.surah_number }}) - الآية: {{ item.ayah_number }}</strong>
-                    <button class="action-button copy" onclick="copyToClipboard('search_ayah_info_{{ loop.index }}')"><i class="far fa-copy"></i></button>
-                    <span id="search_ayah_info_{{ loop.index }}" style="display:none;">
-                        السورة: {{ item.surah_name }} ({{ item.surah_number }}) - الآية: {{ item.ayah_number }}
-                    </span>
-                    <br>
-                    {% if item.ayah_text %}
-                        <span class="quran-text" style="font-family: 'Amiri Quran', serif; font-size: 1.3rem; color: #0f3460;">
-                            <span id="search_ayah_text_content_{{ loop.index }}">{{ item.ayah_text }}</span> 
-                            <button class="action-button copy" onclick="copyToClipboard('search_ayah_text_content_{{ loop.index }}')"><i class="far fa-copy"></i></button>
-                        </span><br>
-                    {% endif %}
-                    <i class="fas fa-arabic-language"></i> <span id="search_tafsir_content_{{ loop.index }}">{{ item.tafsir }}</span>
-                    <button class="action-button copy" onclick="copyToClipboard('search_tafsir_content_{{ loop.index }}')"><i class="far fa-copy"></i></button>
-                    {% if item.audio_base64 %}<div class="audio-player"><i class="fas fa-volume-up"></i> <audio controls><source src="data:audio/mpeg;base64,{{ item.audio_base64 }}" type="audio/mpeg"></audio></div>{% endif %}
-                    <div class="favorite-actions">
-                        <form action="/add_favorite" method="post" style="display:inline;">
-                            <input type="hidden" name="surah_name" value="{{ item.surah_name }}">
-                            <input type="hidden" name="surah_number" value="{{ item.surah_number }}">
-                            <input type="hidden" name="ayah_number" value="{{ item.ayah_number }}">
-                            <input type="hidden" name="ayah_text" value="{{ item.ayah_text or '' }}"> 
-                            <input type="hidden" name="tafsir" value="{{ item.tafsir }}">
-                            <input type="hidden" name="lang" value="{{ lang }}"> 
-                            <input type="hidden" name="interpreter" value="بحث"> 
-                            <input type="hidden" name="translated" value=""> 
-                            <input type="hidden" name="ayah_hash" value="{{ item.hash }}">
-                            {% if item.is_favorited %}
-                                <button class="action-button disabled"><i class="fas fa-check"></i> في المفضلة</button>
-                            {% else %}
-                                <button type="submit" class="action-button"><i class="fas fa-star"></i> أضف للمفضلة</button>
-                            {% endif %}
-                        </form>
-                    </div>
-                </p>
-            {% else %}
-                <p>عذرًا، لم يتم العثور على نتائج مطابقة لبحثك في التفاسير المحلية. يمكنك محاولة استخدام تفسير القرآن الكريم المباشر أو البحث بكلمة أخرى.</p>
-            {% endfor %}
-        </div>
-    {% endif %}
-
-    {% if favorites_list and mode == 'favorites' %}
-        <div class="favorites-list">
-            <h3><i class="fas fa-star"></i> المفضلة</h3>
-            {% if favorites_list %}
-                {% for fav in favorites_list %}
-                    <div class="favorite-item">
-                        <div class="item-details">
-                            <strong>السورة: {{ fav.surah_name }} ({{ fav.surah_number }}) - الآية: {{ fav.ayah_number }}</strong>
-                            <button class="action-button copy" onclick="copyToClipboard('fav_ayah_info_{{ loop.index }}')"><i class="far fa-copy"></i></button>
-                            <span id="fav_ayah_info_{{ loop.index }}" style="display:none;">
-                                السورة: {{ fav.surah_name }} ({{ fav.surah_number }}) - الآية: {{ fav.ayah_number }}
-                            </span>
-                            {% if fav.ayah_text %}
-                                <span class="quran-text" style="font-family: 'Amiri Quran', serif; font-size: 1.3rem; color: #0f3460;">
-                                    <span id="fav_ayah_text_content_{{ loop.index }}">{{ fav.ayah_text }}</span> 
-                                    <button class="action-button copy" onclick="copyToClipboard('fav_ayah_text_content_{{ loop.index }}')"><i class="far fa-copy"></i></button>
-                                </span>
-                            {% endif %}
-                            <p><span id="fav_tafsir_content_{{ loop.index }}">{{ fav.tafsir }}</span>
-                                <button class="action-button copy" onclick="copyToClipboard('fav_tafsir_content_{{ loop.index }}')"><i class="far fa-copy"></i></button>
-                            </p>
-                            {% if fav.audio_base64 %}<div class="audio-player"><i class="fas fa-volume-up"></i> <audio controls><source src="data:audio/mpeg;base64,{{ fav.audio_base64 }}" type="audio/mpeg"></audio></div>{% endif %}
-                            {% if fav.translated %}<p><strong>[EN]</strong> <span id="fav_translated_content_{{ loop.index }}">{{ fav.translated }}</span>
-                                <button class="action-button copy" onclick="copyToClipboard('fav_translated_content_{{ loop.index }}')"><i class="far fa-copy"></i></button>
-                            </p>{% endif %}
-                        </div>
-                        <div class="item-actions">
-                            <form action="/remove_favorite/{{ fav.hash }}" method="post" style="display:inline;">
-                                <button type="submit" class="action-button remove"><i class="fas fa-trash"></i> حذف من المفضلة</button>
-                            </form>
-                        </div>
-                    </div>
-                {% endfor %}
-            {% else %}
-                <p>لا توجد لديك أي مفضلة حتى الآن.</p>
-            {% endif %}
-        </div>
-    {% endif %}
-
-    <div class="footer">
-        <p>&copy; {{ year }} المصباح الوهّاج. جميع الحقوق محفوظة.</p>
-        <p><a href="{{ url_for('show_favorites') }}"><i class="fas fa-heart"></i> عرض المفضلة</a> | <a href="https://github.com/Dubaie" target="_blank"><i class="fab fa-github"></i> GitHub</a></p>
-        <p>تم التطوير بواسطة: <strong style="color: var(--heading-color);">دبي محمد عبد الرزاق</strong></p>
-    </div>
-
-    <script>
-        function showSpinner() {
-            document.getElementById('loadingSpinner').style.display = 'block';
-        }
-
-        function copyToClipboard(elementId) {
-            var text = document.getElementById(elementId).textContent;
-            navigator.clipboard.writeText(text).then(function() {
-                flashMessage('تم النسخ إلى الحافظة بنجاح!', 'success');
-            }, function(err) {
-                flashMessage('فشل النسخ إلى الحافظة.', 'error');
-                console.error('Could not copy text: ', err);
-            });
-        }
-
-        function flashMessage(message, category = 'info') {
-            const flashDiv = document.createElement('div');
-            flashDiv.className = `flash-message ${category}`;
-            flashDiv.innerHTML = (category === 'success' ? '<i class="fas fa-check-circle"></i> ' : 
-                                 (category === 'error' ? '<i class="fas fa-times-circle"></i> ' : 
-                                 (category === 'warning' ? '<i class="fas fa-exclamation-triangle"></i> ' : '<i class="fas fa-info-circle"></i> '))) + message;
-            document.body.insertBefore(flashDiv, document.querySelector('form'));
-            setTimeout(() => {
-                flashDiv.remove();
-            }, 3000);
-        }
-
-        document.addEventListener('DOMContentLoaded', (event) => {
-            const modeSelect = document.getElementById('mode');
-            const quranInputs = document.getElementById('quran-inputs');
-            const dreamInputs = document.getElementById('dream-inputs');
-            const searchInputs = document.getElementById('search-inputs');
-            const interpreterLabel = document.getElementById('interpreterLabel');
-            const interpreterSelect = document.getElementById('interpreter');
-
-            function updateInputVisibility() {
-                const selectedMode = modeSelect.value;
-                
-                // Hide all input groups first
-                quranInputs.classList.remove('active');
-                dreamInputs.classList.remove('active');
-                searchInputs.classList.remove('active');
-                interpreterLabel.style.display = 'none';
-                interpreterSelect.style.display = 'none';
-
-                // Show inputs based on selected mode
-                if (selectedMode === 'quran') {
-                    quranInputs.classList.add('active');
-                    interpreterLabel.style.display = 'block';
-                    interpreterSelect.style.display = 'block';
-                } else if (selectedMode === 'dream') {
-                    dreamInputs.classList.add('active');
-                } else if (selectedMode === 'search') {
-                    searchInputs.classList.add('active');
-                    interpreterLabel.style.display = 'block'; // Search can also use AI or local.
-                    interpreterSelect.style.display = 'block';
-                } else if (selectedMode === 'favorites') {
-                    // Favorites mode doesn't need specific inputs or interpreter selection on the form itself.
-                    // It's handled by redirecting to a dedicated favorites view.
-                }
-            }
-
-            modeSelect.addEventListener('change', updateInputVisibility);
-            updateInputVisibility(); // Call on page load to set initial state based on current selection
-
-            const darkModeToggle = document.getElementById('darkModeToggle');
-            const body = document.body;
-
-            // Load dark mode preference
-            const isDarkMode = localStorage.getItem('darkMode') === 'enabled';
-            if (isDarkMode) {
-                body.classList.add('dark-mode');
-                darkModeToggle.checked = true;
-            }
-
-            darkModeToggle.addEventListener('change', () => {
-                body.classList.toggle('dark-mode');
-                localStorage.setItem('darkMode', body.classList.contains('dark-mode') ? 'enabled' : 'disabled');
-            });
-        });
-    </script>
-</body>
-</html>
-'''
+@lru_cache(maxsize=1)
+def ayah_text_index():
+    """يبني فهرس n-gram لنص القرآن المحلي (مرة واحدة عند أول بحث بجزء من آية)."""
+    index = AyahNgramIndex()
+    for surah_number, ayah_number, text in load_quran_text().iter_ayahs():
+        index.add(surah_number, ayah_number, text)
+    logger.info(f"تم بناء فهرس نص القرآن: {len(index)} آية، {len(index.postings)} مقطعاً.")
+    return index
+
+def preload_corpora():
+    """يحمّل أسماء السور ونص القرآن وكل ملفات التفسير المحلية وفهرس البحث في الذاكرة المؤقتة للعملية.
+
+    يُستدعى في العملية الأم قبل إنشاء العمال (wsgi.py مع preload_app) فتتشارك العمال
+    هذه الصفحات بالنسخ عند الكتابة (copy-on-write) بدل أن يحمّلها كل عامل وحده.
+    """
+    surah_resolver()
+    load_quran_text()
+    surahs = _tafsir_corpus.surah_numbers()
+    for surah_number in surahs:
+        get_tafsir_data_local(surah_number)
+    index = tafsir_index()
+    ayah_text_index()
+    logger.info(f"تم تحميل المصادر مسبقاً: {len(surahs)} ملف تفسير، {len(index)} آية مفهرسة.")
+
+def after_fork():
+    """يُستدعى في كل عامل بعد fork: اتصالات SQLite لا تُشارك بين العمليات."""
+    for store in (_gemini_cache, _ai_tafsir_store, _translator.store, _favorites_store, _tafsir_corpus):
+        store.after_fork()
+
+# --- 5. القوالب (templates/index.html والأجزاء في templates/partials/) ---
+
+_fragment_cache = FragmentCache(app.config['FRAGMENT_CACHE_MAX_ENTRIES'])
+
+def render_result_card(cacheable, **context):
+    """يعرض بطاقة التفسير؛ إذا كان المحتوى ثابتاً (الميسر المحلي) يُعاد ناتجها المحفوظ لنفس المدخلات."""
+    def render():
+        return Markup(render_template('partials/result_card.html', **context))
+    if not cacheable:
+        return render()
+    return _fragment_cache.get_or_render(tuple(sorted(context.items())), render)
+
+# --- دوال تفسير الآية المشتركة بين المسارات ---
+
+def get_local_ayah(surah_number, ayah_input, quran_data):
+    """يعيد (رقم الآية, نص الآية) من نص القرآن المحلي؛ النص None إذا لم يوجد.
+
+    ayah_input رقم الآية، أو جزء من نصها يُبحث عنه في فهرس n-gram للسورة نفسها.
+    """
+    if not str(ayah_input).isdigit():
+        match = ayah_text_index().best(ayah_input, surah_number=surah_number,
+                                       min_score=app.config['AYAH_MATCH_MIN_SCORE'])
+        if not match:
+            return None, None
+        logger.info(f"تم تحديد الآية {match[0]}:{match[1]} من النص محلياً (التداخل {match[2]:.2f}).")
+        ayah_number = match[1]
+    else:
+        ayah_number = int(ayah_input)
+    return ayah_number, get_ayah_text_from_quran_json(surah_number, ayah_number, quran_data)
+
+def build_ayah_text_prompt(surah_number, surah_name, ayah_input):
+    """نص الطلب الذي يُجلب به نص الآية من الذكاء الاصطناعي عند غيابه محلياً."""
+    if not str(ayah_input).isdigit(): # If ayah_input is text, try to find it first
+        return f"جلب نص الآية التي تحتوي على '{ayah_input}' من سورة {surah_name} (السورة رقم {surah_number}). أعد النص القرآني فقط بدون أي تفسير أو معلومات إضافية."
+    return f"جلب نص الآية رقم {ayah_input} من سورة {surah_name} (السورة رقم {surah_number}). أعد النص القرآني فقط بدون أي تفسير أو معلومات إضافية."
+
+def extract_ayah_text(ai_ayah_response):
+    """يستخلص النص القرآني من رد الذكاء الاصطناعي."""
+    # Remove anything that's not Arabic letters, numbers, spaces, or specific Quranic punctuation (optional for robust parsing)
+    ayah_text = re.sub(r'[^\u0600-\u06FF\s\d\u06D6-\u06ED]+', '', ai_ayah_response).strip()
+    return ayah_text or ai_ayah_response.strip() # Fallback if cleanup removes everything
+
+def ai_ayah_number(ayah_input):
+    """رقم الآية المعروض عندما يأتي نصها من الذكاء الاصطناعي."""
+    if str(ayah_input).isdigit():
+        return int(ayah_input)
+    return "غير محدد (تم البحث بالنص)" # If ayah_input was text, we might not have the exact number
+
+def resolve_ayah_text(surah_number, surah_name, ayah_input, quran_data):
+    """يعيد (رقم الآية, نص الآية) من نص القرآن المحلي أولاً، ثم من الذكاء الاصطناعي."""
+    ayah_number_found, ayah_text = get_local_ayah(surah_number, ayah_input, quran_data)
+    ayah_text = ayah_text or _ai_tafsir_store.get_ayah_text(surah_number, ayah_number_found)
+    if ayah_text:
+        return ayah_number_found, ayah_text
+    if ayah_number_found is not None and not 1 <= ayah_number_found <= ayah_count(surah_number):
+        return ayah_number_found, None # رقم خارج السورة: لا معنى لسؤال الذكاء الاصطناعي عنه
+
+    # If ayah text not found locally, use AI
+    ayah_prompt = build_ayah_text_prompt(surah_number, surah_name, ayah_input)
+    logger.info(f"جاري جلب نص الآية من Gemini: {ayah_prompt}")
+    ai_ayah_response = ask_gemini(ayah_prompt)
+    if not ai_ayah_response:
+        return ayah_number_found, None
+    ayah_text = extract_ayah_text(ai_ayah_response)
+    logger.info(f"نص الآية من AI: {ayah_text[:50]}...")
+    return ai_ayah_number(ayah_input), ayah_text
+
+def lookup_local_tafsir(surah_number, ayah_number):
+    """يعيد التفسير الميسر المحلي للآية أو None."""
+    if ayah_number is None or not str(ayah_number).isdigit():
+        return None
+    return get_tafsir_data_local(surah_number).get(str(int(ayah_number)))
+
+def build_tafsir_prompt(interpreter, ayah_text, surah_name, surah_number):
+    """يبني نص الطلب المرسل إلى Gemini حسب المفسّر المختار."""
+    if interpreter == 'maissar':
+        return f"قدم تفسيراً موجزاً وواضحاً (على طريقة التفسير الميسر) للآية القرآنية: {ayah_text} من سورة {surah_name} (السورة رقم {surah_number})."
+    if interpreter == 'gemini_general':
+        return f"تفسير عام وشامل للآية القرآنية: {ayah_text} من سورة {surah_name} (السورة رقم {surah_number}). قدم تفسيراً واضحاً ومفيداً."
+    interpreter_name_arabic = interpreter_names.get(interpreter, "المفسرين")
+    return f"تفسير الآية القرآنية: {ayah_text} من سورة {surah_name} (السورة رقم {surah_number})، بناءً على {interpreter_name_arabic}. إذا كان الخيار 'all'، قم بمقارنة موجزة بين المفسرين الثلاثة (ابن كثير، القرطبي، السعدي) للآية المذكورة."
+
+def get_tafsir_for_ayah(interpreter, surah_number, surah_name, ayah_number, ayah_text):
+    """يعيد تفسير الآية: الميسر من الملفات المحلية أو المحسوب مسبقاً إن وُجد، وإلا من الذكاء الاصطناعي."""
+    precomputed = _ai_tafsir_store.get_tafsir(surah_number, ayah_number, interpreter)
+    if precomputed:
+        return precomputed
+    if interpreter == 'maissar':
+        tafsir = lookup_local_tafsir(surah_number, ayah_number)
+        if tafsir:
+            return tafsir
+        # If still no tafsir from local, use AI for Maissar-like tafsir
+        notify(f"لم يتم العثور على تفسير ميسر محلي للآية {ayah_number} من سورة {surah_name}. سيتم جلب تفسير من الذكاء الاصطناعي.", "warning")
+    elif interpreter not in interpreter_names:
+        return None
+    return ask_gemini(build_tafsir_prompt(interpreter, ayah_text, surah_name, surah_number))
+
+def make_tafsir_hash(surah_number, ayah_number, tafsir):
+    """البصمة المستخدمة لتمييز التفسير في المفضلة."""
+    return hashlib.md5(f"{surah_number}-{ayah_number}-{tafsir}".encode()).hexdigest()
 
 # Map interpreter names for AI prompts
 interpreter_names = {
@@ -1134,138 +525,118 @@ interpreter_names = {
 
 # --- 6. مسارات التطبيق (Application Routes) ---
 
+def lookup_quran_ayah(surah_input, ayah_input, interpreter, lang, quran_data):
+    """ينفذ وضع تفسير القرآن ويعيد متغيرات القالب الخاصة به (بطاقة الآية أو رسالة الخطأ)."""
+    result = {}
+    surah_number = get_surah_number(surah_input) # لا تمرر surahs_data هنا
+    if not surah_number:
+        result['error_message'] = "يرجى إدخال رقم سورة صحيح (1-114) أو اسمها."
+        return result
+    result.update(surah_number=surah_number, surah_ayah_count=ayah_count(surah_number))
+    if not ayah_input:
+        result['error_message'] = "يرجى إدخال رقم الآية أو جزء من نصها."
+        return result
+
+    surah_name = get_surahs_data().get(surah_number, {}).get("arabic", f"السورة {surah_number}")
+    ayah_number_found, ayah_text = resolve_ayah_text(surah_number, surah_name, ayah_input, quran_data)
+    result.update(surah_name=surah_name, total_ayahs=get_total_ayahs_in_surah(surah_number, quran_data),
+                  ayah_number_found=ayah_number_found, ayah_text=ayah_text)
+    if not ayah_text:
+        result['error_message'] = "لم يتمكن التطبيق من الحصول على نص الآية لتفسيرها."
+        return result
+
+    tafsir = get_tafsir_for_ayah(interpreter, surah_number, surah_name, ayah_number_found, ayah_text)
+    if not tafsir:
+        result['error_message'] = "عذرًا، لم يتمكن التطبيق من جلب التفسير من المصدر المحدد."
+        return result
+    tafsir_hash = make_tafsir_hash(surah_number, ayah_number_found, tafsir)
+    result.update(tafsir=tafsir, tafsir_hash=tafsir_hash,
+                  is_favorited=tafsir_hash in favorite_hashes([tafsir_hash]),
+                  audio_url=deferred_audio_url(tafsir, lang='ar'))
+    if lang == 'english':
+        result['translated'] = translate_text(tafsir, to_lang='en')
+    return result
+
+_PAGE_DEFAULTS = {
+    'surah_name': None, 'surah_number': None, 'ayah_input': '', 'ayah_number_found': None, 'ayah_text': None,
+    'tafsir': None, 'translated': None, 'audio_url': None, 'error_message': None,
+    'lang': 'arabic', 'mode': 'quran', 'interpreter': 'gemini_general',
+    'dream_text': '', 'gender': 'ذكر', 'search_query': '',
+    'search_results': None, 'search_total': 0, 'page': 1, 'page_size': Config.SEARCH_PAGE_SIZE, 'total_pages': 0,
+    'favorites_list': None, 'is_favorited': False, 'tafsir_hash': None, 'total_ayahs': None, 'surah_ayah_count': 0,
+}
+
+def render_page(**context):
+    """يعرض index.html بالقيم الافتراضية لكل متغيراته، مع بطاقة التفسير من ذاكرة الأجزاء إن أمكن."""
+    page = dict(_PAGE_DEFAULTS, **context)
+    for message, category in g.pop('notices', ()):
+        flash(message, category)
+    result_card = None
+    if page['tafsir']:
+        is_local = (page['mode'] == 'quran' and page['interpreter'] == 'maissar'
+                    and page['tafsir'] == lookup_local_tafsir(page['surah_number'], page['ayah_number_found']))
+        result_card = render_result_card(is_local, **{key: page[key] for key in (
+            'surah_name', 'surah_number', 'ayah_number_found', 'ayah_text', 'tafsir', 'translated',
+            'audio_url', 'lang', 'interpreter', 'is_favorited', 'tafsir_hash', 'surah_ayah_count')})
+    return render_template('index.html', result_card=result_card, year=datetime.now().year, **page)
+
 @app.route('/', methods=['GET', 'POST'])
-def home():
+def home(mode=None):
     quran_data = load_quran_text() # تحميل بيانات القرآن (قد تكون فارغة إذا لم يكن الملف موجوداً)
-    surahs_data = _surahs_data_cache # استخدام البيانات المحملة مرة واحدة عند بدء التطبيق
-    
-    surah_name = None
-    surah_number = None
-    ayah_number_found = None
-    ayah_text = None
-    tafsir = None
-    translated = None
-    audio_base64 = None
-    error_message = None
-    search_results = None
-    favorites_list = None
-    is_favorited = False
-    tafsir_hash = None
-    total_ayahs = None
+    surahs_data = get_surahs_data()
 
     # Default values from form or initial load
     lang = request.form.get('lang', 'arabic')
-    mode = request.form.get('mode', 'quran')
+    mode = mode or request.form.get('mode', 'quran')
     interpreter = request.form.get('interpreter', 'gemini_general') # Default to general AI
     dream_text_input = request.form.get('dream_text', '')
     gender_input = request.form.get('gender', 'ذكر')
     search_query_input = request.form.get('search_query', '')
+    page, page_size = parse_pagination(request.form)
+    context = {'page': page, 'page_size': page_size}
 
     if request.method == 'POST':
         # Handling different modes
         if mode == 'quran':
-            surah_input = request.form.get('surah')
-            ayah_input = request.form.get('ayah_input')
-
-            surah_number = get_surah_number(surah_input) # لا تمرر surahs_data هنا
-            
-            if not surah_number:
-                error_message = "يرجى إدخال رقم سورة صحيح (1-114) أو اسمها."
-            elif not ayah_input:
-                error_message = "يرجى إدخال رقم الآية أو جزء من نصها."
-            else:
-                surah_name = surahs_data.get(surah_number, {}).get("arabic", f"السورة {surah_number}")
-                total_ayahs = get_total_ayahs_in_surah(surah_number, quran_data) 
-                
-                # Try to get ayah text from local quran.json first
-                if str(ayah_input).isdigit():
-                    ayah_number_found = int(ayah_input)
-                    ayah_text = get_ayah_text_from_quran_json(surah_number, ayah_number_found, quran_data)
-
-                # If ayah text not found locally, use AI
-                if not ayah_text:
-                    ayah_prompt = f"جلب نص الآية رقم {ayah_input} من سورة {surah_name} (السورة رقم {surah_number}). أعد النص القرآني فقط بدون أي تفسير أو معلومات إضافية."
-                    if not str(ayah_input).isdigit(): # If ayah_input is text, try to find it first
-                        ayah_prompt = f"جلب نص الآية التي تحتوي على '{ayah_input}' من سورة {surah_name} (السورة رقم {surah_number}). أعد النص القرآني فقط بدون أي تفسير أو معلومات إضافية."
-
-                    logger.info(f"جاري جلب نص الآية من Gemini: {ayah_prompt}")
-                    ai_ayah_response = ask_gemini(ayah_prompt)
-                    if ai_ayah_response:
-                        # Attempt to extract just the ayah text
-                        # Remove anything that's not Arabic letters, numbers, spaces, or specific Quranic punctuation (optional for robust parsing)
-                        ayah_text = re.sub(r'[^\u0600-\u06FF\s\d\u06D6-\u06ED]+', '', ai_ayah_response).strip()
-                        if not ayah_text: # Fallback if cleanup removes everything
-                            ayah_text = ai_ayah_response.strip()
-                        logger.info(f"نص الآية من AI: {ayah_text[:50]}...")
-                        
-                        # Try to deduce ayah number from AI response or just use the input if it was a number
-                        if str(ayah_input).isdigit():
-                            ayah_number_found = int(ayah_input)
-                        else: # If ayah_input was text, we might not have the exact number
-                            ayah_number_found = "غير محدد (تم البحث بالنص)" 
-                    else:
-                        error_message = "لم يتمكن الذكاء الاصطناعي من جلب نص الآية. يرجى التأكد من توفر ملفات القرآن محلياً أو مراجعة المدخلات."
-
-                # Get Tafsir
-                if ayah_text: # Proceed only if ayah_text is available
-                    if interpreter == 'maissar':
-                        tafsir_data_maissar = get_tafsir_data_local(surah_number)
-                        if str(ayah_input).isdigit() and str(int(ayah_input)) in tafsir_data_maissar:
-                            tafsir = tafsir_data_maissar[str(int(ayah_input))]
-                            ayah_number_found = int(ayah_input) # Confirm ayah number if found locally
-                        
-                        if not tafsir: # If still no tafsir from local, use AI for Maissar-like tafsir
-                            flash(f"لم يتم العثور على تفسير ميسر محلي للآية {ayah_input} من سورة {surah_name}. سيتم جلب تفسير من الذكاء الاصطناعي.", "warning")
-                            prompt = f"قدم تفسيراً موجزاً وواضحاً (على طريقة التفسير الميسر) للآية القرآنية: {ayah_text} من سورة {surah_name} (السورة رقم {surah_number})."
-                            tafsir = ask_gemini(prompt)
-
-                    elif interpreter == 'gemini_general':
-                        prompt = f"تفسير عام وشامل للآية القرآنية: {ayah_text} من سورة {surah_name} (السورة رقم {surah_number}). قدم تفسيراً واضحاً ومفيداً."
-                        tafsir = ask_gemini(prompt)
-                        
-                    elif interpreter in ['ibn_kathir', 'qurtubi', 'saadi', 'all']:
-                        interpreter_name_arabic = interpreter_names.get(interpreter, "المفسرين")
-                        prompt = f"تفسير الآية القرآنية: {ayah_text} من سورة {surah_name} (السورة رقم {surah_number})، بناءً على {interpreter_name_arabic}. إذا كان الخيار 'all'، قم بمقارنة موجزة بين المفسرين الثلاثة (ابن كثير، القرطبي، السعدي) للآية المذكورة."
-                        tafsir = ask_gemini(prompt)
-                    
-                    if tafsir:
-                        tafsir_hash = hashlib.md5(f"{surah_number}-{ayah_number_found}-{tafsir}".encode()).hexdigest()
-                        favorites = load_favorites()
-                        is_favorited = any(fav['hash'] == tafsir_hash for fav in favorites)
-
-                        if lang == 'english':
-                            translated = translate_text(tafsir, to_lang='en')
-                        audio_base64 = text_to_speech_base64(tafsir, lang='ar')
-                    else:
-                        error_message = "عذرًا، لم يتمكن التطبيق من جلب التفسير من المصدر المحدد."
-                else:
-                    error_message = "لم يتمكن التطبيق من الحصول على نص الآية لتفسيرها."
+            context.update(lookup_quran_ayah(request.form.get('surah'), request.form.get('ayah_input'),
+                                             interpreter, lang, quran_data))
 
         elif mode == 'dream':
             if dream_text_input:
                 prompt = f"أنا {gender_input}. حلمت بما يلي: {dream_text_input}. يرجى تفسير هذا الحلم بناءً على مبادئ تفسير الأحلام في الإسلام، مع ذكر أي رموز أو دلالات واضحة. ابدأ التفسير مباشرة."
                 tafsir = ask_gemini(prompt)
                 if tafsir:
+                    context.update(tafsir=tafsir, audio_url=deferred_audio_url(tafsir, lang='ar'))
                     if lang == 'english':
-                        translated = translate_text(tafsir, to_lang='en')
-                    audio_base64 = text_to_speech_base64(tafsir, lang='ar')
+                        context['translated'] = translate_text(tafsir, to_lang='en')
                 else:
-                    error_message = "عذرًا، لم يتمكن الذكاء الاصطناعي من تفسير الحلم."
+                    context['error_message'] = "عذرًا، لم يتمكن الذكاء الاصطناعي من تفسير الحلم."
             else:
-                error_message = "يرجى وصف حلمك لتفسيره."
+                context['error_message'] = "يرجى وصف حلمك لتفسيره."
 
         elif mode == 'search':
             if search_query_input:
                 # First, search locally in Maissar tafsir
-                local_results = search_in_tafasir_local(search_query_input, surahs_data, quran_data)
+                search_total, local_results = search_in_tafasir_local(search_query_input, surahs_data, quran_data,
+                                                                      page=page, page_size=page_size)
                 
-                if local_results:
+                if search_total:
+                    total_pages = (search_total + page_size - 1) // page_size
+                    if page > total_pages: # صفحة بعد آخر النتائج: نعرض الصفحة الأخيرة
+                        page = total_pages
+                        search_total, local_results = search_in_tafasir_local(search_query_input, surahs_data, quran_data,
+                                                                              page=page, page_size=page_size)
                     search_results = local_results
+                    # نزين نتائج الصفحة المعروضة فقط (الصوت وحالة المفضلة)
+                    favorited = favorite_hashes([item['hash'] for item in search_results])
+                    attach_deferred_audio(search_results)
+                    if lang == 'english':
+                        translate_items(search_results)
                     for item in search_results:
-                        item['audio_base64'] = text_to_speech_base64(item['tafsir'], lang='ar')
-                        favorites = load_favorites()
-                        item['is_favorited'] = any(fav['hash'] == item['hash'] for fav in favorites)
-                    flash(f"تم العثور على {len(search_results)} نتيجة في التفاسير المحلية.", "success")
+                        item['is_favorited'] = item['hash'] in favorited
+                    context.update(search_results=search_results, search_total=search_total,
+                                   total_pages=total_pages, page=page)
+                    flash(f"تم العثور على {search_total} نتيجة في التفاسير المحلية (الصفحة {page} من {total_pages}).", "success")
                 else:
                     # If no local results, try AI for a general Islamic answer related to query
                     flash("لم يتم العثور على نتائج في التفاسير المحلية. سيتم البحث عن إجابة عامة باستخدام الذكاء الاصطناعي.", "warning")
@@ -1273,63 +644,481 @@ def home():
                     ai_response = ask_gemini(prompt)
                     if ai_response:
                         # Format AI response as a single search result
-                        search_results = [{
+                        context['search_results'] = [{
                             "surah_name": "الذكاء الاصطناعي",
                             "surah_number": "N/A",
                             "ayah_number": "N/A",
                             "ayah_text": f"بحث عن: {search_query_input}",
                             "tafsir": ai_response,
-                            "audio_base64": text_to_speech_base64(ai_response, lang='ar'),
+                            "audio_url": deferred_audio_url(ai_response, lang='ar'),
                             "is_favorited": False, # AI generated content isn't added to favorites directly
                             "hash": hashlib.md5(ai_response.encode()).hexdigest() # Generate hash for AI result as well
                         }]
                     else:
-                        error_message = "عذرًا، لم يتم العثور على نتائج للبحث."
+                        context['error_message'] = "عذرًا، لم يتم العثور على نتائج للبحث."
             else:
-                error_message = "يرجى إدخال كلمة مفتاحية للبحث."
-        
-        elif mode == 'favorites':
-            favorites_list = load_favorites()
-            for fav in favorites_list:
-                fav['audio_base64'] = text_to_speech_base64(fav['tafsir'], lang='ar')
-                if fav.get('lang') == 'english' and not fav.get('translated'): # Translate if missing for english fav
-                    fav['translated'] = translate_text(fav['tafsir'], to_lang='en')
-            # No need for error_message here, just show empty list if no favorites
-
-    elif request.method == 'GET' and mode == 'favorites': # Handle direct GET request to show favorites
+                context['error_message'] = "يرجى إدخال كلمة مفتاحية للبحث."
+
+    if mode == 'favorites': # POST من النموذج أو GET مباشر من /favorites
         favorites_list = load_favorites()
-        for fav in favorites_list:
-            fav['audio_base64'] = text_to_speech_base64(fav['tafsir'], lang='ar')
-            if fav.get('lang') == 'english' and not fav.get('translated'): # Translate if missing for english fav
-                fav['translated'] = translate_text(fav['tafsir'], to_lang='en')
-
-    return render_template_string(
-        HTML_TEMPLATE,
-        surah_name=surah_name,
-        surah_number=surah_number,
+        attach_deferred_audio(favorites_list)
+        translate_items([fav for fav in favorites_list if fav.get('lang') == 'english']) # Translate if missing for english favs
+        context['favorites_list'] = favorites_list # No need for error_message here, just show empty list if no favorites
+
+    return render_page(
         ayah_input=request.form.get('ayah_input', ''), # Pass back current ayah input for form
-        ayah_number_found=ayah_number_found,
-        ayah_text=ayah_text,
-        tafsir=tafsir,
-        translated=translated,
-        audio_base64=audio_base64,
-        error_message=error_message,
         lang=lang,
         mode=mode,
         interpreter=interpreter,
         dream_text=dream_text_input,
         gender=gender_input,
         search_query=search_query_input,
-        search_results=search_results,
-        favorites_list=favorites_list,
-        is_favorited=is_favorited,
-        tafsir_hash=tafsir_hash,
-        total_ayahs=total_ayahs,
-        year=datetime.now().year
+        **context
     )
 
+def ayah_page_etag(surah_number, ayah_number, interpreter, lang, quran_data):
+    """ETag قوي لصفحة آية مصدرها ملفات محلية فقط، أو None إذا احتاجت شبكة (ذكاء اصطناعي أو ترجمة).
+
+    يُحسب قبل العرض من إصدار البيانات المصدرية (توقيت وحجم الملفات)، ونص الآية والتفسير،
+    وحالة المفضلة، فيُجاب على إعادة التحقق بـ 304 دون عرض القالب.
+    """
+    if lang != 'arabic':
+        return None
+    ayah_text, tafsir = lookup_ayah_local(surah_number, ayah_number, interpreter, quran_data)
+    if not ayah_text or not tafsir:
+        return None
+    version = []
+    for path in (*app.config['QURAN_FILES'], app.config['SURAHS_FILE'],
+                 os.path.join(app.config['TAFSIR_DIR'], f"{surah_number}.json")):
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            version.append(None)
+    tafsir_hash = make_tafsir_hash(surah_number, ayah_number, tafsir)
+    fingerprint = json.dumps([_TEMPLATES_VERSION, version, surah_number, ayah_number, interpreter, lang,
+                              tafsir_hash in favorite_hashes([tafsir_hash]),
+                              hashlib.sha256(ayah_text.encode('utf-8')).hexdigest(), tafsir_hash])
+    return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:32]
+
+def _templates_version():
+    """أحدث توقيت تعديل بين ملفات القوالب (يدخل في ETag حتى تتغير الصفحات بعد نشر قالب جديد)."""
+    latest = 0
+    for root, _, files in os.walk(os.path.join(app.root_path, 'templates')):
+        for name in files:
+            latest = max(latest, os.stat(os.path.join(root, name)).st_mtime_ns)
+    return latest
+
+_TEMPLATES_VERSION = _templates_version()
+
+@app.route('/surah/<int:surah>/ayah/<int:ayah>')
+def ayah_page(surah, ayah):
+    """رابط GET ثابت لصفحة تفسير آية: /surah/2/ayah/255?interpreter=maissar&lang=arabic
+
+    الصفحات المبنية من ملفات محلية فقط تحمل ETag قوياً و Cache-Control وتجيب بـ 304
+    عند إعادة التحقق؛ وما يحتاج الذكاء الاصطناعي يُعرض دون تخزين.
+    """
+    if not 1 <= ayah <= ayah_count(surah):
+        abort(404)
+    interpreter = request.args.get('interpreter', 'maissar')
+    lang = request.args.get('lang', 'arabic')
+    if interpreter != 'maissar' and interpreter not in interpreter_names:
+        abort(404)
+    surah_number = str(surah)
+    quran_data = load_quran_text()
+
+    # رسائل flash المعلقة (بعد إضافة مفضلة مثلاً) تجعل الصفحة خاصة بهذه الزيارة
+    etag = None if session.get('_flashes') else ayah_page_etag(surah_number, ayah, interpreter, lang, quran_data)
+    if etag and etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = make_response(render_page(
+            mode='quran', lang=lang, interpreter=interpreter, ayah_input=str(ayah),
+            **lookup_quran_ayah(surah_number, str(ayah), interpreter, lang, quran_data)))
+    if etag:
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = app.config['AYAH_PAGE_MAX_AGE']
+        response.cache_control.must_revalidate = True
+    else:
+        response.cache_control.no_store = True
+    return response
+
 # --- مسارات إضافية (Additional Routes) ---
 
+def sse_event(event, data):
+    """يصوغ حدثاً واحداً بصيغة Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+class StreamError(Exception):
+    """خطأ يُرسل إلى المتصفح كحدث error أثناء البث."""
+
+def stream_gemini_text(prompt):
+    """يولّد أجزاء رد Gemini (أو الرد المخزن كجزء واحد)، ويخزن النص الكامل في الذاكرة المؤقتة.
+
+    يُدمج بالمفتاح نفسه الذي يستخدمه ask_gemini: أول طلب يبث من Gemini، والطلبات
+    المتطابقة المتزامنة (بثاً أو لا) تنتظره وتأخذ النص الكامل كجزء واحد.
+    """
+    model = app.config['GEMINI_MODEL']
+    cached = _gemini_cache.get(model, prompt)
+    if cached is not None:
+        yield cached
+        return
+    key = ('gemini', cache_key(model, prompt))
+    future, leader = _inflight.claim(key)
+    if not leader:
+        answer = future.result()
+        if not answer:
+            raise StreamError("عذرًا، لم يستجب الذكاء الاصطناعي. يرجى المحاولة مرة أخرى.")
+        yield answer
+        return
+    parts = []
+    answer = None
+    try:
+        yield from _stream_gemini_leader(prompt, parts)
+        answer = ''.join(parts) or None
+        if answer:
+            _gemini_cache.set(model, prompt, answer)
+    finally: # يُحرَّر المفتاح ولو فشل البث أو انقطع العميل (None للمنتظرين كما في ask_gemini، ولا يُخزن رد ناقص)
+        _inflight.release(key, future, answer)
+
+def _stream_gemini_leader(prompt, parts):
+    if not gemini_key_configured():
+        logger.error("خطأ: لم يتم تكوين مفتاح Gemini API. يرجى إضافته إلى app.py أو كمتغير بيئة.")
+        raise StreamError("عذرًا، لم يتم تكوين مفتاح API الخاص بـ Gemini بشكل صحيح. يرجى إعلام المسؤول.")
+    import requests
+    try:
+        for piece in _gemini_client.stream_generate(prompt):
+            parts.append(piece)
+            yield piece
+    except GeminiCircuitOpen:
+        logger.warning("تم رفض طلب Gemini لأن قاطع الدائرة مفتوح (الخدمة متعثرة).")
+        raise StreamError("خدمة الذكاء الاصطناعي غير متاحة مؤقتاً. يرجى المحاولة بعد قليل.")
+    except (requests.exceptions.RequestException, GeminiError, ValueError) as e:
+        logger.error(f"فشل بث الرد من Gemini API: {e}")
+        raise StreamError("انقطع الاتصال بخدمة الذكاء الاصطناعي أثناء البث.")
+
+def ayah_nav_urls(surah_number, ayah_number, interpreter, lang='arabic'):
+    """رابطا صفحتي الآية السابقة والتالية في السورة نفسها (None عند الحدود أو إذا لم يُعرف رقم الآية)."""
+    urls = {"prev_url": None, "next_url": None}
+    if isinstance(ayah_number, int):
+        if ayah_number > 1:
+            urls["prev_url"] = url_for('ayah_page', surah=int(surah_number), ayah=ayah_number - 1,
+                                       interpreter=interpreter, lang=lang)
+        if ayah_number < ayah_count(surah_number):
+            urls["next_url"] = url_for('ayah_page', surah=int(surah_number), ayah=ayah_number + 1,
+                                       interpreter=interpreter, lang=lang)
+    return urls
+
+@app.route('/stream_tafsir')
+def stream_tafsir():
+    """يبث تفسير الآية جزءاً جزءاً (Server-Sent Events) أثناء توليده من Gemini.
+
+    الأحداث: meta (بيانات الآية)، chunk (جزء من النص)، error، و done (بصمة المفضلة،
+    ورابط الصوت المؤجل، ورابطا الآية السابقة والتالية أو null عند حدود السورة).
+    النص الكامل يُحفظ في ذاكرة Gemini المؤقتة كما في الطلب العادي.
+    """
+    surah_number = get_surah_number(request.args.get('surah'))
+    ayah_input = request.args.get('ayah_input', '').strip()
+    interpreter = request.args.get('interpreter', 'gemini_general')
+    if not surah_number or not ayah_input:
+        return jsonify(error="يرجى إدخال رقم سورة صحيح (1-114) أو اسمها ورقم الآية."), 400
+    if interpreter != 'maissar' and interpreter not in interpreter_names:
+        return jsonify(error="المفسّر المطلوب غير معروف."), 400
+    surah_name = get_surahs_data().get(surah_number, {}).get("arabic", f"السورة {surah_number}")
+
+    def events():
+        try:
+            # جلب نص الآية داخل البث حتى لا ينتظر أول بايت رحلة كاملة إلى Gemini
+            ayah_number_found, ayah_text = get_local_ayah(surah_number, ayah_input, load_quran_text())
+            ayah_text = ayah_text or _ai_tafsir_store.get_ayah_text(surah_number, ayah_number_found)
+            if not ayah_text:
+                ayah_text = extract_ayah_text(''.join(stream_gemini_text(
+                    build_ayah_text_prompt(surah_number, surah_name, ayah_input))))
+                ayah_number_found = ai_ayah_number(ayah_input)
+            if not ayah_text:
+                raise StreamError("لم يتمكن التطبيق من الحصول على نص الآية لتفسيرها.")
+            yield sse_event('meta', {"surah_name": surah_name, "surah_number": surah_number,
+                                     "ayah_number": ayah_number_found, "ayah_text": ayah_text})
+
+            tafsir = _ai_tafsir_store.get_tafsir(surah_number, ayah_number_found, interpreter)
+            if not tafsir and interpreter == 'maissar':
+                tafsir = lookup_local_tafsir(surah_number, ayah_number_found)
+            if tafsir:
+                yield sse_event('chunk', {"text": tafsir})
+            else:
+                parts = []
+                for piece in stream_gemini_text(build_tafsir_prompt(interpreter, ayah_text, surah_name, surah_number)):
+                    parts.append(piece)
+                    yield sse_event('chunk', {"text": piece})
+                tafsir = ''.join(parts)
+            if not tafsir:
+                raise StreamError("عذرًا، لم يتمكن التطبيق من جلب التفسير من المصدر المحدد.")
+
+            tafsir_hash = make_tafsir_hash(surah_number, ayah_number_found, tafsir)
+            is_favorited = tafsir_hash in favorite_hashes([tafsir_hash])
+            yield sse_event('done', {"hash": tafsir_hash, "is_favorited": is_favorited,
+                                     "audio_url": deferred_audio_url(tafsir, lang='ar'),
+                                     **ayah_nav_urls(surah_number, ayah_number_found, interpreter)})
+        except StreamError as e:
+            yield sse_event('error', {"message": str(e)})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/audio/<audio_hash>.mp3')
+def serve_audio(audio_hash):
+    """يقدم ملف الصوت المخزن مع ETag (البصمة نفسها) و Cache-Control ودعم طلبات المدى (Range) للتقديم والتأخير.
+
+    إذا كان الملف مسجلاً دون توليد يُبث الآن أثناء توليده على دفعات متوازية، فيبدأ
+    التشغيل بعد أول جزء؛ والطلبات التالية تُقدَّم من الملف المحفوظ.
+    """
+    if not is_valid_audio_id(audio_hash):
+        abort(404)
+    if not _audio_store.exists(audio_hash):
+        pending = _audio_store.pending(audio_hash)
+        if pending is None:
+            abort(404)
+        text, lang = pending
+        # المفتاح نفسه الذي يستخدمه ensure_audio: طلب واحد يولد الملف (بثاً أو من المُسخِّن)،
+        # والباقون ينتظرونه ثم يُقدَّم لهم الملف المحفوظ
+        key = ('tts', audio_hash)
+        future, leader = _inflight.claim(key)
+        if not leader:
+            if not future.result() and not ensure_audio(audio_hash, text, lang):
+                abort(503)
+        elif _audio_store.exists(audio_hash): # اكتمل بين الفحص والتسجيل
+            _inflight.release(key, future, True)
+        else:
+            started = stream_audio(audio_hash, text, lang)
+            if started is None:
+                _inflight.release(key, future, False)
+                abort(503)
+            first, chunks = started
+
+            def body():
+                yield first
+                try:
+                    yield from chunks
+                except Exception as e: # الرأس أُرسل، فلا يبقى إلا قطع البث
+                    logger.error(f"فشل تحويل النص إلى كلام أثناء البث: {e}")
+
+            def finish():
+                chunks.close() # إن انقطع العميل قبل الاكتمال يُحذف الملف المؤقت
+                _inflight.release(key, future, _audio_store.exists(audio_hash))
+            response = Response(body(), mimetype='audio/mpeg')
+            response.headers['Cache-Control'] = 'no-store' # نسخة البث بلا طول ولا Range، لا تُخزَّن
+            # يُحرَّر المفتاح عند إغلاق الرد، ولو انقطع العميل أو لم يُقرأ الرد أصلاً
+            response.call_on_close(finish)
+            return response
+    response = send_file(_audio_store.path(audio_hash), mimetype='audio/mpeg', conditional=True, etag=audio_hash,
+                         max_age=app.config['AUDIO_MAX_AGE'])
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+# --- واجهة JSON البرمجية (API v1) ---
+# تستخدم طبقات البحث والتخزين والذكاء الاصطناعي نفسها التي يستخدمها النموذج، وتعيد
+# الصوت كرابط /audio مؤجل التوليد بدل دمجه في الرد.
+
+def api_error(message, status):
+    return jsonify(error=message), status
+
+def ayah_payload(surah_number, surah_name, ayah_number, ayah_text, interpreter, tafsir, lang='arabic'):
+    """تمثيل JSON موحد لآية وتفسيرها."""
+    tafsir_hash = make_tafsir_hash(surah_number, ayah_number, tafsir)
+    payload = {
+        "surah": {"number": int(surah_number), "name": surah_name},
+        "ayah": {"number": ayah_number if isinstance(ayah_number, int) else None, "text": ayah_text}, # None: بُحث بالنص
+        "interpreter": interpreter,
+        "tafsir": tafsir,
+        "audio_url": deferred_audio_url(tafsir, lang='ar'),
+        "hash": tafsir_hash,
+    }
+    if lang == 'english':
+        payload["translated"] = translate_text(tafsir, to_lang='en')
+    return payload
+
+@app.route('/api/v1/ayah/<surah>/<ayah>')
+def api_ayah(surah, ayah):
+    """GET /api/v1/ayah/<السورة رقماً أو اسماً>/<رقم الآية أو جزء من نصها>?interpreter=maissar&lang=english"""
+    interpreter = request.args.get('interpreter', 'maissar')
+    lang = request.args.get('lang', 'arabic')
+    surah_number = get_surah_number(surah)
+    if not surah_number:
+        return api_error("يرجى إدخال رقم سورة صحيح (1-114) أو اسمها.", 400)
+    if interpreter != 'maissar' and interpreter not in interpreter_names:
+        return api_error("المفسّر المطلوب غير معروف.", 400)
+    if ayah.isdigit() and not 1 <= int(ayah) <= ayah_count(surah_number):
+        return api_error(f"رقم الآية خارج حدود السورة (1-{ayah_count(surah_number)}).", 404)
+    surah_name = get_surahs_data().get(surah_number, {}).get("arabic", f"السورة {surah_number}")
+
+    ayah_number, ayah_text = resolve_ayah_text(surah_number, surah_name, ayah, load_quran_text())
+    if not ayah_text:
+        return api_error("لم يتمكن التطبيق من الحصول على نص الآية.", 404)
+    tafsir = get_tafsir_for_ayah(interpreter, surah_number, surah_name, ayah_number, ayah_text)
+    if not tafsir:
+        return api_error("عذرًا، لم يتمكن التطبيق من جلب التفسير من المصدر المحدد.", 502)
+
+    payload = ayah_payload(surah_number, surah_name, ayah_number, ayah_text, interpreter, tafsir, lang)
+    payload["is_favorited"] = payload["hash"] in favorite_hashes([payload["hash"]])
+    return jsonify(payload)
+
+@app.route('/api/v1/search')
+def api_search():
+    """GET /api/v1/search?q=...&page=1&page_size=10 (بحث في التفاسير المحلية فقط، مرتب حسب الصلة)."""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return api_error("يرجى إدخال كلمة مفتاحية للبحث.", 400)
+    page, page_size = parse_pagination(request.args)
+    total, results = search_in_tafasir_local(query, get_surahs_data(), load_quran_text(),
+                                             page=page, page_size=page_size)
+    favorited = favorite_hashes([item['hash'] for item in results])
+    for item in results:
+        item['surah_number'] = int(item['surah_number'])
+        item['ayah_number'] = int(item['ayah_number'])
+        item['audio_url'] = deferred_audio_url(item['tafsir'], lang='ar')
+        item['is_favorited'] = item['hash'] in favorited
+    if request.args.get('lang') == 'english':
+        translate_items(results)
+    return jsonify(query=query, total=total, page=page, page_size=page_size,
+                   total_pages=(total + page_size - 1) // page_size, results=results)
+
+_AYAH_REF_RE = re.compile(r'^\s*([^:]+?)\s*:\s*(\d+)\s*(?:-\s*(\d+)\s*)?$')
+
+def parse_ayah_refs(refs):
+    """يحول قائمة مراجع إلى [(رقم السورة, رقم الآية)] بالترتيب ودون تكرار.
+
+    كل مرجع إما نص "2:255" أو "البقرة:1-5" أو قاموس {"surah": 2, "ayah": 1, "to": 5}.
+    يرفع ValueError برسالة عربية عند مرجع غير صالح.
+    """
+    if not isinstance(refs, list) or not refs:
+        raise ValueError("يرجى إرسال قائمة مراجع غير فارغة مثل [\"2:255\", \"1:1-7\"].")
+    max_ayahs = app.config['API_BATCH_MAX_AYAHS']
+    if len(refs) > max_ayahs: # كل مرجع آية واحدة على الأقل
+        raise ValueError(f"الحد الأقصى {max_ayahs} آية في الطلب الواحد.")
+    ayahs = {} # قاموس مرتب بلا تكرار؛ يُفحص الحد أثناء التوسيع لا بعده
+    for ref in refs:
+        if isinstance(ref, dict):
+            surah_input, start, end = ref.get('surah'), ref.get('ayah'), ref.get('to')
+        else:
+            match = _AYAH_REF_RE.match(str(ref))
+            if not match:
+                raise ValueError(f"مرجع غير صالح: {ref}")
+            surah_input, start, end = match.groups()
+        surah_number = get_surah_number(str(surah_input))
+        try:
+            start = int(start)
+            end = int(end) if end not in (None, '') else start
+        except (TypeError, ValueError):
+            raise ValueError(f"مرجع غير صالح: {ref}")
+        if not surah_number or not 1 <= start <= end <= ayah_count(surah_number):
+            raise ValueError(f"مرجع خارج حدود السورة: {ref}")
+        for ayah in range(start, end + 1):
+            ayahs[(surah_number, ayah)] = None
+            if len(ayahs) > max_ayahs:
+                raise ValueError(f"الحد الأقصى {max_ayahs} آية في الطلب الواحد.")
+    return list(ayahs)
+
+def lookup_ayah_local(surah_number, ayah_number, interpreter, quran_data):
+    """(نص الآية, التفسير) من المصادر المحلية فقط (quran.json، المخزن المحسوب مسبقاً، الميسر)."""
+    _, ayah_text = get_local_ayah(surah_number, ayah_number, quran_data)
+    ayah_text = ayah_text or _ai_tafsir_store.get_ayah_text(surah_number, ayah_number)
+    tafsir = _ai_tafsir_store.get_tafsir(surah_number, ayah_number, interpreter)
+    if not tafsir and interpreter == 'maissar':
+        tafsir = lookup_local_tafsir(surah_number, ayah_number)
+    return ayah_text, tafsir
+
+def lookup_ayah_remote(surah_number, surah_name, ayah_number, interpreter, quran_data):
+    """(نص الآية, التفسير) عبر المسار الكامل بما فيه الذكاء الاصطناعي (يُنفذ في مجمّع الخيوط)."""
+    _, ayah_text = resolve_ayah_text(surah_number, surah_name, ayah_number, quran_data)
+    if not ayah_text:
+        return None, None
+    return ayah_text, get_tafsir_for_ayah(interpreter, surah_number, surah_name, ayah_number, ayah_text)
+
+def batch_ayah_payload(surah_number, ayah_number, interpreter, ayah_text, tafsir):
+    surah_name = get_surahs_data().get(surah_number, {}).get("arabic", f"السورة {surah_number}")
+    if not ayah_text or not tafsir:
+        return {"surah": {"number": int(surah_number), "name": surah_name}, "ayah": {"number": ayah_number},
+                "error": "لم يتمكن التطبيق من الحصول على نص الآية أو تفسيرها."}
+    return ayah_payload(surah_number, surah_name, ayah_number, ayah_text, interpreter, tafsir)
+
+def iter_batch_ayahs(ayahs, interpreter):
+    """يولد (الترتيب, الرد) لكل آية: المحلية أولاً مجمعة حسب السورة، ثم نتائج الذكاء الاصطناعي فور اكتمالها."""
+    quran_data = load_quran_text()
+    by_surah = {}
+    for order, (surah_number, ayah_number) in enumerate(ayahs):
+        by_surah.setdefault(surah_number, []).append((order, ayah_number))
+
+    remote = []
+    for surah_number, items in by_surah.items():
+        get_tafsir_data_local(surah_number) # تحميل ملف السورة مرة واحدة لكل آياتها
+        for order, ayah_number in items:
+            ayah_text, tafsir = lookup_ayah_local(surah_number, ayah_number, interpreter, quran_data)
+            if ayah_text and tafsir:
+                yield order, batch_ayah_payload(surah_number, ayah_number, interpreter, ayah_text, tafsir)
+            else:
+                remote.append((order, surah_number, ayah_number))
+    if not remote:
+        return
+
+    with ThreadPoolExecutor(max_workers=app.config['API_BATCH_WORKERS']) as pool:
+        futures = {}
+        for order, surah_number, ayah_number in remote:
+            surah_name = get_surahs_data().get(surah_number, {}).get("arabic", f"السورة {surah_number}")
+            # بلا سياق الطلب: رسائل notify تُهمل خارجه فلا تُكتب في جلسة العميل
+            future = pool.submit(lookup_ayah_remote, surah_number, surah_name, ayah_number, interpreter, quran_data)
+            futures[future] = (order, surah_number, ayah_number)
+        for future in as_completed(futures):
+            order, surah_number, ayah_number = futures[future]
+            ayah_text, tafsir = future.result()
+            yield order, batch_ayah_payload(surah_number, ayah_number, interpreter, ayah_text, tafsir)
+
+@app.route('/api/v1/ayahs', methods=['GET', 'POST'])
+def api_ayahs():
+    """تفاسير عدة آيات في طلب واحد.
+
+    POST {"refs": ["2:255", "1:1-7", {"surah": "الكهف", "ayah": 1, "to": 10}], "interpreter": "maissar", "lang": "english"}
+    أو GET ?refs=2:255,1:1-7&interpreter=maissar
+    format=ndjson (أو Accept: application/x-ndjson) يبث سطراً لكل آية فور جاهزيتها بدل رد واحد مرتب.
+    """
+    if request.method == 'POST':
+        body = request.get_json(silent=True)
+        if body is None:
+            body = {}
+        if not isinstance(body, dict):
+            return api_error("يجب أن يكون جسم الطلب كائن JSON مثل {\"refs\": [\"2:255\"]}.", 400)
+        refs, interpreter = body.get('refs'), body.get('interpreter', 'maissar')
+        lang, response_format = body.get('lang', 'arabic'), body.get('format')
+    else:
+        refs = [ref for ref in request.args.get('refs', '').split(',') if ref.strip()]
+        interpreter = request.args.get('interpreter', 'maissar')
+        lang, response_format = request.args.get('lang', 'arabic'), request.args.get('format')
+    if not isinstance(interpreter, str) or not isinstance(lang, str):
+        return api_error("يجب أن يكون interpreter و lang نصين.", 400)
+    if interpreter != 'maissar' and interpreter not in interpreter_names:
+        return api_error("المفسّر المطلوب غير معروف.", 400)
+    try:
+        ayahs = parse_ayah_refs(refs)
+    except ValueError as e:
+        return api_error(str(e), 400)
+
+    if response_format == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson':
+        def lines():
+            for _, payload in iter_batch_ayahs(ayahs, interpreter):
+                if lang == 'english' and 'tafsir' in payload:
+                    payload['translated'] = translate_text(payload['tafsir'], to_lang='en')
+                yield json.dumps(payload, ensure_ascii=False) + '\n'
+        return Response(stream_with_context(lines()), mimetype='application/x-ndjson',
+                        headers={'X-Accel-Buffering': 'no'})
+
+    results = [None] * len(ayahs)
+    for order, payload in iter_batch_ayahs(ayahs, interpreter):
+        results[order] = payload
+    if lang == 'english':
+        translate_items([payload for payload in results if 'tafsir' in payload])
+    return jsonify(interpreter=interpreter, count=len(results), results=results)
+
 @app.route('/add_favorite', methods=['POST'])
 def add_favorite():
     data = request.form
@@ -1346,47 +1135,52 @@ def add_favorite():
     if not ayah_hash: # Fallback if hash not passed for some reason (old data)
         ayah_hash = hashlib.md5(f"{surah_number}-{ayah_number}-{tafsir}".encode()).hexdigest()
 
-    favorites = load_favorites()
-    
-    # Check if already exists using the hash
-    if any(fav['hash'] == ayah_hash for fav in favorites):
-        flash("هذه الآية والتفسير موجودة بالفعل في المفضلة!", "warning")
+    favorite = {
+        "surah_name": surah_name,
+        "surah_number": surah_number,
+        "ayah_number": ayah_number,
+        "ayah_text": ayah_text,
+        "tafsir": tafsir,
+        "lang": lang,
+        "interpreter": interpreter,
+        "translated": translated,
+        "timestamp": datetime.now().isoformat(),
+        "hash": ayah_hash
+    }
+
+    # الفهرس الفريد على البصمة يمنع التكرار
+    try:
+        added = _favorites_store.add(favorite)
+    except Exception as e:
+        logger.error(f"خطأ في حفظ المفضلة: {e}")
+        flash(f"حدث خطأ في حفظ المفضلة: {e}", "error")
     else:
-        favorites.append({
-            "surah_name": surah_name,
-            "surah_number": surah_number,
-            "ayah_number": ayah_number,
-            "ayah_text": ayah_text,
-            "tafsir": tafsir,
-            "lang": lang,
-            "interpreter": interpreter,
-            "translated": translated,
-            "timestamp": datetime.now().isoformat(),
-            "hash": ayah_hash
-        })
-        save_favorites(favorites)
-        flash("تمت إضافة التفسير إلى المفضلة بنجاح!", "success")
+        if added:
+            flash("تمت إضافة التفسير إلى المفضلة بنجاح!", "success")
+        else:
+            flash("هذه الآية والتفسير موجودة بالفعل في المفضلة!", "warning")
     
-    # Redirect back to home, possibly with query parameters to retain context
-    return redirect(url_for('home', 
-                            mode='quran', # Or the mode it came from
-                            surah=surah_number, 
-                            ayah_input=ayah_number, 
-                            lang=lang,
-                            interpreter=interpreter
-                           ))
+    # العودة إلى الرابط الثابت للآية (GET) حتى لا يعيد زر الرجوع إرسال النموذج
+    if str(surah_number).isdigit() and str(ayah_number).isdigit() and 1 <= int(ayah_number) <= ayah_count(surah_number):
+        if interpreter != 'maissar' and interpreter not in interpreter_names:
+            interpreter = 'maissar' # نتائج البحث تُحفظ بمفسّر "بحث" وهي من الميسر المحلي
+        return redirect(url_for('ayah_page', surah=int(surah_number), ayah=int(ayah_number),
+                                interpreter=interpreter, lang=lang or 'arabic'))
+    return redirect(url_for('home'))
 
 
 @app.route('/remove_favorite/<fav_hash>', methods=['POST'])
 def remove_favorite(fav_hash):
-    favorites = load_favorites()
-    new_favorites = [fav for fav in favorites if fav.get('hash') != fav_hash]
-    
-    if len(new_favorites) < len(favorites):
-        save_favorites(new_favorites)
-        flash("تم حذف التفسير من المفضلة بنجاح!", "success")
+    try:
+        removed = _favorites_store.remove(fav_hash)
+    except Exception as e:
+        logger.error(f"خطأ في حذف المفضلة: {e}")
+        flash(f"حدث خطأ في حذف المفضلة: {e}", "error")
     else:
-        flash("التفسير غير موجود في المفضلة.", "error")
+        if removed:
+            flash("تم حذف التفسير من المفضلة بنجاح!", "success")
+        else:
+            flash("التفسير غير موجود في المفضلة.", "error")
     
     return redirect(url_for('show_favorites'))
 
@@ -1432,8 +1226,8 @@ if __name__ == '__main__':
     os.makedirs(Config.DATA_DIR, exist_ok=True)
     
     # رسالة للمطور للتأكد من وجود الملفات (أصبحت تحذيرية لا تمنع التشغيل)
-    if not os.path.exists(Config.QURAN_FILE):
-        logger.error(f"ملف القرآن غير موجود في المسار: {Config.QURAN_FILE}. سيتم جلب الآيات من الذكاء الاصطناعي.")
+    if not any(os.path.exists(path) for path in Config.QURAN_FILES):
+        logger.error(f"ملف القرآن غير موجود في المسارات: {', '.join(Config.QURAN_FILES)}. سيتم جلب الآيات من الذكاء الاصطناعي.")
         print("\n!!! تحذير: ملف quran.json غير موجود. قد يؤثر على الأداء واستقرار جلب الآيات. !!!\n")
     if not os.path.exists(Config.SURAHS_FILE):
         logger.error(f"ملف السور غير موجود في المسار: {Config.SURAHS_FILE}. سيتم استخدام أسماء افتراضية.")
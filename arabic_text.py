@@ -0,0 +1,56 @@
+"""توحيد النص العربي (Arabic Normalization) المشترك بين التطبيق وأدوات سطر الأوامر.
+
+الجداول والأنماط تُبنى مرة واحدة عند الاستيراد بدلاً من سلسلة re.sub في كل استدعاء:
+    - حذف التشكيل وعلامات الوقف القرآنية والألف الخنجرية
+    - توحيد الهمزات (أ إ آ ٱ -> ا، ؤ -> و، ئ -> ي) والتاء المربوطة (ة -> ه)
+    - حذف التطويل (ـ) وتوحيد الألف المقصورة (ى -> ي) اختيارياً
+
+ملاحظة أداء: str.translate بقاموس أبطأ بنحو ثلاث مرات على النصوص غير اللاتينية
+من نمط حذف واحد مُجمَّع مسبقاً متبوع بـ str.replace لكل حرف في الجدول
+(انظر scripts/bench_normalize.py)، لذلك نطبق الجدول بهذه الطريقة.
+"""
+import re
+
+# الفتحتان .. السكون، والألف الخنجرية، وعلامات المصحف (الوقف والصلة...)
+_TASHKEEL = [chr(c) for c in range(0x064B, 0x0653)] + ['ٰ'] + \
+            [chr(c) for c in range(0x06D6, 0x06EE)]
+TATWEEL = 'ـ'
+
+_LETTER_MAP = {
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ؤ': 'و', 'ئ': 'ي',
+    'ة': 'ه',
+}
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _build_strip_re(tatweel):
+    chars = _TASHKEEL + ([TATWEEL] if tatweel else [])
+    return re.compile('[%s]+' % ''.join(chars))
+
+
+# نمط حذف وجدول استبدال لكل تركيبة من الخيارات، محسوبة مسبقاً
+_STRIP_RES = {tatweel: _build_strip_re(tatweel) for tatweel in (False, True)}
+_REPLACEMENTS = {maqsura: tuple(_LETTER_MAP.items()) + ((('ى', 'ي'),) if maqsura else ())
+                 for maqsura in (False, True)}
+
+
+def normalize_arabic(text, tatweel=True, alef_maqsura=False, lower=True):
+    """يعيد النص بعد توحيد الحروف وحذف التشكيل.
+
+    tatweel: حذف حرف التطويل، alef_maqsura: تحويل (ى) إلى (ي)،
+    lower: تحويل الحروف اللاتينية إلى الصغيرة (لأسماء السور الإنجليزية).
+    """
+    if not text:
+        return ''
+    text = _STRIP_RES[bool(tatweel)].sub('', text)
+    for src, dst in _REPLACEMENTS[bool(alef_maqsura)]:
+        if src in text:
+            text = text.replace(src, dst)
+    return text.lower() if lower else text
+
+
+def normalize_query(text, alef_maqsura=True):
+    """توحيد مدخلات المستخدم: التوحيد الكامل مع ضغط المسافات وقص الأطراف."""
+    return _WHITESPACE_RE.sub(' ', normalize_arabic(text, alef_maqsura=alef_maqsura)).strip()
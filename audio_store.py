@@ -0,0 +1,91 @@
+"""مخزن ملفات الصوت (MP3) على القرص، معنون بالمحتوى.
+
+اسم الملف هو بصمة sha256 للغة والنص، فالنص نفسه يُحوَّل إلى كلام مرة واحدة
+فقط، ويُقدَّم بعدها كملف ثابت من مسار /audio/<البصمة>.mp3 بدلاً من دمجه
+في الصفحة بترميز Base64.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+_AUDIO_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+def audio_id(text, lang):
+    """بصمة ثابتة لزوج (النص، اللغة)."""
+    return hashlib.sha256(f"{lang}\n{text}".encode('utf-8')).hexdigest()[:32]
+
+
+def is_valid_audio_id(value):
+    return bool(value) and bool(_AUDIO_ID_RE.match(value))
+
+
+class AudioStore:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, audio_id):
+        # تقسيم على مجلدات فرعية حتى لا يتضخم مجلد واحد بآلاف الملفات
+        return os.path.join(self.directory, audio_id[:2], f"{audio_id}.mp3")
+
+    def exists(self, audio_id):
+        return os.path.exists(self.path(audio_id))
+
+    def _meta_path(self, audio_id):
+        return os.path.join(self.directory, audio_id[:2], f"{audio_id}.json")
+
+    def register(self, audio_id, text, lang):
+        """يسجل النص المطلوب لملف لم يُولَّد بعد، ليولده المسار /audio عند أول طلب.
+
+        التسجيل على القرص (لا في الذاكرة) حتى يراه أي عامل (worker) يستقبل الطلب.
+        """
+        meta_path = self._meta_path(audio_id)
+        if self.exists(audio_id) or os.path.exists(meta_path):
+            return
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(meta_path), suffix='.part')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'text': text, 'lang': lang}, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+
+    def pending(self, audio_id):
+        """(النص، اللغة) لملف مسجل لم يُولَّد بعد، أو None."""
+        try:
+            with open(self._meta_path(audio_id), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            return meta['text'], meta['lang']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def write(self, audio_id, chunks):
+        """يكتب الملف كتابة ذرية (ملف مؤقت ثم إعادة تسمية) فلا يُقدَّم ملف ناقص أبداً."""
+        for _ in self.write_stream(audio_id, chunks):
+            pass
+        return self.path(audio_id)
+
+    def write_stream(self, audio_id, chunks):
+        """مثل write لكنه يعيد كل جزء فور كتابته، ليُبث للعميل أثناء التوليد.
+
+        لا يُثبَّت الملف إلا بعد استهلاك كل الأجزاء؛ وإذا توقف المستهلك (انقطع العميل)
+        أو فشل أحد الأجزاء يُحذف الملف المؤقت.
+        """
+        final_path = self.path(audio_id)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(final_path), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        try:
+            os.remove(self._meta_path(audio_id))
+        except OSError:
+            pass
@@ -0,0 +1,103 @@
+"""فهرس n-gram حرفي لنص القرآن: تحديد الآية من جزء من نصها محلياً.
+
+يُقسم نص كل آية بعد التوحيد (بلا تشكيل، همزات موحدة، حروف فقط) إلى مقاطع من
+ثلاثة أحرف متتالية تشمل حدود الكلمات، ولكل مقطع قائمة الآيات التي يرد فيها.
+الاستعلام يُقسم بالطريقة نفسها، وتُرتب الآيات بنسبة مقاطع الاستعلام الموجودة فيها
+(التداخل)، فيتحمل الفهرس اختلاف الرسم العثماني والأخطاء الإملائية اليسيرة وترتيب
+الكلمات، ويجيب في أجزاء من المللي ثانية بدل رحلة كاملة إلى الذكاء الاصطناعي.
+
+رقم المستند هو موقع الآية في مصفوفة quran_text المسطحة، فتقييد البحث بسورة
+مجرد نطاق من الأرقام.
+"""
+import heapq
+import re
+from array import array
+from bisect import bisect_right
+
+from arabic_text import normalize_arabic
+from quran_meta import ayah_count
+from quran_text import SURAH_OFFSETS, ayah_index
+
+NGRAM_SIZE = 3
+
+_NON_LETTER_RE = re.compile(r'[\W\d_]+', re.UNICODE)
+
+
+def normalize_ayah_text(text):
+    """النص موحداً: حروف فقط مفصولة بمسافة واحدة."""
+    return _NON_LETTER_RE.sub(' ', normalize_arabic(text or '', alef_maqsura=True)).strip()
+
+
+def ngrams(normalized):
+    """مجموعة مقاطع n-gram للنص الموحد، مع مسافة في طرفيه حتى تُحتسب بدايات الكلمات ونهاياتها."""
+    if not normalized:
+        return set()
+    padded = f' {normalized} '
+    if len(padded) <= NGRAM_SIZE:
+        return {padded}
+    return {padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+
+
+class AyahNgramIndex:
+    """لكل مقطع قائمة بأرقام الآيات (مواقعها في المصحف) التي يرد فيها."""
+
+    def __init__(self):
+        self.postings = {} # المقطع -> array('H') بمواقع الآيات
+        self._texts = {}   # موقع الآية -> نصها الموحد
+
+    def __len__(self):
+        return len(self._texts)
+
+    def add(self, surah_number, ayah_number, text):
+        """يضيف نص آية واحدة؛ يعيد False للآية الخارجة عن المصحف أو المضافة مسبقاً."""
+        doc_id = ayah_index(surah_number, ayah_number)
+        if doc_id is None or doc_id in self._texts:
+            return False
+        normalized = normalize_ayah_text(text)
+        self._texts[doc_id] = normalized
+        for gram in ngrams(normalized):
+            self.postings.setdefault(gram, array('H')).append(doc_id)
+        return True
+
+    @staticmethod
+    def _location(doc_id):
+        """يحول موقع الآية في المصحف إلى (السورة، الآية)."""
+        surah_index = bisect_right(SURAH_OFFSETS, doc_id) - 1
+        return surah_index + 1, doc_id - SURAH_OFFSETS[surah_index] + 1
+
+    def search(self, fragment, surah_number=None, limit=5):
+        """يعيد حتى limit من (السورة، الآية، الدرجة) مرتبة تنازلياً بالتداخل.
+
+        الدرجة نسبة مقاطع الاستعلام الموجودة في الآية (0..1). عند التساوي تُقدَّم
+        الآية التي تحتوي الجزء حرفياً، ثم الأقصر (الأقرب طولاً للجزء)، ثم الأسبق في المصحف.
+        surah_number يقيد البحث بسورة واحدة، وبدونه يشمل المصحف كله.
+        """
+        normalized = normalize_ayah_text(fragment)
+        grams = ngrams(normalized)
+        if not grams:
+            return []
+        if surah_number is None:
+            start, end = 0, None
+        else:
+            count = ayah_count(surah_number)
+            if not count:
+                return []
+            start = SURAH_OFFSETS[int(surah_number) - 1]
+            end = start + count
+
+        counts = {}
+        for gram in grams:
+            for doc_id in self.postings.get(gram, ()):
+                if doc_id >= start and (end is None or doc_id < end):
+                    counts[doc_id] = counts.get(doc_id, 0) + 1
+        ranked = heapq.nlargest(max(1, int(limit)), (
+            (matched, normalized in self._texts[doc_id], -len(self._texts[doc_id]), -doc_id)
+            for doc_id, matched in counts.items()))
+        return [self._location(-neg_id) + (matched / len(grams),) for matched, _, _, neg_id in ranked]
+
+    def best(self, fragment, surah_number=None, min_score=0.0):
+        """(السورة، الآية، الدرجة) لأفضل آية إذا بلغت درجتها min_score، وإلا None."""
+        results = self.search(fragment, surah_number=surah_number, limit=1)
+        if results and results[0][2] >= min_score:
+            return results[0]
+        return None
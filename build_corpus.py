@@ -0,0 +1,214 @@
+"""ترجمة كل مصادر النصوص إلى ملف SQLite واحد يُقرأ منه عشوائياً (corpus.CORPUS_DB).
+
+المصادر (انظر corpus.source_files): ملفات التفسير في مجلدات corpus.TAFSIR_DIRS،
+ونص القرآن (data/quran.json و quran.json بأشكالهما، انظر quran_text.py)،
+وأسماء السور (data/surahs.json)، وشرح المفردات (tafasir/baqara_tafsir.json).
+
+كل آية صف واحد مفتاحه (المصدر، السورة، الآية، اللغة)، فتقرأ الواجهات ما تحتاجه فقط
+باستعلام على المفتاح الأساسي بدل تحليل ملفات JSON كاملة في كل عملية.
+
+البناء تزايدي: البيان (manifest) يحفظ بصمة SHA-256 وحجم ووقت تعديل كل ملف، فلا
+يُعاد إلا ما تغير محتواه (الملف الذي لم يتغير حجمه ولا وقت تعديله لا يُقرأ أصلاً)،
+وتُحذف صفوف الملفات المحذوفة. البناء كله معاملة واحدة فلا يرى القراء ملفاً نصف مبني.
+
+الاستخدام:
+    python build_corpus.py [--db data/corpus.sqlite3] [--force]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+
+import corpus
+import quran_text
+from surah_resolver import SurahResolver
+
+logger = logging.getLogger("build_corpus")
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS manifest (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    source TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    built_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ayahs (
+    source TEXT NOT NULL,
+    surah INTEGER NOT NULL,
+    ayah INTEGER NOT NULL,
+    lang TEXT NOT NULL,
+    text TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (source, surah, ayah, lang)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ayahs_path ON ayahs (path);
+CREATE TABLE IF NOT EXISTS surahs (
+    number INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS glossary (
+    surah INTEGER NOT NULL,
+    term TEXT NOT NULL,
+    text TEXT NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS glossary_surah ON glossary (surah);
+'''
+
+# أنواع المصادر التي تُحوَّل أسماء السور فيها إلى أرقام: تُعاد إذا تغير ملف الأسماء
+_NAME_DEPENDENT = ('quran', 'glossary')
+
+_KIND_NAMES = {'tafsir': 'التفسير', 'quran': 'القرآن', 'surahs': 'السور', 'glossary': 'شرح المفردات'}
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def tafsir_rows(data, surah_number):
+    """(السورة، الآية، اللغة، النص) من ملف تفسير سورة: {آية: نص} أو {آية: {لغة: نص}}."""
+    for ayah, entry in data.items():
+        if not str(ayah).isdigit():
+            continue
+        texts = entry if isinstance(entry, dict) else {'ar': entry}
+        for lang, text in texts.items():
+            if isinstance(text, str) and text:
+                yield surah_number, int(ayah), lang, text
+
+
+class CorpusBuilder:
+    def __init__(self, db_path, force=False):
+        self.db_path = db_path
+        self.force = force
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # isolation_level=None: البناء كله معاملة واحدة نفتحها بأنفسنا
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
+        self.conn.executescript(_SCHEMA)
+        self._resolver = None
+
+    def resolver(self):
+        if self._resolver is None:
+            path = corpus.surahs_file()
+            names = corpus.load_json(path, 'السور') if path else None
+            self._resolver = SurahResolver(names or {})
+        return self._resolver
+
+    def _delete(self, label):
+        for table in ('ayahs', 'surahs', 'glossary'):
+            self.conn.execute(f'DELETE FROM {table} WHERE path = ?', (label,))
+
+    def _insert(self, path, kind, label):
+        """يكتب صفوف ملف واحد ويعيد عددها (0 إذا تعذر تحليله)."""
+        data = corpus.load_json(path, _KIND_NAMES[kind])
+        if not isinstance(data, (dict, list) if kind == 'quran' else dict):
+            return 0
+        if kind == 'tafsir':
+            source = corpus.source_label(os.path.dirname(path))
+            rows = tafsir_rows(data, int(os.path.basename(path)[:-5]))
+        elif kind == 'quran':
+            source = label
+            rows = ((surah_number, ayah, 'ar', text)
+                    for surah_number, ayah, text in quran_text.iter_quran_json(data, self.resolver()))
+        elif kind == 'surahs':
+            rows = [(int(number), json.dumps(names, ensure_ascii=False), label)
+                    for number, names in data.items() if str(number).isdigit()]
+            self.conn.executemany('INSERT OR REPLACE INTO surahs (number, data, path) VALUES (?, ?, ?)', rows)
+            return len(rows)
+        else: # glossary
+            rows = []
+            for name, terms in data.items():
+                surah_number = self.resolver().resolve(name)
+                if surah_number is None or not isinstance(terms, dict):
+                    logger.warning(f"تعذر تحديد السورة '{name}' في {label}، تم تخطيها.")
+                    continue
+                rows += [(int(surah_number), term, text, label) for term, text in terms.items()]
+            self.conn.executemany('INSERT INTO glossary (surah, term, text, path) VALUES (?, ?, ?, ?)', rows)
+            return len(rows)
+        rows = [(source, surah_number, ayah, lang, text, label) for surah_number, ayah, lang, text in rows]
+        self.conn.executemany('INSERT OR REPLACE INTO ayahs (source, surah, ayah, lang, text, path) '
+                              'VALUES (?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def build(self, files):
+        """يعيد {'unchanged': n، 'rebuilt': [...]، 'removed': [...]، 'rows': n}."""
+        manifest = {row[0]: row[1:] for row in
+                    self.conn.execute('SELECT path, sha256, size, mtime_ns FROM manifest')}
+        # ملف الأسماء أولاً: إذا تغير تُعاد المصادر التي تعتمد عليه
+        files = sorted(files, key=lambda item: item[1] != 'surahs')
+        stats = {'unchanged': 0, 'rebuilt': [], 'removed': [], 'rows': 0}
+        names_changed = False
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            for path, kind in files:
+                label = corpus.source_label(path)
+                stat = os.stat(path)
+                previous = manifest.pop(label, None)
+                forced = self.force or (names_changed and kind in _NAME_DEPENDENT)
+                if not forced and previous and previous[1:] == (stat.st_size, stat.st_mtime_ns):
+                    stats['unchanged'] += 1
+                    continue
+                sha256 = file_sha256(path)
+                if not forced and previous and previous[0] == sha256:
+                    # لُمس الملف دون تغيير محتواه: نحدّث البيان فقط
+                    self.conn.execute('UPDATE manifest SET size = ?, mtime_ns = ? WHERE path = ?',
+                                      (stat.st_size, stat.st_mtime_ns, label))
+                    stats['unchanged'] += 1
+                    continue
+                self._delete(label)
+                rows = self._insert(path, kind, label)
+                source = corpus.source_label(os.path.dirname(path)) if kind == 'tafsir' else label
+                self.conn.execute('INSERT OR REPLACE INTO manifest (path, kind, source, sha256, size, mtime_ns, '
+                                  'rows, built_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                  (label, kind, source, sha256, stat.st_size, stat.st_mtime_ns, rows, time.time()))
+                stats['rebuilt'].append((label, rows))
+                stats['rows'] += rows
+                if kind == 'surahs':
+                    names_changed = True
+                    self._resolver = None
+            for label in manifest: # ملفات لم تعد موجودة
+                self._delete(label)
+                self.conn.execute('DELETE FROM manifest WHERE path = ?', (label,))
+                stats['removed'].append(label)
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ترجمة مصادر النصوص إلى ملف SQLite واحد.")
+    parser.add_argument('--db', default=corpus.CORPUS_DB, help=f"الملف الناتج (الافتراضي: {corpus.CORPUS_DB})")
+    parser.add_argument('--force', action='store_true', help="إعادة بناء كل الملفات ولو لم تتغير")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    started = time.monotonic()
+    builder = CorpusBuilder(args.db, force=args.force)
+    files = corpus.source_files()
+    stats = builder.build(files)
+    for label, rows in stats['rebuilt']:
+        logger.info(f"أعيد بناء {label}: {rows} صفاً")
+    for label in stats['removed']:
+        logger.info(f"حُذف {label} (لم يعد موجوداً)")
+    logger.info(f"انتهى في {(time.monotonic() - started) * 1000:.0f}ms: {len(files)} ملفاً، "
+                f"{len(stats['rebuilt'])} أعيد بناؤها، {stats['unchanged']} بلا تغيير، "
+                f"{len(stats['removed'])} محذوفة -> {args.db}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,380 @@
+"""وصول موحد ومخزن مؤقتاً إلى ملفات التفسير (tafasir_json/<رقم السورة>.json) لكل الواجهات.
+
+سياسة واحدة لمواقع الملفات بدلاً من قوائم مسارات مختلفة في كل أداة: تُبحث
+المجلدات في TAFSIR_DIRS بالترتيب (أو QURANOMIND_TAFSIR_DIRS مفصولة بـ os.pathsep)،
+وتُدمج آيات السورة من كل المجلدات التي فيها ملفها، والأسبق في الترتيب يغلب عند
+التعارض. المسارات نسبية إلى جذر المشروع لا إلى مجلد التشغيل الحالي.
+
+إذا وُجد الملف المترجم (CORPUS_DB، يبنيه build_corpus.py) وكان مطابقاً لملفات JSON
+الحالية (الحجم ووقت التعديل في بيانه)، تُقرأ منه الآيات المطلوبة فقط باستعلامات
+مفهرسة بدل تحليل ملف السورة كاملاً؛ وإلا تُقرأ ملفات JSON مباشرة.
+
+كل سورة تُقرأ مرة واحدة في العملية، فالاستعلامات المتكررة (في الواجهات خاصة)
+قراءة من الذاكرة. القواميس المعادة مشتركة فلا تُعدّل.
+
+مدخل الآية في الملف نص عربي، أو قاموس باللغات {"ar": ...، "en": ...}.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from sqlite_store import SQLiteStore
+from surah_resolver import SurahResolver
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TAFSIR_DIRS = (
+    os.path.join(BASE_DIR, 'tafasir_json'),
+    os.path.join(BASE_DIR, 'data', 'tafasir_json'),
+    os.path.expanduser('~/QuranoMind/tafasir_json'),
+    os.path.expanduser('~/QuranoMind/data/tafasir_json'),
+)
+SURAHS_FILES = (
+    os.path.join(BASE_DIR, 'data', 'surahs.json'),
+    os.path.expanduser('~/QuranoMind/data/surahs.json'),
+)
+# نص القرآن (انظر quran_text.py): data/quran.json ({سورة: {آية: نص}}) ثم quran.json في الجذر (مفهرس باسم السورة)
+QURAN_FILES = (
+    os.path.join(BASE_DIR, 'data', 'quran.json'),
+    os.path.join(BASE_DIR, 'quran.json'),
+)
+# شرح مفردات كل سورة: {"اسم السورة": {"الكلمة": "الشرح"}}
+GLOSSARY_FILES = (
+    os.path.join(BASE_DIR, 'tafasir', 'baqara_tafsir.json'),
+)
+CORPUS_DB = os.environ.get('QURANOMIND_CORPUS_DB', os.path.join(BASE_DIR, 'data', 'corpus.sqlite3'))
+
+
+def tafsir_dirs():
+    """المجلدات الموجودة فعلاً حسب سياسة المسارات، بلا تكرار."""
+    configured = os.environ.get('QURANOMIND_TAFSIR_DIRS')
+    candidates = configured.split(os.pathsep) if configured else TAFSIR_DIRS
+    dirs, seen = [], set()
+    for directory in candidates:
+        real = os.path.realpath(directory)
+        if os.path.isdir(real) and real not in seen:
+            seen.add(real)
+            dirs.append(directory)
+    return dirs
+
+
+def source_label(path):
+    """اسم ثابت للمصدر في الملف المترجم: المسار نسبة إلى جذر المشروع إن كان داخله."""
+    path = os.path.abspath(path)
+    relative = os.path.relpath(path, BASE_DIR)
+    return path if relative.startswith(os.pardir) else relative.replace(os.sep, '/')
+
+
+def tafsir_files(dirs):
+    """(المسار، رقم السورة) لكل ملف <رقم>.json في المجلدات."""
+    for directory in dirs:
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.json') and name[:-5].isdigit():
+                yield os.path.join(directory, name), int(name[:-5])
+
+
+def surahs_file():
+    """أول ملف أسماء سور موجود، أو None."""
+    return next((path for path in SURAHS_FILES if os.path.isfile(path)), None)
+
+
+def source_files(dirs=None):
+    """[(المسار، النوع)] لكل الملفات التي يترجمها build_corpus.py."""
+    dirs = tafsir_dirs() if dirs is None else dirs
+    files = [(path, 'tafsir') for path, _ in tafsir_files(dirs)]
+    files += [(path, 'quran') for path in QURAN_FILES if os.path.isfile(path)]
+    if surahs_file():
+        files.append((surahs_file(), 'surahs'))
+    files += [(path, 'glossary') for path in GLOSSARY_FILES if os.path.isfile(path)]
+    return files
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _entry_text(entry, lang):
+    if isinstance(entry, dict):
+        return entry.get(lang)
+    return entry if lang == 'ar' else None
+
+
+def _has_text(entry):
+    """هل في المدخل نص غير فارغ بأي لغة؟ (كما يكتب build_corpus الصفوف)"""
+    texts = entry.values() if isinstance(entry, dict) else (entry,)
+    return any(isinstance(text, str) and text for text in texts)
+
+
+def load_json(path, what):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"خطأ في تحميل ملف {what} {path}: {e}")
+        return None
+
+
+class CompiledCorpus(SQLiteStore):
+    """قارئ الملف المترجم: اتصال SQLite للقراءة فقط لكل خيط، واستعلامات على المفتاح الأساسي."""
+
+    PRAGMAS = ()
+
+    def _open(self):
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    def is_fresh(self, files, tafsir_sources):
+        """هل يطابق البيان ملفات المصادر الحالية (لا ملف جديد أو معدل أو محذوف)؟"""
+        try:
+            manifest = {path: (kind, source, size, mtime_ns) for path, kind, source, size, mtime_ns in
+                        self._connect().execute('SELECT path, kind, source, size, mtime_ns FROM manifest')}
+        except sqlite3.Error as e:
+            logger.error(f"تعذر قراءة الملف المترجم {self.path}: {e}")
+            return False
+        current = set()
+        for path, _ in files:
+            label = source_label(path)
+            current.add(label)
+            entry = manifest.get(label)
+            stat = os.stat(path)
+            if entry is None or entry[2:] != (stat.st_size, stat.st_mtime_ns):
+                return False
+        return not any(kind == 'tafsir' and source in tafsir_sources and label not in current
+                       for label, (kind, source, _, _) in manifest.items())
+
+    def source_fresh(self, path):
+        """هل تُرجم الملف path ولم يتغير حجمه ولا وقت تعديله بعدها؟"""
+        try:
+            row = self._connect().execute('SELECT size, mtime_ns FROM manifest WHERE path = ?',
+                                          (source_label(path),)).fetchone()
+            stat = os.stat(path)
+        except (sqlite3.Error, OSError):
+            return False
+        return row == (stat.st_size, stat.st_mtime_ns)
+
+    def source_rows(self, path):
+        """(السورة، الآية، النص) لكل آيات المصدر path بالعربية، بالترتيب."""
+        return self._connect().execute(
+            "SELECT surah, ayah, text FROM ayahs WHERE source = ? AND lang = 'ar' ORDER BY surah, ayah",
+            (source_label(path),))
+
+    def _merged(self, sources, rows):
+        """يدمج صفوف (المصدر، المفتاح، النص) بحيث يغلب المصدر الأسبق في sources."""
+        rank = {source: index for index, source in enumerate(sources)}
+        merged = {}
+        for source, key, text in sorted(rows, key=lambda row: -rank[row[0]]):
+            merged[key] = text
+        return merged
+
+    def _placeholders(self, sources):
+        return ','.join('?' * len(sources))
+
+    def surah(self, sources, surah_number, lang):
+        rows = self._connect().execute(
+            f'SELECT source, ayah, text FROM ayahs WHERE source IN ({self._placeholders(sources)}) '
+            'AND surah = ? AND lang = ?', [*sources, surah_number, lang])
+        return dict(sorted(self._merged(sources, rows).items()))
+
+    def ayah(self, sources, surah_number, ayah_number, lang):
+        rows = self._connect().execute(
+            f'SELECT source, ayah, text FROM ayahs WHERE source IN ({self._placeholders(sources)}) '
+            'AND surah = ? AND ayah = ? AND lang = ?', [*sources, surah_number, ayah_number, lang])
+        return self._merged(sources, rows).get(ayah_number)
+
+    def surah_numbers(self, sources):
+        return [row[0] for row in self._connect().execute(
+            f'SELECT DISTINCT surah FROM ayahs WHERE source IN ({self._placeholders(sources)}) ORDER BY surah',
+            sources)]
+
+    def surah_names(self):
+        return {str(number): json.loads(data)
+                for number, data in self._connect().execute('SELECT number, data FROM surahs ORDER BY number')}
+
+    def glossary(self, surah_number):
+        return dict(self._connect().execute(
+            'SELECT term, text FROM glossary WHERE surah = ? ORDER BY rowid', (surah_number,)))
+
+
+class Corpus:
+    def __init__(self, dirs=None, db_path=CORPUS_DB):
+        self.dirs = list(dirs) if dirs is not None else tafsir_dirs()
+        self.db_path = db_path
+        self._sources = [source_label(directory) for directory in self.dirs]
+        self._compiled = None
+        self._compiled_checked = False
+        self._entries = {} # رقم السورة -> {رقم الآية: المدخل كما في الملف}
+        self._by_lang = {} # (رقم السورة، اللغة) -> {رقم الآية: النص}
+        self._surah_numbers = None
+        self._surah_names = None
+        self._glossary = None
+        self._lock = threading.Lock()
+
+    def after_fork(self):
+        """يمرَّر إلى قارئ الملف المترجم إن كان مفتوحاً."""
+        if self._compiled is not None:
+            self._compiled.after_fork()
+
+    def compiled(self):
+        """قارئ الملف المترجم إن وُجد وكان مطابقاً للمصادر، وإلا None (يُفحص مرة واحدة)."""
+        if not self._compiled_checked:
+            with self._lock:
+                if not self._compiled_checked:
+                    if self.db_path and os.path.isfile(self.db_path):
+                        compiled = CompiledCorpus(self.db_path)
+                        if compiled.is_fresh(source_files(self.dirs), self._sources):
+                            self._compiled = compiled
+                        else:
+                            logger.warning(f"الملف المترجم {self.db_path} لا يطابق ملفات JSON الحالية، "
+                                           f"ستُقرأ الملفات مباشرة. أعد تشغيل build_corpus.py.")
+                    self._compiled_checked = True
+        return self._compiled
+
+    def _entries_for(self, surah_number):
+        entries = self._entries.get(surah_number)
+        if entries is None:
+            with self._lock:
+                entries = self._entries.get(surah_number)
+                if entries is None:
+                    entries = {}
+                    for directory in reversed(self.dirs): # الأسبق في الترتيب يُكتب أخيراً فيغلب
+                        path = os.path.join(directory, f"{surah_number}.json")
+                        if os.path.isfile(path):
+                            data = load_json(path, 'التفسير')
+                            if isinstance(data, dict):
+                                entries.update((int(ayah), entry) for ayah, entry in data.items()
+                                               if str(ayah).isdigit())
+                    self._entries[surah_number] = entries
+        return entries
+
+    def surah(self, surah_number, lang='ar'):
+        """{رقم الآية: نص التفسير} لكل آيات السورة المتوفرة باللغة المطلوبة ({} إن لم توجد)."""
+        surah_number = _as_int(surah_number)
+        if surah_number is None:
+            return {}
+        key = (surah_number, lang)
+        texts = self._by_lang.get(key)
+        if texts is None:
+            compiled = self.compiled()
+            if compiled is not None:
+                texts = compiled.surah(self._sources, surah_number, lang)
+            else:
+                entries = self._entries_for(surah_number)
+                texts = {ayah: _entry_text(entry, lang) for ayah, entry in sorted(entries.items())}
+                texts = {ayah: text for ayah, text in texts.items() if text}
+            self._by_lang[key] = texts
+        return texts
+
+    def ayah(self, surah_number, ayah_number, lang='ar'):
+        """نص تفسير آية واحدة، أو None.
+
+        من الملف المترجم تُقرأ الآية وحدها ما لم تكن سورتها محملة مسبقاً.
+        """
+        surah_number, ayah_number = _as_int(surah_number), _as_int(ayah_number)
+        if surah_number is None or ayah_number is None:
+            return None
+        texts = self._by_lang.get((surah_number, lang))
+        if texts is None and self.compiled() is not None:
+            return self.compiled().ayah(self._sources, surah_number, ayah_number, lang)
+        if texts is None:
+            texts = self.surah(surah_number, lang)
+        return texts.get(ayah_number)
+
+    def surah_numbers(self):
+        """أرقام السور التي لها تفسير في أي من المجلدات، مرتبة.
+
+        بلا ملف مترجم تُقرأ الملفات، ولا تُعد السورة التي لم يُنتج ملفها أي نص (كملف JSON
+        تالف)، مطابقةً لما في الملف المترجم.
+        """
+        if self._surah_numbers is None:
+            compiled = self.compiled()
+            if compiled is not None:
+                self._surah_numbers = compiled.surah_numbers(self._sources)
+            else:
+                candidates = sorted({number for _, number in tafsir_files(self.dirs)})
+                self._surah_numbers = [number for number in candidates
+                                       if any(map(_has_text, self._entries_for(number).values()))]
+        return self._surah_numbers
+
+    def iter_ayahs(self, lang='ar'):
+        """يولد (رقم السورة، رقم الآية، النص) لكل الآيات المتوفرة بالترتيب."""
+        for surah_number in self.surah_numbers():
+            for ayah_number, text in self.surah(surah_number, lang).items():
+                yield surah_number, ayah_number, text
+
+    def surah_names(self):
+        """محتوى data/surahs.json ({"1": {"arabic": ...، "english": ...}})، أو {} إن لم يوجد."""
+        if self._surah_names is None:
+            compiled = self.compiled()
+            if compiled is not None:
+                self._surah_names = compiled.surah_names()
+            else:
+                path = surahs_file()
+                self._surah_names = (load_json(path, 'السور') if path else None) or {}
+        return self._surah_names
+
+    def glossary(self, surah_number):
+        """{الكلمة: شرحها} لمفردات السورة من ملفات GLOSSARY_FILES، أو {}."""
+        surah_number = _as_int(surah_number)
+        compiled = self.compiled()
+        if compiled is not None:
+            return compiled.glossary(surah_number)
+        if self._glossary is None:
+            self._glossary = glossary_by_surah(GLOSSARY_FILES, self.surah_names())
+        return self._glossary.get(surah_number, {})
+
+
+def glossary_by_surah(paths, names):
+    """{رقم السورة: {الكلمة: الشرح}} من ملفات الشرح المفهرسة باسم السورة."""
+    resolver = SurahResolver(names)
+    glossary = {}
+    for path in paths:
+        data = load_json(path, 'شرح المفردات') if os.path.isfile(path) else None
+        for surah_name, terms in (data or {}).items():
+            surah_number = resolver.resolve(surah_name)
+            if surah_number is None or not isinstance(terms, dict):
+                logger.warning(f"تعذر تحديد سورة '{surah_name}' في {path}")
+                continue
+            glossary.setdefault(int(surah_number), {}).update(terms)
+    return glossary
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_corpus():
+    """نسخة Corpus واحدة مشتركة في العملية بسياسة المسارات الافتراضية."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = Corpus()
+    return _default
+
+
+def surah(surah_number, lang='ar'):
+    return default_corpus().surah(surah_number, lang)
+
+
+def ayah(surah_number, ayah_number, lang='ar'):
+    return default_corpus().ayah(surah_number, ayah_number, lang)
+
+
+def iter_ayahs(lang='ar'):
+    return default_corpus().iter_ayahs(lang)
+
+
+def surah_names():
+    return default_corpus().surah_names()
+
+
+def glossary(surah_number):
+    return default_corpus().glossary(surah_number)
@@ -0,0 +1,134 @@
+"""مخزن المفضلة (SQLite) بفهرس فريد على البصمة.
+
+يحل محل favorites.json الذي كان يُقرأ كاملاً ويُعاد كتابته كاملاً مع كل إضافة
+أو حذف: فحص العضوية استعلام بالفهرس، وفحص صفحة نتائج كاملة استعلام واحد،
+والإضافة والحذف عمليات على صف واحد. عند أول تشغيل تُنقل محتويات favorites.json
+(إن وُجد) إلى المخزن.
+
+آمن مع عدة عمليات وخيوط: كل كتابة معاملة BEGIN IMMEDIATE في نمط WAL (تحجز قفل
+الكتابة من بدايتها وتنتظر busy_timeout بدل الفشل)، وsynchronous=FULL فلا تضيع
+معاملة مؤكدة عند انقطاع مفاجئ، ونقل الملف القديم محمي بقفل ملف بين العمليات.
+"""
+import contextlib
+import json
+import os
+import sqlite3
+
+try:
+    import fcntl
+except ImportError: # Windows: لا قفل ملفات POSIX، ويبقى INSERT OR IGNORE مانعاً للتكرار
+    fcntl = None
+
+from sqlite_store import SQLiteStore, in_batches
+
+FIELDS = ('surah_name', 'surah_number', 'ayah_number', 'ayah_text', 'tafsir',
+          'lang', 'interpreter', 'translated', 'timestamp', 'hash')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS favorites (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hash TEXT NOT NULL,
+    surah_name TEXT,
+    surah_number TEXT,
+    ayah_number TEXT,
+    ayah_text TEXT,
+    tafsir TEXT,
+    lang TEXT,
+    interpreter TEXT,
+    translated TEXT,
+    timestamp TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS favorites_hash ON favorites (hash);
+'''
+
+_COLUMNS = ', '.join(FIELDS)
+_INSERT = f"INSERT OR IGNORE INTO favorites ({_COLUMNS}) VALUES ({', '.join('?' * len(FIELDS))})"
+
+BUSY_TIMEOUT_MS = 30000
+
+
+def _row(favorite):
+    return tuple(favorite.get(field) for field in FIELDS)
+
+
+class FavoritesStore(SQLiteStore):
+    PRAGMAS = (f'busy_timeout={BUSY_TIMEOUT_MS}', 'journal_mode=WAL', 'synchronous=FULL')
+
+    def __init__(self, path):
+        super().__init__(path)
+        with self._process_lock():
+            self._connect().executescript(_SCHEMA)
+
+    def _open(self):
+        # isolation_level=None: نفتح المعاملات بأنفسنا (BEGIN IMMEDIATE) في _write
+        return sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+
+    @contextlib.contextmanager
+    def _write(self):
+        """معاملة كتابة تحجز قفل الكتابة فوراً، فلا يتعارض كاتبان بعد أن قرأ كلاهما."""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    @contextlib.contextmanager
+    def _process_lock(self):
+        """قفل حصري بين العمليات على ملف <المخزن>.lock."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def migrate_json(self, json_path):
+        """ينقل favorites.json القديم إلى المخزن مرة واحدة ثم يعيد تسميته (*.migrated). يعيد عدد المنقول.
+
+        يُنفذ تحت قفل العمليات حتى لا ينقله عاملان يبدآن معاً.
+        """
+        with self._process_lock():
+            if not os.path.exists(json_path):
+                return 0
+            with open(json_path, 'r', encoding='utf-8') as f:
+                favorites = json.load(f)
+            with self._write() as conn:
+                before = conn.total_changes
+                conn.executemany(_INSERT, [_row(fav) for fav in favorites if fav.get('hash')])
+                migrated = conn.total_changes - before
+            os.replace(json_path, json_path + '.migrated')
+            return migrated
+
+    def all(self):
+        """كل المفضلة بترتيب الإضافة."""
+        cursor = self._connect().execute(f'SELECT {_COLUMNS} FROM favorites ORDER BY id')
+        return [dict(zip(FIELDS, row)) for row in cursor]
+
+    def contains(self, fav_hash):
+        return self._connect().execute('SELECT 1 FROM favorites WHERE hash = ?', (fav_hash,)).fetchone() is not None
+
+    def contains_many(self, hashes):
+        """مجموعة البصمات الموجودة في المفضلة من بين hashes (استعلام واحد لكل 900 بصمة)."""
+        hashes = list(set(hashes))
+        found = set()
+        conn = self._connect()
+        for batch, placeholders in in_batches(hashes):
+            found.update(row[0] for row in conn.execute(
+                f'SELECT hash FROM favorites WHERE hash IN ({placeholders})', batch))
+        return found
+
+    def add(self, favorite):
+        """يضيف عنصراً ويعيد False إذا كانت بصمته موجودة مسبقاً."""
+        with self._write() as conn:
+            return conn.execute(_INSERT, _row(favorite)).rowcount == 1
+
+    def remove(self, fav_hash):
+        """يحذف عنصراً ويعيد False إذا لم يكن موجوداً."""
+        with self._write() as conn:
+            return conn.execute('DELETE FROM favorites WHERE hash = ?', (fav_hash,)).rowcount == 1
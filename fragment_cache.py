@@ -0,0 +1,33 @@
+"""ذاكرة مؤقتة (LRU) في العملية لأجزاء HTML المعروضة من محتوى ثابت.
+
+بطاقة التفسير الميسر المحلي لآية معينة لا تتغير ما دامت مدخلاتها نفسها، فيُحفظ
+ناتج القالب ويُعاد مباشرة في الطلبات التالية دون المرور بمحرك القوالب.
+"""
+import threading
+from collections import OrderedDict
+
+
+class FragmentCache:
+    def __init__(self, max_entries=2000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        """يعيد الجزء المحفوظ للمفتاح، أو يستدعي render() ويحفظ ناتجه."""
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+        html = render()
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return html
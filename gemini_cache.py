@@ -0,0 +1,110 @@
+"""ذاكرة مؤقتة دائمة (SQLite) لاستجابات Gemini.
+
+المفتاح هو sha256 للنموذج مع نص الطلب بعد توحيده (توحيد Unicode وضغط
+المسافات)، فيحصل الطلب نفسه على الإجابة نفسها من القرص دون اتصال بالشبكة،
+وتبقى الإجابات بعد إعادة التشغيل ويتشاركها كل العمال (workers).
+"""
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+
+from sqlite_store import SQLiteStore
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+'''
+
+
+def canonicalize_prompt(prompt):
+    """يوحد نص الطلب حتى لا تختلف المفاتيح بسبب المسافات أو صيغة Unicode."""
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFC', prompt or '')).strip()
+
+
+def cache_key(model, prompt):
+    return hashlib.sha256(f"{model}\n{canonicalize_prompt(prompt)}".encode('utf-8')).hexdigest()
+
+
+class GeminiCache(SQLiteStore):
+    """ذاكرة مؤقتة مع مدة صلاحية (TTL) وحد أقصى لعدد الإدخالات يُطرد عنده الأقدم استخداماً."""
+
+    def __init__(self, path, ttl_seconds=30 * 24 * 3600, max_entries=20000, evict_every=100):
+        super().__init__(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, model, prompt):
+        """يعيد الاستجابة المخزنة أو None إذا لم توجد أو انتهت صلاحيتها."""
+        key = cache_key(model, prompt)
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute('SELECT response, created_at FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+            self._count(False)
+            return None
+        with conn:
+            conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+        self._count(True)
+        return row[0]
+
+    def set(self, model, prompt, response):
+        """يخزن استجابة ناجحة، ويطرد الإدخالات القديمة دورياً."""
+        if not response:
+            return
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO responses (key, model, response, created_at, accessed_at) '
+                         'VALUES (?, ?, ?, ?, ?)', (cache_key(model, prompt), model, response, now, now))
+        with self._lock:
+            self._writes += 1
+            should_evict = self._writes % self.evict_every == 0
+        if should_evict:
+            self.evict()
+
+    def evict(self):
+        """يحذف المنتهي صلاحيته ثم الأقدم استخداماً حتى يعود العدد إلى الحد الأقصى."""
+        conn = self._connect()
+        with conn:
+            if self.ttl_seconds:
+                conn.execute('DELETE FROM responses WHERE created_at < ?', (time.time() - self.ttl_seconds,))
+            if self.max_entries:
+                conn.execute('DELETE FROM responses WHERE key IN ('
+                             'SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                             (self.max_entries,))
+
+    def stats(self):
+        """عدادات الإصابة والإخفاق لهذه العملية مع حجم الذاكرة الحالي."""
+        entries = self._connect().execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "entries": entries,
+            }
@@ -0,0 +1,208 @@
+"""عميل HTTP لـ Gemini API: اتصالات مُعاد استخدامها، مهلات منفصلة، إعادة محاولة وقاطع دائرة.
+
+- requests.Session مع مجمّع اتصالات (keep-alive) بدلاً من اتصال TLS جديد لكل طلب.
+- مهلة اتصال قصيرة ومهلة قراءة مستقلة.
+- إعادة المحاولة عند 429/5xx وأخطاء الشبكة بتأخير أُسّي عشوائي (jitter) يحترم Retry-After.
+- قاطع دائرة (circuit breaker) يرفض الطلبات فوراً ما دامت الخدمة متعثرة.
+
+مكتبة requests ثقيلة الاستيراد، فتُستورد وتُنشأ الجلسة مع أول طلب لا عند بدء التطبيق.
+"""
+import json
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class GeminiError(Exception):
+    """خطأ عام في التعامل مع Gemini API."""
+
+
+class GeminiCircuitOpen(GeminiError):
+    """القاطع مفتوح: الخدمة متعثرة ولن يُرسل أي طلب حتى انتهاء مهلة الاستراحة."""
+
+
+class GeminiEmptyResponse(GeminiError):
+    """أعادت الخدمة استجابة بلا مرشحات صالحة."""
+
+    def __init__(self, data):
+        super().__init__("Gemini API returned no candidates")
+        self.data = data
+
+
+class CircuitBreaker:
+    """قاطع دائرة بثلاث حالات: مغلق، مفتوح، نصف مفتوح (طلب تجريبي واحد)."""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """هل يُسمح بإرسال طلب الآن؟
+
+        في حالة نصف مفتوح يُسمح بطلب تجريبي واحد؛ وإذا لم تُسجَّل نتيجته خلال
+        reset_timeout (طلب ضائع) يُسمح بطلب تجريبي آخر حتى لا يعلق القاطع.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+def parse_retry_after(value):
+    """يحول ترويسة Retry-After (ثوانٍ أو تاريخ HTTP) إلى عدد ثوانٍ، أو None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class GeminiClient:
+    """عميل واحد مشترك بين خيوط التطبيق (Session آمنة للاستخدام المتزامن للطلبات البسيطة)."""
+
+    def __init__(self, api_key, api_url, stream_url=None, connect_timeout=5.0, read_timeout=60.0,
+                 max_retries=3, backoff_base=0.5, backoff_max=10.0,
+                 breaker_threshold=5, breaker_reset=30.0, pool_size=20):
+        self.api_key = api_key
+        self.api_url = api_url
+        self.stream_url = stream_url or api_url.replace(':generateContent', ':streamGenerateContent') + '?alt=sse'
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """جلسة requests المشتركة، تُنشأ عند أول طلب."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    session.headers.update({
+                        "Content-Type": "application/json",
+                        "X-goog-api-key": self.api_key,
+                    })
+                    self._session = session
+        return self._session
+
+    def _backoff(self, attempt, retry_after=None):
+        """تأخير أُسّي كامل العشوائية، ولا يقل عن Retry-After إن أرسلها الخادم."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def post(self, url, payload, **kwargs):
+        """يرسل الطلب مع إعادة المحاولة وقاطع الدائرة، ويعيد كائن الاستجابة الناجحة."""
+        if not self.breaker.allow():
+            raise GeminiCircuitOpen("Gemini API is temporarily unavailable (circuit open)")
+
+        import requests
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                res = self.session.post(url, json=payload, timeout=self.timeout, **kwargs)
+                if res.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                    retry_after = parse_retry_after(res.headers.get('Retry-After'))
+                    res.close()
+                else:
+                    res.raise_for_status()
+                    self.breaker.record_success()
+                    return res
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    self.breaker.record_failure()
+                    raise
+            except requests.exceptions.HTTPError as e:
+                # أخطاء العميل (4xx عدا 429) تعني أن الخدمة تستجيب، فلا تُحسب تعثراً
+                if e.response is None or e.response.status_code >= 500 or e.response.status_code == 429:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                raise
+            except requests.exceptions.RequestException:
+                # ChunkedEncodingError و ContentDecodingError وغيرها: إخفاق لا يُعاد
+                self.breaker.record_failure()
+                raise
+
+            delay = self._backoff(attempt, retry_after)
+            if retry_after is not None and retry_after > self.backoff_max * 2:
+                # الخادم يطلب انتظاراً أطول مما يحتمله طلب ويب، نفشل سريعاً
+                self.breaker.record_failure()
+                raise GeminiError(f"Gemini API asked to retry after {retry_after:.0f}s")
+            time.sleep(delay)
+            attempt += 1
+
+    def generate(self, prompt):
+        """يعيد نص أول مرشح من generateContent."""
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        data = self.post(self.api_url, payload).json()
+        try:
+            return data['candidates'][0]['content']['parts'][0]['text']
+        except (KeyError, IndexError, TypeError):
+            raise GeminiEmptyResponse(data)
+
+    def stream_generate(self, prompt):
+        """يولّد أجزاء النص تباعاً من streamGenerateContent (Server-Sent Events).
+
+        إعادة المحاولة تشمل فقط بدء الاتصال؛ بعد وصول أول جزء لا يُعاد الطلب،
+        لكن انقطاع البث أو فساد أحد أسطر data: يُسجَّل إخفاقاً في قاطع الدائرة.
+        """
+        import requests
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        res = self.post(self.stream_url, payload, stream=True)
+        res.encoding = 'utf-8'
+        try:
+            for line in res.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                data = json.loads(line[5:].strip())
+                for candidate in data.get('candidates') or []:
+                    for part in (candidate.get('content') or {}).get('parts') or []:
+                        if part.get('text'):
+                            yield part['text']
+        except (requests.exceptions.RequestException, ValueError):
+            self.breaker.record_failure()
+            raise
+        finally:
+            res.close()
@@ -1,29 +1,23 @@
-import json
-import os
 import tkinter as tk
 from tkinter import messagebox
 
+import corpus
+
 # تحميل أسماء السور
-with open('data/surahs.json', 'r', encoding='utf-8') as f:
-    surah_names = json.load(f)
+surah_names = corpus.surah_names()
 
 def get_tafsir(lang, surah, ayah):
-    tafsir_file = f"tafasir_json/{surah}.json"
-    if not os.path.exists(tafsir_file):
+    if not corpus.surah(surah):
         return "❌ ملف التفسير غير موجود."
 
-    with open(tafsir_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    tafsir_entry = data.get(str(ayah), None)
-    if not tafsir_entry:
+    ar_text = corpus.ayah(surah, ayah)
+    if not ar_text:
         return "❌ لم يتم العثور على التفسير."
 
     if lang == "ar":
-        return tafsir_entry if isinstance(tafsir_entry, str) else tafsir_entry.get("ar", "❌ غير متوفر بالعربية.")
+        return ar_text
     elif lang == "en":
-        ar_text = tafsir_entry if isinstance(tafsir_entry, str) else tafsir_entry.get("ar", "")
-        en_text = tafsir_entry.get("en", "❌ الترجمة غير متوفرة.")
+        en_text = corpus.ayah(surah, ayah, lang="en") or "❌ الترجمة غير متوفرة."
         return f"[AR] {ar_text}\n\n[EN] {en_text}"
     else:
         return "❌ لغة غير مدعومة."
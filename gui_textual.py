@@ -1,25 +1,10 @@
 from textual.app import App, ComposeResult
 from textual.widgets import Input, Static, Button
-import json
-import os
+
+import corpus
 
 def load_tafsir(surah, ayah):
-    paths = [
-        f"tafasir_json/{surah}.json",
-        f"QuranoMind/tafasir_json/{surah}.json",
-        f"/data/data/com.termux/files/home/QuranoMind/tafasir_json/{surah}.json"
-    ]
-    for path in paths:
-        if os.path.exists(path):
-            try:
-                with open(path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                text = data.get(str(ayah))
-                if text:
-                    return text
-            except Exception as e:
-                return f"⚠️ Error loading tafsir: {e}"
-    return "❌ Tafsir not found."
+    return corpus.ayah(surah, ayah) or "❌ Tafsir not found."
 
 class TafsirApp(App):
     CSS_PATH = None
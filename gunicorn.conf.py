@@ -0,0 +1,34 @@
+"""إعدادات gunicorn للإنتاج: عمال gthread بعدة خيوط مع تحميل التطبيق مسبقاً.
+
+طلبات Gemini قد تنتظر عشرات الثواني، فالخيوط داخل كل عامل تبقي العامل قادراً على
+خدمة طلبات أخرى أثناء الانتظار. كل القيم قابلة للتغيير من متغيرات البيئة:
+
+    PORT              منفذ الاستماع (الافتراضي 8080)
+    WEB_CONCURRENCY   عدد العمال (الافتراضي: عدد المعالجات + 1، بحد أقصى 8)
+    GUNICORN_THREADS  عدد الخيوط لكل عامل (الافتراضي 8)
+    GUNICORN_TIMEOUT  ثوانٍ قبل قتل عامل متوقف (الافتراضي 120، أطول من مهلة Gemini)
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() + 1, 8)))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+# تحميل التطبيق والمصادر في العملية الأم مرة واحدة ثم مشاركتها مع العمال (copy-on-write)
+preload_app = True
+
+# إعادة تشغيل العامل بعد عدد من الطلبات (مع تفاوت) للحد من تضخم الذاكرة
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = 200
+
+accesslog = '-'
+
+
+def post_fork(server, worker):
+    import app as quranomind_app
+    quranomind_app.after_fork()
@@ -0,0 +1,153 @@
+"""حساب تفاسير الذكاء الاصطناعي مسبقاً لكل (سورة، آية، مفسّر) وتخزينها محلياً.
+
+قابل للاستئناف: كل نتيجة تُكتب فوراً في المخزن، وعند إعادة التشغيل تُتخطى
+الثلاثيات المحسوبة. يعمل بعدد محدود من الخيوط مع حد لعدد الطلبات في الدقيقة،
+ويطبع الإنجاز والسرعة والوقت المتبقي المتوقع.
+
+الاستخدام:
+    python precompute_tafsir.py --surahs 1-3,36 --interpreters ibn_kathir,saadi --workers 4 --rpm 60
+"""
+import argparse
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+import app as quranomind_app
+from gemini_client import GeminiError
+from quran_meta import SURAH_COUNT, ayah_count
+
+DEFAULT_INTERPRETERS = ('gemini_general', 'ibn_kathir', 'qurtubi', 'saadi', 'all')
+
+logger = logging.getLogger("precompute_tafsir")
+
+
+class RateLimiter:
+    """يوزع الطلبات بالتساوي حتى لا يتجاوز عددها rpm في الدقيقة عبر كل الخيوط."""
+
+    def __init__(self, rpm):
+        self.interval = 60.0 / rpm if rpm else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def parse_surahs(value):
+    """'1-3,36' -> [1, 2, 3, 36]"""
+    surahs = set()
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            surahs.update(range(int(start), int(end) + 1))
+        else:
+            surahs.add(int(part))
+    return sorted(s for s in surahs if 1 <= s <= SURAH_COUNT)
+
+
+class Precomputer:
+    def __init__(self, store, interpreters, rpm):
+        self.store = store
+        self.interpreters = interpreters
+        self.limiter = RateLimiter(rpm)
+        self.client = quranomind_app._gemini_client
+        self.model = quranomind_app.app.config['GEMINI_MODEL']
+        self.quran_data = quranomind_app.load_quran_text()
+        self.surahs_data = quranomind_app.get_surahs_data()
+
+    def _generate(self, prompt):
+        self.limiter.wait()
+        return self.client.generate(prompt)
+
+    def ayah_text(self, surah_number, ayah_number, surah_name):
+        """نص الآية من quran.json أو المخزن، وإلا من Gemini (ثم يُخزَّن)."""
+        _, text = quranomind_app.get_local_ayah(str(surah_number), ayah_number, self.quran_data)
+        text = text or self.store.get_ayah_text(surah_number, ayah_number)
+        if text:
+            return text
+        response = self._generate(quranomind_app.build_ayah_text_prompt(surah_number, surah_name, ayah_number))
+        text = quranomind_app.extract_ayah_text(response)
+        self.store.put_ayah_text(surah_number, ayah_number, text)
+        return text
+
+    def run_ayah(self, surah_number, ayah_number, missing):
+        """يحسب المفسرين الناقصين لآية واحدة ويعيد عدد ما كُتب منها."""
+        surah_name = self.surahs_data.get(str(surah_number), {}).get("arabic", f"السورة {surah_number}")
+        ayah_text = self.ayah_text(surah_number, ayah_number, surah_name)
+        written = 0
+        for interpreter in missing:
+            prompt = quranomind_app.build_tafsir_prompt(interpreter, ayah_text, surah_name, surah_number)
+            tafsir = self._generate(prompt)
+            self.store.put_tafsir(surah_number, ayah_number, interpreter, tafsir, self.model)
+            written += 1
+        return written
+
+    def plan(self, surahs):
+        """قائمة (سورة، آية، المفسرون الناقصون) مع تخطي ما حُسب مسبقاً."""
+        tasks = []
+        for surah_number in surahs:
+            done = self.store.done_interpreters(surah_number)
+            for ayah_number in range(1, ayah_count(surah_number) + 1):
+                missing = [i for i in self.interpreters if i not in done.get(ayah_number, ())]
+                if missing:
+                    tasks.append((surah_number, ayah_number, missing))
+        return tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="حساب تفاسير الذكاء الاصطناعي مسبقاً وتخزينها محلياً.")
+    parser.add_argument('--surahs', default=f"1-{SURAH_COUNT}", help="مثال: 1-3,36 (الافتراضي: كل السور)")
+    parser.add_argument('--interpreters', default=','.join(DEFAULT_INTERPRETERS))
+    parser.add_argument('--workers', type=int, default=4, help="عدد الطلبات المتزامنة")
+    parser.add_argument('--rpm', type=float, default=60, help="الحد الأقصى للطلبات في الدقيقة (0 بلا حد)")
+    parser.add_argument('--report-every', type=int, default=20, help="طباعة التقدم كل N آية")
+    args = parser.parse_args()
+
+    interpreters = [i.strip() for i in args.interpreters.split(',') if i.strip()]
+    unknown = [i for i in interpreters if i not in quranomind_app.interpreter_names]
+    if unknown:
+        parser.error(f"مفسرون غير معروفين: {', '.join(unknown)}")
+    if not quranomind_app.gemini_key_configured():
+        parser.error("لم يتم تكوين مفتاح Gemini API (GEMINI_API_KEY).")
+
+    worker = Precomputer(quranomind_app._ai_tafsir_store, interpreters, args.rpm)
+    tasks = worker.plan(parse_surahs(args.surahs))
+    total = sum(len(missing) for _, _, missing in tasks)
+    logger.info(f"المطلوب: {total} تفسيراً في {len(tasks)} آية (المحسوب مسبقاً متخطى).")
+
+    started = time.monotonic()
+    completed = failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(worker.run_ayah, *task): task for task in tasks}
+        for index, future in enumerate(as_completed(futures), start=1):
+            surah_number, ayah_number, missing = futures[future]
+            try:
+                completed += future.result()
+            except (requests.exceptions.RequestException, GeminiError) as e:
+                failed += len(missing)
+                logger.error(f"فشل حساب السورة {surah_number} الآية {ayah_number}: {e}")
+            if index % args.report_every == 0 or index == len(tasks):
+                elapsed = time.monotonic() - started
+                rate = completed / elapsed if elapsed else 0.0
+                remaining = total - completed - failed
+                eta = remaining / rate if rate else float('inf')
+                logger.info(f"التقدم: {completed}/{total} (فشل {failed}) - {rate:.2f} تفسير/ث - "
+                            f"المتبقي المتوقع: {eta / 60:.1f} دقيقة")
+    logger.info(f"انتهى: {completed} تفسيراً جديداً، {failed} فشلت (أعد التشغيل لاستئنافها).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""نص القرآن في مصفوفة مسطحة واحدة (6236 آية بترتيب المصحف) مع جدول بداية كل سورة.
+
+موقع الآية (سورة، آية) في المصفوفة = SURAH_OFFSETS[سورة - 1] + آية - 1، فجلب نص
+آية أو عدد آيات سورة فهرسة مباشرة O(1) بلا قواميس متداخلة ولا مفاتيح نصية.
+
+يقرأ ملفات النص بأشكالها الموجودة (انظر iter_quran_json):
+    - {"الفاتحة": ["...", ...]} مفهرس باسم السورة أو رقمها مع قائمة آيات (quran.json في الجذر)
+    - {"1": {"1": "...", ...}} مفهرس برقم السورة ثم رقم الآية (data/quran.json)
+    - [["...", ...], ...] قائمة سور بترتيب المصحف
+وعند تعدد الملفات يغلب الأسبق منها لكل آية، ويكمل اللاحق ما نقص.
+
+يعمل أيضاً محولاً إلى الصيغة القياسية {سورة: {آية: نص}}:
+    python quran_text.py quran.json -o data/quran.json
+"""
+import argparse
+import json
+import logging
+import os
+from itertools import accumulate
+
+from quran_meta import AYAH_COUNTS, SURAH_COUNT, TOTAL_AYAHS, ayah_count
+
+logger = logging.getLogger(__name__)
+
+# موقع أول آية من كل سورة في المصفوفة المسطحة
+SURAH_OFFSETS = tuple(accumulate((0,) + AYAH_COUNTS[:-1]))
+
+
+def ayah_index(surah_number, ayah_number):
+    """موقع الآية في المصفوفة المسطحة، أو None إذا كانت خارج المصحف."""
+    try:
+        surah_number, ayah_number = int(surah_number), int(ayah_number)
+    except (TypeError, ValueError):
+        return None
+    if not 1 <= surah_number <= SURAH_COUNT or not 1 <= ayah_number <= AYAH_COUNTS[surah_number - 1]:
+        return None
+    return SURAH_OFFSETS[surah_number - 1] + ayah_number - 1
+
+
+def iter_quran_json(data, resolver):
+    """يولد (السورة، الآية، النص) من أي من أشكال ملفات النص؛ resolver يحول اسم السورة إلى رقمها."""
+    if isinstance(data, list):
+        data = {str(number): ayahs for number, ayahs in enumerate(data, start=1)}
+    for key, ayahs in data.items():
+        surah_number = resolver.resolve(key)
+        if surah_number is None:
+            logger.warning(f"تعذر تحديد السورة '{key}' في نص القرآن، تم تخطيها.")
+            continue
+        if isinstance(ayahs, list):
+            ayahs = {index: text for index, text in enumerate(ayahs, start=1)}
+        if not isinstance(ayahs, dict):
+            continue
+        for ayah, text in ayahs.items():
+            if str(ayah).isdigit() and isinstance(text, str) and text:
+                yield int(surah_number), int(ayah), text
+
+
+class QuranText:
+    def __init__(self):
+        self._ayahs = [None] * TOTAL_AYAHS
+        self.loaded = 0
+
+    def __len__(self):
+        """عدد الآيات المتوفر نصها."""
+        return self.loaded
+
+    def add(self, surah_number, ayah_number, text):
+        """يضع نص الآية إن لم يكن موجوداً؛ يعيد False للآية المعروفة أو الخارجة عن المصحف."""
+        index = ayah_index(surah_number, ayah_number)
+        if index is None or self._ayahs[index] is not None:
+            return False
+        self._ayahs[index] = text
+        self.loaded += 1
+        return True
+
+    def ayah(self, surah_number, ayah_number):
+        """نص الآية، أو None."""
+        index = ayah_index(surah_number, ayah_number)
+        return self._ayahs[index] if index is not None else None
+
+    def surah(self, surah_number):
+        """قائمة نصوص آيات السورة بالترتيب (None للآيات غير المتوفرة)."""
+        count = ayah_count(surah_number)
+        if not count:
+            return []
+        start = SURAH_OFFSETS[int(surah_number) - 1]
+        return self._ayahs[start:start + count]
+
+    def total_ayahs(self, surah_number):
+        """عدد آيات السورة في المصحف (0 لرقم غير صحيح)."""
+        return ayah_count(surah_number)
+
+    def iter_ayahs(self):
+        """يولد (السورة، الآية، النص) للآيات المتوفرة بترتيب المصحف."""
+        for surah_number in range(1, SURAH_COUNT + 1):
+            for ayah_number, text in enumerate(self.surah(surah_number), start=1):
+                if text is not None:
+                    yield surah_number, ayah_number, text
+
+    def to_json(self):
+        """الصيغة القياسية {"سورة": {"آية": نص}} للآيات المتوفرة."""
+        data = {}
+        for surah_number, ayah_number, text in self.iter_ayahs():
+            data.setdefault(str(surah_number), {})[str(ayah_number)] = text
+        return data
+
+
+def load(paths, resolver, compiled=None):
+    """يبني QuranText من الملفات بالترتيب (الأسبق يغلب).
+
+    إذا أُعطي compiled (corpus.CompiledCorpus) وكان ملف ما مترجماً دون تغيير بعدها،
+    تُقرأ آياته من الملف المترجم بدل تحليل JSON.
+    """
+    quran = QuranText()
+    for path in paths:
+        if not os.path.isfile(path):
+            continue
+        if compiled is not None and compiled.source_fresh(path):
+            rows = compiled.source_rows(path)
+        else:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    rows = iter_quran_json(json.load(f), resolver)
+            except (OSError, ValueError) as e:
+                logger.error(f"خطأ في تحميل ملف القرآن {path}: {e}")
+                continue
+        for surah_number, ayah_number, text in rows:
+            quran.add(surah_number, ayah_number, text)
+    return quran
+
+
+def main():
+    from corpus import surah_names
+    from surah_resolver import SurahResolver
+
+    parser = argparse.ArgumentParser(description="تحويل ملفات نص القرآن إلى الصيغة القياسية {سورة: {آية: نص}}.")
+    parser.add_argument('inputs', nargs='+', help="ملفات النص بالترتيب (الأسبق يغلب)")
+    parser.add_argument('-o', '--output', required=True)
+    args = parser.parse_args()
+
+    quran = load(args.inputs, SurahResolver(surah_names()))
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(quran.to_json(), f, ensure_ascii=False, indent=2)
+    print(f"{len(quran)} آية من {TOTAL_AYAHS} -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,27 +1,19 @@
-import os
-import json
-
-DATA_PATH = os.path.expanduser("~/QuranoMind/tafasir_json")
+import corpus
+from arabic_text import normalize_arabic
 
 def load_tafsir(surah, ayah):
-    filepath = os.path.join(DATA_PATH, f"{surah}.json")
-    if not os.path.exists(filepath):
+    if not corpus.surah(surah):
         print("❌ Tafsir file not found.")
         return
-    with open(filepath, "r", encoding="utf-8") as f:
-        tafsir = json.load(f)
-        print(f"\n📖 Surah {surah}, Ayah {ayah} Tafsir:\n")
-        print(tafsir.get(str(ayah), "⚠️ Tafsir not available."))
+    print(f"\n📖 Surah {surah}, Ayah {ayah} Tafsir:\n")
+    print(corpus.ayah(surah, ayah) or "⚠️ Tafsir not available.")
 
 def search_keyword(keyword):
     print(f"\n🔍 Searching for '{keyword}' in all tafsir files...\n")
-    for filename in os.listdir(DATA_PATH):
-        if filename.endswith(".json"):
-            with open(os.path.join(DATA_PATH, filename), "r", encoding="utf-8") as f:
-                tafsir = json.load(f)
-                for ayah, text in tafsir.items():
-                    if keyword in text:
-                        print(f"[Surah {filename.replace('.json','')}, Ayah {ayah}] → {text}")
+    normalized_keyword = normalize_arabic(keyword, alef_maqsura=True)
+    for surah, ayah, text in corpus.iter_ayahs():
+        if normalized_keyword in normalize_arabic(text, alef_maqsura=True):
+            print(f"[Surah {surah}, Ayah {ayah}] → {text}")
 
 def menu():
     while True:
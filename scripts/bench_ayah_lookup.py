@@ -0,0 +1,67 @@
+"""قياس تحديد الآية من جزء من نصها بفهرس n-gram (ayah_ngram_index.py).
+
+يبني الفهرس من نص القرآن المحلي، ثم يأخذ من كل آية أجزاء من كلمات متتالية
+(مع حذف التشكيل كما يكتبها المستخدم غالباً) ويبحث عنها مقيدة بالسورة وفي المصحف كله،
+ويطبع زمن البناء، والوسيط و p99 لزمن الاستعلام، ونسبة الأجزاء التي حُددت آيتها بدقة.
+
+الاستخدام (من جذر المشروع):
+    python scripts/bench_ayah_lookup.py [--words 3] [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import corpus  # noqa: E402
+import quran_text  # noqa: E402
+from arabic_text import normalize_arabic  # noqa: E402
+from ayah_ngram_index import AyahNgramIndex  # noqa: E402
+from surah_resolver import SurahResolver  # noqa: E402
+
+
+def fragments(quran, words):
+    """(السورة، الآية، الجزء) لكل نافذة من words كلمات متتالية في كل آية."""
+    for surah_number, ayah_number, text in quran.iter_ayahs():
+        tokens = normalize_arabic(text).split()
+        for start in range(max(1, len(tokens) - words + 1)):
+            yield surah_number, ayah_number, ' '.join(tokens[start:start + words])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس تحديد الآية من جزء من نصها.")
+    parser.add_argument('--words', type=int, default=3, help="عدد كلمات كل جزء")
+    parser.add_argument('--repeat', type=int, default=20, help="عدد مرات تكرار كل استعلام عند قياس الزمن")
+    args = parser.parse_args()
+
+    quran = quran_text.load(corpus.QURAN_FILES, SurahResolver(corpus.surah_names()))
+    started = time.perf_counter()
+    index = AyahNgramIndex()
+    for surah_number, ayah_number, text in quran.iter_ayahs():
+        index.add(surah_number, ayah_number, text)
+    print(f"البناء: {len(index)} آية، {len(index.postings)} مقطعاً في {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    samples = list(fragments(quran, args.words))
+    for scope in ('السورة', 'المصحف'):
+        latencies = []
+        correct = 0
+        for surah_number, ayah_number, fragment in samples:
+            scoped = surah_number if scope == 'السورة' else None
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                results = index.search(fragment, surah_number=scoped, limit=1)
+                latencies.append(time.perf_counter() - started)
+            # الجزء المشترك بين آيتين (كالبسملة) صحيح إذا طابق نصه أي منهما حرفياً
+            if results and fragment in normalize_arabic(quran.ayah(*results[0][:2])):
+                correct += 1
+        latencies.sort()
+        print(f"  {scope}: {len(samples)} جزءاً من {args.words} كلمات، دقة {correct / len(samples):.1%}، "
+              f"الوسيط {statistics.median(latencies) * 1000:.3f}ms، "
+              f"p99 {latencies[int(0.99 * (len(latencies) - 1))] * 1000:.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""قياس سعة الخادم: عدد الطلبات في الثانية وزمن الاستجابة تحت حمل متزامن.
+
+يرسل طلبات GET متزامنة من عدة خيوط إلى خادم يعمل مسبقاً، على مسارات لا تحتاج
+الشبكة الخارجية (صفحة آية من الملفات المحلية، البحث المحلي، واجهة JSON)، ويطبع
+الإنتاجية و p50/p95/p99 ورموز الحالة لكل مسار.
+
+الاستخدام (من جذر المشروع):
+    gunicorn -c gunicorn.conf.py wsgi:app              # في طرفية أخرى
+    python scripts/bench_capacity.py --url http://127.0.0.1:8080 --concurrency 32 --duration 20
+
+قارن مع خادم التطوير (python app.py) أو بقيم مختلفة لـ WEB_CONCURRENCY و GUNICORN_THREADS.
+"""
+import argparse
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+
+import requests
+
+DEFAULT_PATHS = (
+    '/surah/1/ayah/1?interpreter=maissar',
+    '/api/v1/search?q=%D8%A7%D9%84%D9%84%D9%87', # الله
+    '/api/v1/ayah/1/2?interpreter=maissar',
+)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run(url, paths, concurrency, duration):
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(offset):
+        session = requests.Session()
+        index = offset
+        while time.monotonic() < deadline:
+            path = paths[index % len(paths)]
+            index += 1
+            started = time.perf_counter()
+            try:
+                status = session.get(url.rstrip('/') + path, timeout=120).status_code
+            except requests.exceptions.RequestException as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies[path].append(elapsed)
+                statuses[path][status] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.monotonic() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس سعة الخادم تحت حمل متزامن.")
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--concurrency', type=int, default=16, help="عدد العملاء المتزامنين")
+    parser.add_argument('--duration', type=float, default=15, help="مدة القياس بالثواني")
+    parser.add_argument('--path', action='append', help="مسار للاختبار (يمكن تكراره)؛ الافتراضي مسارات محلية")
+    args = parser.parse_args()
+
+    paths = args.path or list(DEFAULT_PATHS)
+    latencies, statuses, elapsed = run(args.url, paths, args.concurrency, args.duration)
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{args.concurrency} عميلاً متزامناً، {elapsed:.1f} ث: {total} طلباً = {total / elapsed:.1f} طلب/ث")
+    for path in paths:
+        values = latencies[path]
+        if not values:
+            continue
+        print(f"  {path}\n    {len(values) / elapsed:.1f} طلب/ث  "
+              f"p50 {percentile(values, 0.5) * 1000:.0f}ms  p95 {percentile(values, 0.95) * 1000:.0f}ms  "
+              f"p99 {percentile(values, 0.99) * 1000:.0f}ms  متوسط {statistics.mean(values) * 1000:.0f}ms  "
+              f"الحالات {dict(statuses[path])}")
+
+
+if __name__ == '__main__':
+    main()
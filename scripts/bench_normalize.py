@@ -0,0 +1,60 @@
+"""قياس سرعة توحيد النص العربي (MB/s) مقارنة بالطريقة القديمة المبنية على re.sub.
+
+الاستخدام (من جذر المشروع):
+    python scripts/bench_normalize.py [عدد التكرارات]
+"""
+import json
+import os
+import re
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from arabic_text import normalize_arabic  # noqa: E402
+
+
+def legacy_normalize(text):
+    """الدالة المتداخلة القديمة من get_surah_number كما كانت."""
+    text = re.sub(r'[ًٌٍَُِّّْ]', '', text)
+    text = re.sub(r'أ|إ|آ', 'ا', text)
+    text = re.sub(r'ة', 'ه', text)
+    return text
+
+
+def load_corpus():
+    """يجمع نصوص التفاسير المتوفرة في المستودع كنص واحد للقياس."""
+    texts = []
+    for folder in ("tafasir_json", os.path.join("data", "tafasir_json")):
+        path = os.path.join(ROOT, folder)
+        if not os.path.isdir(path):
+            continue
+        for name in sorted(os.listdir(path)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(path, name), "r", encoding="utf-8") as f:
+                    texts.extend(v for v in json.load(f).values() if isinstance(v, str))
+            except (json.JSONDecodeError, OSError):
+                continue
+    return "\n".join(texts)
+
+
+def bench(label, func, text, number):
+    seconds = min(timeit.repeat(lambda: func(text), number=number, repeat=3))
+    megabytes = len(text.encode("utf-8")) * number / (1024 * 1024)
+    print(f"{label:<28} {megabytes / seconds:10.1f} MB/s")
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    text = load_corpus()
+    print(f"حجم العينة: {len(text.encode('utf-8')) / 1024:.1f} KB، التكرارات: {number}")
+    bench("re.sub (legacy)", legacy_normalize, text, number)
+    bench("normalize_arabic", normalize_arabic, text, number)
+    bench("normalize_arabic + maqsura", lambda t: normalize_arabic(t, alef_maqsura=True), text, number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""قياس زمن بدء التشغيل البارد لكل نقطة دخول عبر python -X importtime.
+
+لكل وحدة (التطبيق، wsgi، وأدوات سطر الأوامر والواجهات) تُشغَّل عملية Python جديدة
+عدة مرات ويُطبع الوسيط لـ:
+- زمن استيراد الوحدة كاملاً (التراكمي من -X importtime) وزمن العملية كلها؛
+- أثقل خمسة استيرادات مباشرة فيها، لمعرفة ما يستحق التأجيل؛
+- للتطبيق: الزمن حتى أول استجابة (استيراد + أول GET / بعميل الاختبار).
+
+كل تشغيل يستخدم مجلد ذاكرة مؤقتة ومخازن مؤقتة حتى لا تُلمس بيانات المشروع.
+للمقارنة قبل/بعد تغيير، مرر جذر نسخة أخرى من المشروع (مثلاً git worktree) بـ --root.
+
+الاستخدام (من جذر المشروع):
+    python scripts/bench_startup.py [--runs 7] [--module app --module tafsir_cli]
+    git worktree add /tmp/base HEAD~1 && python scripts/bench_startup.py --root /tmp/base
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = ('app', 'wsgi', 'tafsir_cli', 'tafsir_flex', 'gui_textual')
+# نقاط الدخول التي تخدم طلبات HTTP ويُقاس لها الزمن حتى أول استجابة
+WEB_ENTRY_POINTS = ('app', 'wsgi')
+
+FIRST_RESPONSE_CODE = '''
+import time
+started = time.perf_counter()
+import {module}
+response = {module}.app.test_client().get('/')
+print(response.status_code, (time.perf_counter() - started) * 1000)
+'''
+
+
+def bench_env(workdir):
+    env = dict(os.environ)
+    env.update({
+        'CACHE_DIR': os.path.join(workdir, 'cache'),
+        'FAVORITES_DB': os.path.join(workdir, 'favorites.sqlite3'),
+        'FAVORITES_FILE': os.path.join(workdir, 'favorites.json'),
+        'AI_TAFSIR_DB': os.path.join(workdir, 'ai_tafsir.sqlite3'),
+    })
+    return env
+
+
+def parse_importtime(stderr, module):
+    """يعيد (الزمن التراكمي للوحدة بالمللي ثانية، [(الاسم، الزمن) لاستيراداتها المباشرة]).
+
+    أسطر -X importtime تُطبع بعد اكتمال كل استيراد، فأبناء الوحدة المباشرون
+    (مسافتان بادئتان) يسبقون سطرها في المخرجات.
+    """
+    children = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|', 2)
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        name = name.strip()
+        if depth == 0:
+            if name == module:
+                return int(cumulative) / 1000, children
+            children = []
+        elif depth == 1:
+            children.append((name, int(cumulative) / 1000))
+    return None, []
+
+
+def run_import(root, module, env):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=root, env=env, capture_output=True, text=True)
+    wall = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    import_ms, children = parse_importtime(result.stderr, module)
+    return import_ms, wall, children
+
+
+def run_first_response(root, module, env):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', FIRST_RESPONSE_CODE.format(module=module)],
+                            cwd=root, env=env, capture_output=True, text=True)
+    wall = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    status, in_process = result.stdout.split()[-2:]
+    return int(status), float(in_process), wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس زمن بدء التشغيل لكل نقطة دخول.")
+    parser.add_argument('--root', default=ROOT, help="جذر المشروع المراد قياسه (الافتراضي: هذه النسخة)")
+    parser.add_argument('--runs', type=int, default=5, help="عدد التشغيلات لكل قياس (يُطبع الوسيط)")
+    parser.add_argument('--module', action='append', help="نقطة دخول للقياس (يمكن تكرارها)")
+    args = parser.parse_args()
+
+    modules = args.module or list(ENTRY_POINTS)
+    print(f"الجذر: {args.root}، {args.runs} تشغيلات لكل قياس (الوسيط)")
+    with tempfile.TemporaryDirectory(prefix='bench_startup_') as workdir:
+        env = bench_env(workdir)
+        for module in modules:
+            try:
+                runs = [run_import(args.root, module, env) for _ in range(args.runs)]
+            except RuntimeError as e:
+                print(f"\n{module}: تعذر الاستيراد ({e})")
+                continue
+            import_ms = statistics.median(run[0] for run in runs)
+            wall_ms = statistics.median(run[1] for run in runs)
+            print(f"\n{module}: استيراد {import_ms:.0f}ms، العملية كاملة {wall_ms:.0f}ms")
+            for name, ms in sorted(runs[-1][2], key=lambda child: -child[1])[:5]:
+                print(f"    {ms:8.1f}ms  {name}")
+            if module in WEB_ENTRY_POINTS:
+                try:
+                    responses = [run_first_response(args.root, module, env) for _ in range(args.runs)]
+                except RuntimeError as e:
+                    print(f"  أول استجابة: تعذر القياس ({e})")
+                    continue
+                print(f"  حتى أول استجابة (GET / = {responses[-1][0]}): "
+                      f"{statistics.median(r[1] for r in responses):.0f}ms داخل العملية، "
+                      f"{statistics.median(r[2] for r in responses):.0f}ms مع بدء المفسر")
+
+
+if __name__ == '__main__':
+    main()
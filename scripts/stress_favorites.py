@@ -0,0 +1,122 @@
+"""اختبار ضغط للمفضلة من عدة عمليات متزامنة والتحقق من عدم ضياع أي عنصر.
+
+كل عملية تحمّل التطبيق بعميل اختبار Flask على مخزن مفضلة مؤقت مشترك، ثم:
+- تضيف عناصرها الخاصة عبر /add_favorite وتحذف نصفها عبر /remove_favorite/<hash>؛
+- تضيف مجموعة عناصر مشتركة تتنافس عليها كل العمليات.
+في النهاية يجب أن يحتوي المخزن بالضبط على: النصف الباقي من عناصر كل عملية
++ العناصر المشتركة مرة واحدة لكل منها.
+
+بديلاً عن عميل الاختبار يمكن ضرب خادم حقيقي (مثل gunicorn بعدة عمال) بـ --url؛
+وحينها يُفحص الناتج عبر ملف المخزن المعطى بـ --db.
+
+الاستخدام (من جذر المشروع):
+    python scripts/stress_favorites.py [--processes 8] [--items 50] [--shared 20]
+    python scripts/stress_favorites.py --url http://127.0.0.1:8000 --db favorites.sqlite3
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def favorite_form(fav_hash):
+    return {'ayah_hash': fav_hash, 'surah_number': '1', 'ayah_number': '1', 'surah_name': 'الفاتحة',
+            'ayah_text': 'نص', 'tafsir': f'تفسير {fav_hash}', 'lang': 'arabic', 'interpreter': 'maissar'}
+
+
+class HttpClient:
+    """واجهة post() نفسها لعميل الاختبار، لكن على خادم حقيقي."""
+
+    def __init__(self, url):
+        import requests
+        self.url = url.rstrip('/')
+        self.session = requests.Session()
+
+    def post(self, path, data=None):
+        return self.session.post(self.url + path, data=data, allow_redirects=False)
+
+
+def make_client(url):
+    if url:
+        return HttpClient(url)
+    import logging
+    import app as quranomind_app
+    logging.getLogger().setLevel(logging.WARNING)
+    return quranomind_app.app.test_client()
+
+
+def worker(index, items, shared, url, errors):
+    client = make_client(url)
+
+    def post(path, data=None):
+        if client.post(path, data=data).status_code != 302:
+            errors.put(path if data is None else f"{path} {data['ayah_hash']}")
+
+    own = [f"p{index}-{i}" for i in range(items)]
+    # نخلط الإضافات الخاصة والمشتركة حتى تتقاطع الكتابات بين العمليات
+    for i, fav_hash in enumerate(own):
+        post('/add_favorite', favorite_form(fav_hash))
+        if shared:
+            post('/add_favorite', favorite_form(f"shared-{i % shared}"))
+    for fav_hash in own[::2]:
+        post(f'/remove_favorite/{fav_hash}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="اختبار ضغط المفضلة من عدة عمليات.")
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--items', type=int, default=50, help="عدد العناصر الخاصة بكل عملية")
+    parser.add_argument('--shared', type=int, default=20, help="عدد العناصر المشتركة المتنافس عليها")
+    parser.add_argument('--url', help="عنوان خادم يعمل بدلاً من عميل الاختبار")
+    parser.add_argument('--db', help="ملف مخزن المفضلة (إلزامي مع --url)")
+    args = parser.parse_args()
+    if args.url and not args.db:
+        parser.error("--db مطلوب مع --url")
+
+    workdir = tempfile.mkdtemp(prefix='stress_favorites_')
+    db_path = args.db or os.path.join(workdir, 'favorites.sqlite3')
+    # يرثها التطبيق في كل عملية فرعية: مخزن مؤقت ولا ملف favorites.json قديم
+    os.environ['FAVORITES_DB'] = db_path
+    os.environ['FAVORITES_FILE'] = os.path.join(workdir, 'favorites.json')
+    os.environ.setdefault('CACHE_DIR', os.path.join(workdir, 'cache'))
+
+    errors = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(i, args.items, args.shared, args.url, errors))
+                 for i in range(args.processes)]
+    started = time.monotonic()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.monotonic() - started
+
+    expected = {f"p{p}-{i}" for p in range(args.processes) for i in range(args.items) if i % 2}
+    expected |= {f"shared-{i}" for i in range(min(args.shared, args.items))}
+    conn = sqlite3.connect(db_path)
+    rows = [row[0] for row in conn.execute('SELECT hash FROM favorites')]
+    failed_requests = []
+    while not errors.empty():
+        failed_requests.append(errors.get())
+
+    requests_sent = args.processes * (args.items * (2 if args.shared else 1) + (args.items + 1) // 2)
+    print(f"{args.processes} عمليات، {requests_sent} طلباً في {elapsed:.1f} ث")
+    missing = expected - set(rows)
+    unexpected = set(rows) - expected
+    duplicates = len(rows) - len(set(rows))
+    crashed = [p.exitcode for p in processes if p.exitcode]
+    print(f"المتوقع {len(expected)}، الموجود {len(rows)}، مفقود {len(missing)}، زائد {len(unexpected)}، "
+          f"مكرر {duplicates}، طلبات فاشلة {len(failed_requests)}، عمليات متعطلة {len(crashed)}")
+    if missing or unexpected or duplicates or failed_requests or crashed:
+        print("فشل: " + ', '.join(sorted(missing | unexpected)[:10] + failed_requests[:10]))
+        sys.exit(1)
+    print("نجح: لم يضع أي عنصر.")
+
+
+if __name__ == '__main__':
+    main()
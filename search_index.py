@@ -0,0 +1,179 @@
+"""فهرس مقلوب (Inverted Index) لنصوص التفاسير المحلية.
+
+يُبنى الفهرس مرة واحدة من ملفات التفسير، ثم يُجاب عن كل استعلام من قوائم
+الورود (posting lists) مباشرة بدلاً من المرور على جميع السور في كل طلب.
+
+صيغة الاستعلام:
+    الصلاة الزكاة         -> الآيات التي تحتوي الكلمتين معاً (AND)
+    الصلاة OR الزكاة      -> الآيات التي تحتوي إحداهما (يقبل أيضاً "أو" و "|")
+    "لا ريب فيه"          -> عبارة متتالية بنفس الترتيب
+
+تُرتب النتائج بدرجة BM25 ويُختار منها أعلى k فقط عبر كومة (heap)، فلا
+تُفرز كل المطابقات عند عرض صفحة واحدة.
+"""
+import heapq
+import math
+import re
+
+from arabic_text import normalize_arabic
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_QUERY_RE = re.compile(r'"([^"]+)"|(\S+)')
+_OR_OPERATORS = {'or', 'أو', '|'}
+
+# حروف العطف والجر المتصلة بـ "ال" التعريف (والصلاة، بالله، فالذين...)
+_ARTICLE_PREFIXES = ('وال', 'فال', 'بال', 'كال', 'لل', 'ال')
+_MIN_STEM_LENGTH = 3
+
+# لفظ الجلالة وما يتصل به: تجريد "ال" منه يطابقه خطأً مع "له" و"لهم"
+_UNSTEMMED_FORMS = {
+    'الله': 'الله', 'والله': 'الله', 'فالله': 'الله', 'بالله': 'الله', 'تالله': 'الله',
+    'لله': 'الله', 'ولله': 'الله', 'فلله': 'الله',
+    'اللهم': 'اللهم', 'واللهم': 'اللهم', 'فاللهم': 'اللهم',
+}
+
+# معاملات BM25 القياسية
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def _stem(token):
+    """تجريد خفيف لأداة التعريف وما يتصل بها حتى تطابق "الصلاة" كلمة "والصلاة".
+
+    لا يُجرَّد إلا إذا بقي 3 أحرف على الأقل، ولفظ الجلالة مستثنى.
+    """
+    if token in _UNSTEMMED_FORMS:
+        return _UNSTEMMED_FORMS[token]
+    for prefix in _ARTICLE_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= _MIN_STEM_LENGTH:
+            return token[len(prefix):]
+    return token
+
+
+def tokenize(text):
+    """يقسم النص إلى كلمات موحدة (بلا تشكيل، همزات وتاء مربوطة موحدة) صالحة للفهرسة والاستعلام."""
+    if not text:
+        return []
+    return [_stem(tok) for tok in _TOKEN_RE.findall(normalize_arabic(text, alef_maqsura=True))]
+
+
+def parse_query(query):
+    """يحول نص الاستعلام إلى قائمة بدائل (OR)، كل بديل قائمة عبارات يجب توفرها جميعاً (AND).
+
+    كل عبارة هي قائمة كلمات؛ الكلمة المفردة عبارة طولها 1.
+    """
+    clauses = []
+    current = []
+    for match in _QUERY_RE.finditer(query or ''):
+        phrase, word = match.groups()
+        if word is not None and word.lower() in _OR_OPERATORS:
+            if current:
+                clauses.append(current)
+            current = []
+            continue
+        terms = tokenize(phrase if phrase is not None else word)
+        if terms:
+            current.append(terms)
+    if current:
+        clauses.append(current)
+    return clauses
+
+
+class TafsirIndex:
+    """فهرس مقلوب موضعي: لكل كلمة قاموس {رقم المستند: [مواضع الكلمة]}."""
+
+    def __init__(self):
+        self.docs = []        # رقم المستند -> (رقم السورة, رقم الآية)
+        self.postings = {}    # الكلمة -> {رقم المستند: [المواضع]}
+        self.doc_lengths = [] # رقم المستند -> عدد كلماته
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, surah_number, ayah_number, text):
+        """يضيف نص تفسير آية واحدة إلى الفهرس."""
+        doc_id = len(self.docs)
+        self.docs.append((str(surah_number), str(ayah_number)))
+        tokens = tokenize(text)
+        for position, token in enumerate(tokens):
+            self.postings.setdefault(token, {}).setdefault(doc_id, []).append(position)
+        self.doc_lengths.append(len(tokens))
+        self._total_length += len(tokens)
+        return doc_id
+
+    def _phrase_docs(self, terms):
+        """يعيد مجموعة المستندات التي تحتوي العبارة بترتيبها."""
+        term_postings = [self.postings.get(term) for term in terms]
+        if not all(term_postings):
+            return set()
+        # نبدأ بأقصر قائمة ورود حتى يكون التقاطع بحجم النتائج لا بحجم الفهرس
+        candidates = set(min(term_postings, key=len))
+        for postings in term_postings:
+            candidates.intersection_update(postings)
+            if not candidates:
+                return candidates
+        if len(terms) == 1:
+            return candidates
+
+        matched = set()
+        for doc_id in candidates:
+            starts = set(term_postings[0][doc_id])
+            for offset, postings in enumerate(term_postings[1:], start=1):
+                starts &= {pos - offset for pos in postings[doc_id]}
+                if not starts:
+                    break
+            if starts:
+                matched.add(doc_id)
+        return matched
+
+    def match(self, query):
+        """يعيد أرقام المستندات المطابقة للاستعلام مرتبة حسب ترتيب الإضافة."""
+        result = set()
+        for clause in parse_query(query):
+            # العبارات الأندر أولاً لتقليص مجموعة المرشحين بسرعة
+            clause = sorted(clause, key=lambda terms: min(len(self.postings.get(t, ())) for t in terms))
+            clause_docs = None
+            for terms in clause:
+                docs = self._phrase_docs(terms)
+                clause_docs = docs if clause_docs is None else clause_docs & docs
+                if not clause_docs:
+                    break
+            if clause_docs:
+                result |= clause_docs
+        return sorted(result)
+
+    def search(self, query):
+        """يعيد قائمة (رقم السورة, رقم الآية) المطابقة للاستعلام."""
+        return [self.docs[doc_id] for doc_id in self.match(query)]
+
+    def _idf(self, term):
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.docs) - df + 0.5) / (df + 0.5))
+
+    def score(self, doc_id, terms):
+        """درجة BM25 لمستند واحد مقابل كلمات الاستعلام."""
+        avg_length = self._total_length / len(self.docs) if self.docs else 0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / avg_length) if avg_length else BM25_K1
+        total = 0.0
+        for term in terms:
+            tf = len(self.postings.get(term, {}).get(doc_id, ()))
+            if tf:
+                total += self._idf(term) * tf * (BM25_K1 + 1) / (tf + norm)
+        return total
+
+    def search_ranked(self, query, page=1, page_size=10):
+        """يعيد (إجمالي عدد المطابقات, صفحة النتائج) مرتبة تنازلياً حسب الصلة.
+
+        كل عنصر في الصفحة هو (رقم السورة, رقم الآية, الدرجة). يُستخدم اختيار
+        أعلى k عبر heapq بدلاً من فرز جميع المطابقات.
+        """
+        page = max(1, int(page))
+        page_size = max(1, int(page_size))
+        doc_ids = self.match(query)
+        terms = {term for clause in parse_query(query) for phrase in clause for term in phrase}
+        top_k = page * page_size
+        # عند التساوي تُقدَّم الآية الأسبق في المصحف (رقم المستند الأصغر)
+        top = heapq.nlargest(top_k, ((self.score(doc_id, terms), -doc_id) for doc_id in doc_ids))
+        page_items = top[(page - 1) * page_size:top_k]
+        return len(doc_ids), [self.docs[-neg_id] + (score,) for score, neg_id in page_items]
@@ -0,0 +1,60 @@
+"""دمج الاستدعاءات المتزامنة المتطابقة (Single-Flight).
+
+إذا طلبت عدة خيوط النتيجة نفسها في الوقت نفسه (مثلاً تفسير آية شائعة)، ينفذ
+الخيط الأول الاستدعاء الفعلي وينتظر الباقون النتيجة نفسها بدل تكرار الطلب
+إلى الخدمة الخارجية. لا يُخزن شيء بعد انتهاء الاستدعاء؛ التخزين مهمة الذاكرة المؤقتة.
+"""
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """مجموعة استدعاءات جارية مفهرسة بمفتاح قابل للتجزئة."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0    # عدد الاستدعاءات الفعلية
+        self.shared = 0   # عدد المستدعين الذين شاركوا نتيجة استدعاء جارٍ
+
+    def claim(self, key):
+        """يعيد (future، leader) للمفتاح: leader صحيح إذا لم يكن له استدعاء جارٍ فسُجل الآن.
+
+        للعمل الذي لا يناسب do لأن القائد يعيد نتيجته تدريجياً (كالبث): ينفذه القائد
+        بنفسه ثم يستدعي release، وينتظر الباقون future.result().
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.calls += 1
+            else:
+                self.shared += 1
+        return future, leader
+
+    def release(self, key, future, result=None, error=None):
+        """ينهي استدعاء القائد بالنتيجة (أو الاستثناء error) ويحرر المفتاح؛ يُتجاهل إذا انتهى مسبقاً."""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn, *args, **kwargs):
+        """ينفذ fn مرة واحدة لكل مفتاح جارٍ ويعيد نتيجتها (أو يرفع استثناءها) لكل المنتظرين."""
+        future, leader = self.claim(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.release(key, future, error=e)
+            raise
+        self.release(key, future, result)
+        return result
@@ -0,0 +1,49 @@
+"""أساس مشترك للمخازن المبنية على SQLite: اتصال واحد لكل خيط يُفتح عند أول استخدام.
+
+اتصال sqlite3 لا يُشارك بين الخيوط، ولا يصلح بعد fork (العمال مع preload_app
+يرثون اتصالات العملية الأم)؛ لذلك يفتح كل خيط اتصاله، وتتخلى after_fork عن
+الموروث. كل مخزن يحدد PRAGMAS التي تُنفذ على اتصالاته الجديدة، وقد يعيد تعريف
+_open لخيارات الاتصال نفسه (مثل القراءة فقط).
+"""
+import os
+import sqlite3
+import threading
+
+# حد متغيرات SQLite الآمن في الإصدارات القديمة (عدد ? في الاستعلام الواحد)
+MAX_VARIABLES = 900
+
+
+def in_batches(values, size=MAX_VARIABLES):
+    """يولد (دفعة، "?,?,...") من القائمة values لاستعلامات IN لا تتجاوز حد المتغيرات."""
+    for start in range(0, len(values), size):
+        batch = values[start:start + size]
+        yield batch, ','.join('?' * len(batch))
+
+
+class SQLiteStore:
+    # WAL حتى لا تحجب القراءات الكتابة؛ NORMAL آمن مع WAL ويوفر fsync لكل معاملة
+    PRAGMAS = ('journal_mode=WAL', 'synchronous=NORMAL')
+    TIMEOUT = 30
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def after_fork(self):
+        """يتخلى عن اتصالات SQLite الموروثة من العملية الأم (preload_app) فتفتح كل عملية اتصالاتها."""
+        self._local = threading.local()
+
+    def _open(self):
+        return sqlite3.connect(self.path, timeout=self.TIMEOUT)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open()
+            for pragma in self.PRAGMAS:
+                conn.execute(f'PRAGMA {pragma}')
+            self._local.conn = conn
+        return conn
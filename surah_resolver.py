@@ -0,0 +1,124 @@
+"""تحويل مدخل المستخدم (رقم أو اسم سورة بالعربية أو بالحروف اللاتينية) إلى رقم السورة.
+
+تُحسب كل الصيغ الموحدة لأسماء السور مرة واحدة عند الإنشاء في قاموس، فيكون
+البحث في المسار المعتاد O(1). الأخطاء الإملائية تُعالج بمسافة تحرير محدودة
+لا تقارن إلا بالمفاتيح القريبة في الطول، وتُحفظ نتائجها في ذاكرة مؤقتة.
+"""
+import re
+from functools import lru_cache
+
+from arabic_text import normalize_query
+
+_LATIN_NOISE_RE = re.compile(r"[\s\-'`’_.]+")
+# أداة التعريف بعد الإدغام كما تُكتب لاتينياً: Al-, An-, Ash-, Ar-, ...
+_LATIN_ARTICLE_RE = re.compile(r'^(al|an|ar|as|ash|at|ad|adh|az|ath|aal|el)(?=[-\s\'’])')
+_ARABIC_PREFIX_RE = re.compile(r'^(سوره\s+)')
+
+# المدخلات والمفاتيح الأقصر من هذا لا تُطابق تقريبياً (حتى لا يتحول أي حرف إلى "ص" أو "ق")
+MIN_FUZZY_LENGTH = 3
+
+
+def _latin_keys(name):
+    """صيغ لاتينية مكافئة: Al-Baqarah -> albaqarah, baqarah, baqara ..."""
+    name = name.lower().strip()
+    keys = set()
+    for variant in (name, _LATIN_ARTICLE_RE.sub('', name)):
+        compact = _LATIN_NOISE_RE.sub('', variant)
+        if not compact:
+            continue
+        keys.add(compact)
+        if compact.endswith('h') and len(compact) > 3:
+            keys.add(compact[:-1])
+    return keys
+
+
+def _arabic_keys(name):
+    """صيغ عربية مكافئة: البقرة -> البقره, بقره (مع إزالة "سورة" والمسافات)."""
+    name = _ARABIC_PREFIX_RE.sub('', normalize_query(name))
+    compact = name.replace(' ', '')
+    keys = {compact}
+    if compact.startswith('ال') and len(compact) > 4:
+        keys.add(compact[2:])
+    return keys
+
+
+def input_keys(value):
+    """كل المفاتيح التي قد يطابق بها مدخل المستخدم اسماً في الجدول، بترتيب ثابت."""
+    value = (value or '').strip()
+    if not value:
+        return ()
+    return tuple(sorted(_arabic_keys(value) | _latin_keys(value), key=lambda k: (-len(k), k)))
+
+
+def bounded_edit_distance(a, b, max_distance):
+    """مسافة ليفنشتاين مع التوقف المبكر؛ تعيد max_distance + 1 إذا تجاوزتها."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j, cb in enumerate(b, start=1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            row_min = min(row_min, current[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class SurahResolver:
+    """جدول أسماء السور الموحدة -> رقم السورة (نص)."""
+
+    def __init__(self, surahs_data, max_distance=2):
+        self.max_distance = max_distance
+        self.names = {}
+        self._by_length = {}
+        for number, names in surahs_data.items():
+            number = str(number)
+            keys = set()
+            if names.get("arabic"):
+                keys |= _arabic_keys(names["arabic"])
+            if names.get("english"):
+                keys |= _latin_keys(names["english"])
+            for key in keys:
+                # عند التعارض يبقى الاسم الأول (ترتيب المصحف)
+                self.names.setdefault(key, number)
+        for key in self.names:
+            self._by_length.setdefault(len(key), []).append(key)
+        self.fuzzy_lookup = lru_cache(maxsize=1024)(self._fuzzy_lookup)
+
+    def resolve(self, value):
+        """يعيد رقم السورة كنص أو None."""
+        if value is None:
+            return None
+        value = str(value).strip()
+        if not value:
+            return None
+        if value.isdigit():
+            num = int(value)
+            return str(num) if 1 <= num <= 114 else None
+        keys = input_keys(value)
+        for key in keys:
+            if key in self.names:
+                return self.names[key]
+        return self.fuzzy_lookup(keys)
+
+    def _fuzzy_lookup(self, keys):
+        """أقرب اسم بمسافة تحرير لا تتجاوز الحد (1 للأسماء القصيرة، ولا مطابقة تقريبية لأقل من 3 أحرف)."""
+        best_number, best_distance = None, None
+        for key in keys:
+            if len(key) < MIN_FUZZY_LENGTH:
+                continue
+            limit = 1 if len(key) <= 4 else self.max_distance
+            if best_distance is not None:
+                limit = min(limit, best_distance - 1)
+            for length in range(max(MIN_FUZZY_LENGTH, len(key) - limit), len(key) + limit + 1):
+                for candidate in self._by_length.get(length, ()):
+                    distance = bounded_edit_distance(key, candidate, limit)
+                    if distance <= limit:
+                        best_number, best_distance = self.names[candidate], distance
+                        limit = distance - 1
+                        if limit < 0:
+                            return best_number
+        return best_number
@@ -1,26 +1,9 @@
-import json
-import os
-from pathlib import Path
-import pyperclip  # للتعامل مع النسخ
-from deep_translator import GoogleTranslator
-
-def load_tafsir(surah_num):
-    paths = [
-        f"tafasir_json/{surah_num}.json",
-        f"QuranoMind/tafasir_json/{surah_num}.json",
-        f"./{surah_num}.json"
-    ]
-    for path in paths:
-        if Path(path).exists():
-            try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"❌ Error reading file: {e}")
-                return None
-    return None
+import corpus
+
+# pyperclip و deep_translator يُستوردان عند الحاجة فقط: البحث بالعربية لا يحتاج المترجم
 
 def translate_text(text, target_lang="en"):
+    from deep_translator import GoogleTranslator
     try:
         return GoogleTranslator(source="auto", target=target_lang).translate(text)
     except Exception as e:
@@ -31,12 +14,11 @@ def main():
     surah = input("📖 أدخل رقم السورة: ").strip()
     ayah = input("🔢 أدخل رقم الآية: ").strip()
 
-    tafsir_data = load_tafsir(surah)
-    if not tafsir_data:
+    if not corpus.surah(surah):
         print("❌ ملف التفسير غير موجود.")
         return
 
-    tafsir_text = tafsir_data.get(ayah)
+    tafsir_text = corpus.ayah(surah, ayah)
     if not tafsir_text:
         print("⚠️ لم يتم العثور على التفسير لهذه الآية.")
         return
@@ -50,6 +32,7 @@ def main():
         # pyperclip.copy(translated)
         print("📋 تم نسخ التفسير المترجم إلى الحافظة.")
     else:
+        import pyperclip  # للتعامل مع النسخ
         pyperclip.copy(tafsir_text)
         print("📋 تم نسخ التفسير بالعربية إلى الحافظة.")
 
@@ -1,38 +1,14 @@
-import json
-import os
-import pyperclip
-from deep_translator import GoogleTranslator
-
-TAFSIR_DIR = os.path.expanduser("~/QuranoMind/tafasir_json")
-SURAHS_FILE = os.path.expanduser("~/QuranoMind/data/surahs.json")
-
-# تحميل أسماء السور
-def load_surah_names():
-    with open(SURAHS_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+import corpus
+from surah_resolver import SurahResolver
 
 # تحويل الاسم إلى رقم السورة
-def get_surah_number(input_value, surahs):
-    input_value = input_value.strip().lower()
-    for number, names in surahs.items():
-        if input_value == number or input_value == names["arabic"].strip().lower() or input_value == names["english"].strip().lower():
-            return int(number)
-    return None
-
-# جلب التفسير
-def get_tafsir(surah_number, ayah_number):
-    file_path = os.path.join(TAFSIR_DIR, f"{surah_number}.json")
-    if not os.path.isfile(file_path):
-        return None
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            tafsir_data = json.load(f)
-        return tafsir_data.get(str(ayah_number), None)
-    except Exception as e:
-        return f"⚠️ خطأ أثناء قراءة الملف: {e}"
+def get_surah_number(input_value, resolver):
+    number = resolver.resolve(input_value)
+    return int(number) if number else None
 
 # ترجمة للنص
 def translate_text(text, to_lang='en'):
+    from deep_translator import GoogleTranslator # يُستورد عند أول ترجمة فقط
     try:
         return GoogleTranslator(source='auto', target=to_lang).translate(text)
     except Exception as e:
@@ -40,7 +16,7 @@ def translate_text(text, to_lang='en'):
 
 # السكربت الرئيسي
 def main():
-    surahs = load_surah_names()
+    resolver = SurahResolver(corpus.surah_names())
 
     lang = input("🌐 اختر اللغة (Arabic / English): ").strip().lower()
     if lang not in ["arabic", "english"]:
@@ -50,18 +26,19 @@ def main():
     surah_input = input("📖 أدخل رقم أو اسم السورة: ")
     ayah_number = input("🔢 أدخل رقم الآية: ")
 
-    surah_number = get_surah_number(surah_input, surahs)
+    surah_number = get_surah_number(surah_input, resolver)
     if surah_number is None:
         print("❌ السورة غير موجودة.")
         return
 
-    tafsir = get_tafsir(surah_number, ayah_number)
+    tafsir = corpus.ayah(surah_number, ayah_number)
     if tafsir is None:
         print("❌ لم يتم العثور على التفسير.")
         return
 
     print("\n📘 التفسير:")
     print(f"[AR] {tafsir}")
+    import pyperclip # يُستورد بعد عرض التفسير حتى لا يؤخر أول إجابة
     pyperclip.copy(tafsir)
     print("📋 التفسير العربي تم نسخه إلى الحافظة.")
 
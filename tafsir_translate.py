@@ -1,23 +1,6 @@
-import json
-import os
 from googletrans import Translator
 
-def load_tafsir(surah, ayah):
-    possible_paths = [
-        f"tafasir_json/{surah}.json",
-        f"./tafasir_json/{surah}.json",
-        f"/data/data/com.termux/files/home/QuranoMind/tafasir_json/{surah}.json"
-    ]
-    for path in possible_paths:
-        if os.path.exists(path):
-            try:
-                with open(path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"⚠️ خطأ أثناء قراءة التفسير: {e}")
-                return None
-    print("❌ ملف التفسير غير موجود.")
-    return None
+import corpus
 
 def translate_to_english(text):
     try:
@@ -32,11 +15,11 @@ def main():
     surah = input("📖 أدخل رقم السورة: ").strip()
     ayah = input("🔢 أدخل رقم الآية: ").strip()
 
-    tafsir_data = load_tafsir(surah, ayah)
-    if not tafsir_data:
+    if not corpus.surah(surah):
+        print("❌ ملف التفسير غير موجود.")
         return
 
-    tafsir = tafsir_data.get(str(ayah), "❌ لا يوجد تفسير لهذه الآية.")
+    tafsir = corpus.ayah(surah, ayah) or "❌ لا يوجد تفسير لهذه الآية."
 
     if lang == "en":
         translated = translate_to_english(tafsir)
@@ -0,0 +1,52 @@
+"""مخزن دائم (SQLite) للترجمات، مفهرس ببصمة النص واللغة الهدف.
+
+يحل محل lru_cache الخاص بكل عملية: تبقى الترجمات بعد إعادة التشغيل ويتشاركها
+كل العمال، وتُقرأ ترجمات صفحة كاملة من النتائج باستعلام واحد.
+"""
+import hashlib
+import time
+
+from sqlite_store import SQLiteStore, in_batches
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS translations (
+    text_hash TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    translated TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (text_hash, lang)
+);
+'''
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class TranslationStore(SQLiteStore):
+    def __init__(self, path):
+        super().__init__(path)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def get_many(self, texts, lang):
+        """{النص: ترجمته} للنصوص المخزنة فقط."""
+        by_hash = {text_hash(text): text for text in texts}
+        hashes = list(by_hash)
+        found = {}
+        conn = self._connect()
+        for batch, placeholders in in_batches(hashes):
+            for key, translated in conn.execute(
+                    f'SELECT text_hash, translated FROM translations WHERE lang = ? AND text_hash IN ({placeholders})',
+                    [lang] + batch):
+                found[by_hash[key]] = translated
+        return found
+
+    def put_many(self, translations, lang):
+        """يخزن {النص: ترجمته} في معاملة واحدة."""
+        if not translations:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany('INSERT OR REPLACE INTO translations (text_hash, lang, translated, created_at) '
+                             'VALUES (?, ?, ?, ?)',
+                             [(text_hash(text), lang, translated, now) for text, translated in translations.items()])
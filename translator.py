@@ -0,0 +1,66 @@
+"""ترجمة دفعات من النصوص مع تقسيم النصوص الطويلة وترجمة أجزائها بالتوازي.
+
+- مترجم GoogleTranslator واحد لكل خيط ولغة هدف يُعاد استخدامه (الكائن يعدّل
+  معاملات الطلب داخلياً فلا يصح تشاركه بين الخيوط).
+- النص الأطول من حد الخدمة (5000 حرف) يُقسم عند حدود الجمل ثم تُجمع ترجماته بالترتيب.
+- كل ترجمة ناجحة تُحفظ في TranslationStore، والنصوص المحفوظة لا تُرسل إلى الشبكة.
+- deep_translator (ومعه bs4 و requests) يُستورد عند أول ترجمة فعلية لا عند الاستيراد.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from tts_pipeline import split_sentences
+
+logger = logging.getLogger(__name__)
+
+MAX_CHARS = 4500 # أقل من حد الخدمة (5000) بهامش أمان
+
+
+class BatchTranslator:
+    def __init__(self, store, max_workers=4, max_chars=MAX_CHARS):
+        self.store = store
+        self.max_chars = max_chars
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='translate')
+
+    def _translator(self, lang):
+        translators = getattr(self._local, 'translators', None)
+        if translators is None:
+            translators = self._local.translators = {}
+        if lang not in translators:
+            from deep_translator import GoogleTranslator
+            translators[lang] = GoogleTranslator(source='auto', target=lang)
+        return translators[lang]
+
+    def _translate_chunk(self, chunk, lang):
+        return self._translator(lang).translate(chunk)
+
+    def translate(self, text, lang='en'):
+        """يترجم نصاً واحداً، ويعيد None عند الفشل."""
+        return self.translate_many([text], lang)[0]
+
+    def translate_many(self, texts, lang='en'):
+        """يترجم قائمة نصوص دفعة واحدة ويعيد الترجمات بالترتيب نفسه (None لما فشل).
+
+        قراءة المخزن باستعلام واحد، ثم تُرسل أجزاء كل النصوص الناقصة إلى مجمّع الخيوط معاً.
+        """
+        wanted = {text for text in texts if text}
+        done = self.store.get_many(wanted, lang) if wanted else {}
+        missing = [text for text in wanted if text not in done]
+
+        pending = {text: [self._pool.submit(self._translate_chunk, chunk, lang)
+                          for chunk in split_sentences(text, self.max_chars)]
+                   for text in missing}
+        fresh = {}
+        for text, futures in pending.items():
+            try:
+                parts = [future.result() for future in futures]
+            except Exception as e:
+                logger.error(f"فشلت الترجمة للنص '{text[:50]}...': {e}")
+                continue
+            if all(parts):
+                fresh[text] = ' '.join(parts)
+        self.store.put_many(fresh, lang)
+        done.update(fresh)
+        return [done.get(text) for text in texts]
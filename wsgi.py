@@ -0,0 +1,14 @@
+"""نقطة الدخول لخادم الإنتاج (gunicorn -c gunicorn.conf.py wsgi:app).
+
+يُستورد في العملية الأم مرة واحدة (preload_app = True): تُحمَّل أسماء السور ونص القرآن
+وكل ملفات التفسير وفهرس البحث هنا، ثم يُجمَّد ما حُمِّل من كائنات خارج جامع القمامة
+حتى لا يلمس العمال صفحاتها فتبقى مشتركة بينهم بالنسخ عند الكتابة.
+"""
+import gc
+
+from app import app, preload_corpora
+
+preload_corpora()
+gc.freeze()
+
+__all__ = ['app']